@@ -0,0 +1,81 @@
+import asyncio
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from app.core.profiler import SamplingProfiler, recent_profiles, release_profiler, try_acquire_profiler
+from app.core.security import AuthenticatedUser, require_admin, require_admin_stream
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+@router.post(
+    "/profile",
+    response_class=PlainTextResponse,
+    summary="Perfilar el worker por muestreo",
+    description="Muestrea las pilas de todos los hilos del worker durante unos segundos. **Solo ADMIN**."
+)
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=60, description="Duración del muestreo"),
+    interval_ms: float = Query(5, ge=1, le=1000, description="Intervalo entre muestras"),
+    # La sesión se cierra tras autorizar: no retiene una conexión del pool durante el muestreo
+    current_user: AuthenticatedUser = Depends(require_admin_stream)
+):
+    """
+    Perfil por muestreo del worker que atiende la petición.
+
+    - **Rol requerido**: ADMIN
+    - **Respuesta**: pilas en formato collapsed (`a;b;c N`), listas para
+      `flamegraph.pl`, speedscope o inferno.
+
+    Con varios workers de gunicorn se perfila el que responda
+    (cabecera `X-Profile-Worker`).
+
+    **Errores posibles**:
+    - 409: Ya hay un perfil en curso en este worker
+    - 403: Usuario sin permisos suficientes (no es ADMIN)
+    """
+    if not try_acquire_profiler():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ya hay un perfil en curso en este worker"
+        )
+    profiler = SamplingProfiler(interval_ms / 1000)
+    try:
+        profiler.start()
+        await asyncio.sleep(seconds)
+    finally:
+        # También si el cliente se desconecta (cancelación): el hilo de muestreo no debe quedar vivo
+        profiler.stop()
+        release_profiler()
+
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={"X-Profile-Worker": str(os.getpid()), "X-Profile-Samples": str(profiler.samples)}
+    )
+
+
+@router.get(
+    "/profile/requests/{profile_id}",
+    response_class=PlainTextResponse,
+    summary="Descargar el perfil de una petición",
+    description="Pilas capturadas con la cabecera `X-Profile: 1`. **Solo ADMIN**."
+)
+def get_request_profile(
+    profile_id: str,
+    current_user: AuthenticatedUser = Depends(require_admin)
+):
+    """
+    Obtener el perfil de una petición concreta por su `X-Profile-Id`.
+
+    - **Rol requerido**: ADMIN
+
+    **Errores posibles**:
+    - 404: Perfil no encontrado (se guardan solo los últimos en cada worker)
+    """
+    collapsed = recent_profiles.get(profile_id)
+    if collapsed is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Perfil {profile_id} no encontrado"
+        )
+    return collapsed
@@ -1,7 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.schemas.schemas import Token, LoginRequest, UserCreate, UserResponse
+from app.core.security import AuthenticatedUser, require_admin
+from app.schemas.schemas import (
+    Token,
+    LoginRequest,
+    RefreshTokenRequest,
+    UserCreate,
+    UserResponse,
+    UserBulkCreate,
+    UserBulkResult
+)
 from app.services.auth_service import AuthService
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -19,6 +28,25 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     return AuthService.login(db, login_data)
 
 
+@router.post("/refresh", response_model=dict)
+def refresh(refresh_data: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """
+    Renovar el access token usando un refresh token.
+
+    El refresh token presentado se revoca y se devuelve uno nuevo (rotación).
+    Reutilizar un refresh token ya rotado revoca toda la sesión.
+    """
+    return AuthService.refresh(db, refresh_data.refresh_token)
+
+
+@router.post("/logout", response_model=dict)
+def logout(refresh_data: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """
+    Cerrar sesión revocando el refresh token (y sus rotaciones).
+    """
+    return AuthService.logout(db, refresh_data.refresh_token)
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def register(user: UserCreate, db: Session = Depends(get_db)):
     """
@@ -26,3 +54,18 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     Solo disponible para desarrollo.
     """
     return AuthService.create_user(db, user)
+
+
+@router.post("/register/bulk", response_model=UserBulkResult, status_code=status.HTTP_201_CREATED)
+def register_bulk(
+    payload: UserBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(require_admin)
+):
+    """
+    Registrar usuarios en lote (seeding / aprovisionamiento).
+
+    - **Rol requerido**: ADMIN
+    - Los usuarios ya existentes se omiten y se informan en `skipped`.
+    """
+    return AuthService.create_users_bulk(db, payload.users)
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.core.security import AuthenticatedUser, require_admin
+from app.schemas.schemas import BatchRequest, BatchResponse
+from app.services.planeta_service import PlanetaService
+
+router = APIRouter(tags=["Batch"])
+
+
+@router.post(
+    "/batch",
+    response_model=BatchResponse,
+    summary="Aplicar varias operaciones en una transacción",
+    description="Crea, actualiza y elimina planetas de forma atómica. **Solo ADMIN**."
+)
+def apply_batch(
+    batch: BatchRequest,
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(require_admin)
+):
+    """
+    Aplicar un lote de operaciones sobre planetas en una sola transacción.
+
+    - **Rol requerido**: ADMIN
+    - **Operaciones** (máximo 500, en orden):
+        - `{"op": "create", "data": {...}}`
+        - `{"op": "update", "id": 1, "data": {...}}`
+        - `{"op": "delete", "id": 1}`
+    - **Respuesta**: un resultado por operación con el estado final del planeta.
+
+    Si una operación falla no se aplica ninguna y el error indica su posición.
+
+    **Errores posibles**:
+    - 400: Operación mal formada o tipos de datos incorrectos
+    - 404: Planeta no encontrado
+    - 409: Nombre duplicado
+    - 403: Usuario sin permisos suficientes (no es ADMIN)
+    - 401: No autenticado
+    """
+    return {"results": PlanetaService.apply_batch(db, batch.operations)}
@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.core.keys import get_keyring
+
+router = APIRouter(tags=["Authentication"])
+
+
+@router.get("/.well-known/jwks.json")
+def jwks():
+    """
+    Llaves públicas (JWKS) para verificar los access tokens sin llamar a esta API.
+
+    Con HS256 la lista está vacía: el secreto compartido nunca se publica.
+    """
+    return JSONResponse(
+        content=get_keyring().jwks(),
+        headers={"Cache-Control": "public, max-age=300"}
+    )
@@ -1,14 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
-from app.core.security import get_current_user, get_current_admin_user
-from app.models.user import User
+from typing import List, Optional
+from app.core.cdn import COLLECTION_TAG, cache_headers, planeta_tag
+from app.core.config import settings
+from app.core.database import get_db, get_stream_db
+from app.core.events import get_broker, sse_frames
+from app.core.security import AuthenticatedUser, authorize, require_user, require_admin, require_admin_stream
 from app.schemas.schemas import (
     PlanetaCreate, 
     PlanetaUpdate, 
     PlanetaResponse,
-    PlanetaListResponse
+    PlanetaListResponse,
+    PlanetaBatchRequest,
+    PlanetaBatchResponse,
+    PlanetaChangesResponse
 )
 from app.services.planeta_service import PlanetaService
 
@@ -25,7 +32,7 @@ router = APIRouter(prefix="/planetas", tags=["Planetas"])
 def create_planeta(
     planeta: PlanetaCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthenticatedUser = Depends(require_user)
 ):
     """
     Crear un nuevo planeta.
@@ -54,7 +61,7 @@ def list_planetas(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: AuthenticatedUser = Depends(require_admin)
 ):
     """
     Listar todos los planetas.
@@ -68,8 +75,184 @@ def list_planetas(
     - 403: Usuario sin permisos suficientes (no es ADMIN)
     - 401: No autenticado
     """
-    planetas = PlanetaService.get_all_planetas(db, skip=skip, limit=limit)
-    return planetas
+    # Cuerpo ya serializado: las peticiones idénticas concurrentes comparten consulta y JSON
+    return Response(
+        PlanetaService.get_all_planetas_json(db, skip=skip, limit=limit),
+        media_type="application/json",
+        headers=cache_headers("planetas", [COLLECTION_TAG]),
+    )
+
+
+@router.get(
+    "/batch",
+    response_model=PlanetaBatchResponse,
+    summary="Obtener varios planetas por ID",
+    description="Obtiene varios planetas en una sola consulta (`?ids=1,2,3`). **Solo ADMIN**."
+)
+def get_planetas_batch(
+    response: Response,
+    ids: str = Query(..., description="IDs separados por comas (máximo 1000)"),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(require_admin)
+):
+    """
+    Obtener varios planetas por ID en una sola petición.
+
+    - **Rol requerido**: ADMIN
+    - **Respuesta**: `planetas` en el orden pedido y `missing` con los IDs
+      inexistentes (no es un error). Para listas largas usar `POST /planetas/batch`.
+
+    **Errores posibles**:
+    - 400: IDs no numéricos o más de 1000
+    - 403: Usuario sin permisos suficientes (no es ADMIN)
+    - 401: No autenticado
+    """
+    try:
+        parsed = PlanetaBatchRequest(ids=[int(value) for value in ids.split(",") if value.strip()])
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids debe ser una lista de 1 a 1000 enteros separados por comas"
+        )
+    planetas, missing = PlanetaService.get_planetas_by_ids(db, parsed.ids)
+    # Toda escritura purga "planetas": cubre también los IDs que aún no existen
+    response.headers.update(cache_headers("batch", [COLLECTION_TAG]))
+    return {"planetas": planetas, "missing": missing}
+
+
+@router.post(
+    "/batch",
+    response_model=PlanetaBatchResponse,
+    summary="Obtener varios planetas por ID (lista en el cuerpo)",
+    description="Igual que `GET /planetas/batch` para listas largas de IDs. **Solo ADMIN**."
+)
+def post_planetas_batch(
+    batch: PlanetaBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(require_admin)
+):
+    """
+    Obtener varios planetas por ID con la lista en el cuerpo: `{"ids": [1, 2, 3]}`.
+
+    - **Rol requerido**: ADMIN
+
+    **Errores posibles**:
+    - 400: Lista vacía, con más de 1000 IDs o con valores no numéricos
+    - 403: Usuario sin permisos suficientes (no es ADMIN)
+    - 401: No autenticado
+    """
+    planetas, missing = PlanetaService.get_planetas_by_ids(db, batch.ids)
+    return {"planetas": planetas, "missing": missing}
+
+
+@router.get(
+    "/changes",
+    response_model=PlanetaChangesResponse,
+    summary="Cambios desde un token (sincronización incremental)",
+    description="Planetas creados, modificados o eliminados desde `since`. **Solo ADMIN**."
+)
+def list_planeta_changes(
+    response: Response,
+    since: int = Query(0, ge=0, description="Token devuelto por la llamada anterior (0 = desde el inicio del registro)"),
+    limit: int = Query(1000, ge=1, le=5000, description="Máximo de cambios a procesar"),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(require_admin)
+):
+    """
+    Sincronización incremental para réplicas del catálogo.
+
+    - **Rol requerido**: ADMIN
+    - **Uso**: guardar `next_token` y repetir con `since=next_token`
+      mientras `has_more` sea true. Los `upserts` traen el estado actual
+      del planeta y `deleted` los IDs eliminados.
+    - Los planetas anteriores al registro de cambios no aparecen con
+      `since=0`: la primera sincronización debe hacerse con `GET /planetas/`.
+
+    **Errores posibles**:
+    - 403: Usuario sin permisos suficientes (no es ADMIN)
+    - 401: No autenticado
+    """
+    upserts, deleted, next_token, has_more = PlanetaService.get_changes(db, since=since, limit=limit)
+    response.headers.update(cache_headers("changes"))
+    return {"upserts": upserts, "deleted": deleted, "next_token": next_token, "has_more": has_more}
+
+
+@router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    summary="Flujo de cambios en tiempo real (SSE)",
+    description="Server-Sent Events con cada alta, modificación o baja de planetas. **Solo ADMIN**."
+)
+async def stream_planeta_events(current_user: AuthenticatedUser = Depends(require_admin_stream)):
+    """
+    Suscripción a los cambios de planetas como Server-Sent Events.
+
+    - **Rol requerido**: ADMIN
+    - **Eventos**: `create`, `update` y `delete`; `data` es un JSON con
+      `change_id`, `operation`, `planeta_id` y `planeta` (null en las bajas).
+      El `id` de cada evento es el token de `GET /planetas/changes`.
+    - **overflow**: el cliente no consumía a tiempo y se cierra la conexión;
+      debe reconectar y recuperar lo perdido con `/planetas/changes?since=<último id>`.
+
+    **Errores posibles**:
+    - 403: Usuario sin permisos suficientes (no es ADMIN)
+    - 401: No autenticado
+    """
+    return StreamingResponse(
+        sse_frames(get_broker(), settings.EVENT_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/stream/ws")
+async def stream_planeta_events_ws(
+    websocket: WebSocket,
+    token: Optional[str] = None,
+    db: Session = Depends(get_stream_db)
+):
+    """
+    Variante WebSocket de `/planetas/stream` (solo ADMIN). El token se envía
+    en la cabecera `Authorization` o, desde navegadores, en `?token=`. Cada
+    mensaje es el mismo JSON que el `data` de los eventos SSE; un cliente
+    lento se desconecta con el código 1013.
+    """
+    authorization = websocket.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    try:
+        await authorize(token or "", ("ADMIN",), db)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    finally:
+        db.close()
+    await websocket.accept()
+
+    broker = get_broker()
+    subscriber = broker.subscribe()
+
+    async def watch_disconnect():
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            subscriber.close()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        while True:
+            event = await subscriber.get()
+            if event is None:
+                if subscriber.overflowed:
+                    await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                return
+            await websocket.send_text(event.json)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        watcher.cancel()
+        broker.unsubscribe(subscriber)
 
 
 @router.get(
@@ -81,7 +264,7 @@ def list_planetas(
 def get_planeta(
     planeta_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: AuthenticatedUser = Depends(require_admin)
 ):
     """
     Obtener un planeta por su ID.
@@ -95,7 +278,11 @@ def get_planeta(
     - 403: Usuario sin permisos suficientes (no es ADMIN)
     - 401: No autenticado
     """
-    return PlanetaService.get_planeta_by_id(db, planeta_id)
+    return Response(
+        PlanetaService.get_planeta_json(db, planeta_id),
+        media_type="application/json",
+        headers=cache_headers("planeta", [planeta_tag(planeta_id)]),
+    )
 
 
 @router.put(
@@ -108,7 +295,7 @@ def update_planeta(
     planeta_id: int,
     planeta: PlanetaUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: AuthenticatedUser = Depends(require_admin)
 ):
     """
     Actualizar un planeta existente.
@@ -140,7 +327,7 @@ def update_planeta(
 def delete_planeta(
     planeta_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: AuthenticatedUser = Depends(require_admin)
 ):
     """
     Eliminar un planeta.
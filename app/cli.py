@@ -0,0 +1,88 @@
+"""
+Utilidades de línea de comandos.
+
+Uso:
+    python -m app.cli seed-users --count 5000 --prefix carga --password carga123
+    python -m app.cli seed-users --file usuarios.json
+    python -m app.cli generate-jwt-key --dir keys --kid 2026-10 --algorithm RS256
+"""
+import argparse
+import json
+import os
+import time
+
+from app.core.database import Base, SessionLocal, engine
+from app.core.keys import generate_private_key_pem
+from app.schemas.schemas import UserCreate, UserRole
+from app.services.auth_service import AuthService
+
+
+def _load_users(args) -> list[UserCreate]:
+    if args.file:
+        with open(args.file, encoding="utf-8") as fh:
+            return [UserCreate(**item) for item in json.load(fh)]
+    return [
+        UserCreate(
+            username=f"{args.prefix}{i}",
+            email=f"{args.prefix}{i}@{args.domain}",
+            password=args.password,
+            role=UserRole(args.role),
+        )
+        for i in range(1, args.count + 1)
+    ]
+
+
+def seed_users(args) -> None:
+    users = _load_users(args)
+    Base.metadata.create_all(bind=engine)
+
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        result = AuthService.create_users_bulk(db, users)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ Usuarios creados: {result['created']} en {elapsed:.2f}s")
+    if result["skipped"]:
+        print(f"⏭️  Omitidos: {len(result['skipped'])}")
+
+
+def generate_jwt_key(args) -> None:
+    os.makedirs(args.dir, exist_ok=True)
+    path = os.path.join(args.dir, f"{args.kid}.pem")
+    if os.path.exists(path):
+        raise SystemExit(f"❌ Ya existe una llave con kid '{args.kid}'")
+    with open(path, "wb") as fh:
+        fh.write(generate_private_key_pem(args.algorithm))
+    os.chmod(path, 0o600)
+    print(f"🔑 Llave {args.algorithm} creada en {path}")
+    print("   Para retirar una llave, sustituya su <kid>.pem por la pública <kid>.pub.pem")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Herramientas de administración")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    seed = subparsers.add_parser("seed-users", help="Crear usuarios en lote")
+    seed.add_argument("--file", help="JSON con una lista de usuarios (username, email, password, role)")
+    seed.add_argument("--count", type=int, default=100, help="Usuarios a generar si no se indica --file")
+    seed.add_argument("--prefix", default="usuario_carga", help="Prefijo de los usernames generados")
+    seed.add_argument("--domain", default="planetas.com", help="Dominio de los emails generados")
+    seed.add_argument("--password", default="carga123", help="Contraseña de los usuarios generados")
+    seed.add_argument("--role", choices=[r.value for r in UserRole], default=UserRole.USUARIO.value)
+    seed.set_defaults(func=seed_users)
+
+    keygen = subparsers.add_parser("generate-jwt-key", help="Crear una llave de firma JWT para JWT_KEYS_DIR")
+    keygen.add_argument("--dir", required=True, help="Directorio de llaves (JWT_KEYS_DIR)")
+    keygen.add_argument("--kid", required=True, help="Identificador de la llave (cabecera kid)")
+    keygen.add_argument("--algorithm", default="RS256", choices=["RS256", "RS384", "RS512", "ES256", "ES384", "ES512"])
+    keygen.set_defaults(func=generate_jwt_key)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Control de admisión adaptativo (AIMD) por clase de ruta.
+
+Las peticiones se agrupan en ``auth`` (``/auth/*``, limitadas por bcrypt),
+``write`` (POST/PUT/PATCH/DELETE) y ``read`` (el resto). Cada clase tiene un
+límite de concurrencia que crece de forma aditiva (+1 por cada "ventana" de
+peticiones rápidas) mientras la latencia se mantiene por debajo de su
+objetivo y se reduce de forma multiplicativa cuando lo supera o hay errores
+5xx. Lo que excede el límite se rechaza al instante con 503 + Retry-After,
+así que bajo sobrecarga unos pocos fallan rápido en lugar de ralentizarse
+todos. ``/health``, ``/metrics`` y el flujo SSE nunca se limitan.
+
+El estado es por worker y solo se toca desde el event loop, sin locks.
+"""
+import math
+import time
+from typing import Dict
+
+from prometheus_client import Counter, Gauge
+
+from app.core.config import settings
+
+ADMISSION_LIMIT = Gauge(
+    "planetas_admission_limit",
+    "Límite de concurrencia actual por clase de ruta",
+    ["route_class"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "planetas_admission_in_flight",
+    "Peticiones en curso por clase de ruta",
+    ["route_class"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_REJECTED = Counter(
+    "planetas_admission_rejected_total",
+    "Peticiones rechazadas por control de admisión",
+    ["route_class"],
+)
+
+# Las suscripciones SSE duran horas: no deben ocupar ni medir el límite de lecturas
+_EXEMPT_PATHS = ("/health", "/metrics", "/planetas/stream")
+_WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+_REJECTED_BODY = b'{"detail":"Servidor saturado, reintente en unos segundos"}'
+
+
+def route_class(method: str, path: str) -> str:
+    if path.startswith("/auth/"):
+        return "auth"
+    if method in _WRITE_METHODS:
+        return "write"
+    return "read"
+
+
+class AIMDLimiter:
+
+    def __init__(self, name: str, target_latency: float, initial: float, min_limit: float = 1,
+                 max_limit: float = 1000, backoff: float = 0.9):
+        self.name = name
+        self.target_latency = target_latency
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.in_flight = 0
+        self.latency = 0.0  # media móvil, para el Retry-After
+        self._since_decrease = math.inf  # respuestas completadas desde la última reducción
+        ADMISSION_LIMIT.labels(name).set(self.limit)
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= math.floor(self.limit):
+            ADMISSION_REJECTED.labels(self.name).inc()
+            return False
+        self.in_flight += 1
+        ADMISSION_IN_FLIGHT.labels(self.name).inc()
+        return True
+
+    def release(self, latency: float, failed: bool) -> None:
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.labels(self.name).dec()
+        self.latency = latency if self.latency == 0.0 else self.latency + 0.2 * (latency - self.latency)
+        self._since_decrease += 1
+        if failed or latency > self.target_latency:
+            # Como mucho una reducción por ventana (`limit` respuestas): una ráfaga de N
+            # respuestas lentas de la misma ventana no debe dividir el límite por 0.9**N
+            if self._since_decrease >= self.limit:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._since_decrease = 0
+        else:
+            # +1 por cada `limit` respuestas rápidas (≈ +1 por ventana completa)
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        ADMISSION_LIMIT.labels(self.name).set(self.limit)
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.latency))
+
+
+def build_limiters() -> Dict[str, AIMDLimiter]:
+    initial = settings.ADMISSION_INITIAL_LIMIT
+    return {
+        "auth": AIMDLimiter("auth", settings.ADMISSION_TARGET_MS_AUTH / 1000, initial),
+        "read": AIMDLimiter("read", settings.ADMISSION_TARGET_MS_READ / 1000, initial),
+        "write": AIMDLimiter("write", settings.ADMISSION_TARGET_MS_WRITE / 1000, initial),
+    }
+
+
+class AdmissionControlMiddleware:
+
+    def __init__(self, app):
+        self.app = app
+        self.limiters = build_limiters()
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not settings.ADMISSION_CONTROL_ENABLED
+            or scope["path"] in _EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters[route_class(scope["method"], scope["path"])]
+        if not limiter.try_acquire():
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"retry-after", str(limiter.retry_after()).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": _REJECTED_BODY})
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            limiter.release(time.perf_counter() - start, status_code >= 500)
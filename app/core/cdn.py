@@ -0,0 +1,184 @@
+"""
+Cabeceras de caché para CDN (Vercel) y purga por etiquetas.
+
+Las lecturas de planetas se marcan con una política por ruta
+(``Cache-Control``) y con etiquetas por planeta y por colección
+(``Surrogate-Key`` separadas por espacios, ``Cache-Tag`` por comas):
+
+- ``GET /planetas/{id}``: ``planeta-{id}``
+- ``GET /planetas/`` y ``GET /planetas/batch``: ``planetas``
+- ``GET /planetas/changes``: ``no-store``
+
+Con ``CACHE_VISIBILITY=private`` (por defecto) solo cachea el navegador del
+propio usuario. Con ``public`` el CDN guarda la respuesta ``s-maxage``
+segundos y, como todas las lecturas requieren token, se añade
+``Vary: Authorization`` para que nunca se sirva a otro usuario la respuesta
+de un token ajeno. Cada escritura confirmada en ``PlanetaService`` purga
+``planetas`` y ``planeta-{id}`` a través del purgador de ``CACHE_PURGER``:
+
+- ``none``: no hace nada (sin CDN delante).
+- ``local``: guarda las etiquetas purgadas en memoria (pruebas).
+- ``webhook``: envía ``{"tags": [...]}`` por POST a ``CACHE_PURGE_URL`` desde
+  un hilo propio, agrupando las etiquetas que se acumulen mientras tanto,
+  para no retrasar la respuesta de la escritura.
+"""
+import json
+import logging
+import threading
+import urllib.request
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+
+from prometheus_client import Counter
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_PURGES = Counter(
+    "planetas_cache_purges_total",
+    "Purgas de la caché del CDN tras escrituras, por resultado",
+    ["result"],
+)
+
+COLLECTION_TAG = "planetas"
+
+
+def planeta_tag(planeta_id: int) -> str:
+    return f"planeta-{planeta_id}"
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    public: bool
+    max_age: int
+    edge_max_age: int = 0
+    stale_while_revalidate: int = 0
+    no_store: bool = False
+
+    def header(self) -> str:
+        if self.no_store:
+            return "no-store"
+        parts = ["public" if self.public else "private", f"max-age={self.max_age}"]
+        if self.public:
+            parts.append(f"s-maxage={self.edge_max_age}")
+        if self.stale_while_revalidate:
+            parts.append(f"stale-while-revalidate={self.stale_while_revalidate}")
+        return ", ".join(parts)
+
+
+def route_policy(route: str) -> CachePolicy:
+    """Política de ``Cache-Control`` de cada lectura (``planeta``, ``planetas``, ``batch`` o ``changes``)."""
+    if route == "changes":
+        # El resultado depende del token "since" y de cambios aún no confirmados
+        return CachePolicy(public=False, max_age=0, no_store=True)
+    public = settings.CACHE_VISIBILITY == "public"
+    return CachePolicy(
+        public=public,
+        max_age=settings.CACHE_MAX_AGE_SECONDS,
+        edge_max_age=settings.CACHE_EDGE_MAX_AGE_SECONDS,
+        stale_while_revalidate=settings.CACHE_STALE_WHILE_REVALIDATE_SECONDS,
+    )
+
+
+def cache_headers(route: str, tags: Iterable[str] = ()) -> Dict[str, str]:
+    """Cabeceras para una respuesta correcta de ``route`` (vacío si ``CACHE_HEADERS_ENABLED`` es false)."""
+    if not settings.CACHE_HEADERS_ENABLED:
+        return {}
+    policy = route_policy(route)
+    headers = {"Cache-Control": policy.header()}
+    if policy.public:
+        headers["Vary"] = "Authorization"
+    tags = list(dict.fromkeys(tags))
+    if tags and not policy.no_store:
+        headers["Surrogate-Key"] = " ".join(tags)
+        headers["Cache-Tag"] = ",".join(tags)
+    return headers
+
+
+class NullPurger:
+
+    def purge(self, tags: Iterable[str]) -> None:
+        pass
+
+
+class LocalPurger:
+    """Guarda las etiquetas purgadas; sustituye al CDN en las pruebas."""
+
+    def __init__(self):
+        self.purged: List[str] = []
+        self._lock = threading.Lock()
+
+    def purge(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            self.purged.extend(tags)
+        CACHE_PURGES.labels("local").inc()
+
+
+class WebhookPurger:
+
+    def __init__(self, url: str, token: Optional[str] = None, timeout: float = 5.0):
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def purge(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            self._pending.update(tags)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="cache-purger", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            with self._lock:
+                tags, self._pending = sorted(self._pending), set()
+            if tags:
+                self.send(tags)
+
+    def send(self, tags: List[str]) -> None:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"tags": tags}).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        if self.token:
+            request.add_header("Authorization", f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                pass
+            CACHE_PURGES.labels("sent").inc()
+        except OSError as exc:
+            # Si la purga falla el CDN sirve la versión anterior como mucho s-maxage segundos
+            CACHE_PURGES.labels("failed").inc()
+            logger.warning("No se pudo purgar la caché del CDN (%s): %s", ",".join(tags), exc)
+
+
+_purger = None
+_purger_lock = threading.Lock()
+
+
+def get_purger():
+    global _purger
+    if _purger is None:
+        with _purger_lock:
+            if _purger is None:
+                if settings.CACHE_PURGER == "none":
+                    _purger = NullPurger()
+                elif settings.CACHE_PURGER == "local":
+                    _purger = LocalPurger()
+                elif settings.CACHE_PURGER == "webhook":
+                    if not settings.CACHE_PURGE_URL:
+                        raise ValueError("CACHE_PURGER=webhook requiere CACHE_PURGE_URL")
+                    _purger = WebhookPurger(settings.CACHE_PURGE_URL, settings.CACHE_PURGE_TOKEN)
+                else:
+                    raise ValueError(f"CACHE_PURGER desconocido: {settings.CACHE_PURGER}")
+    return _purger
@@ -0,0 +1,50 @@
+"""
+Lectura de ``planeta_changes`` sin saltarse transacciones aún en curso.
+
+Los ids del registro se asignan al insertar, no al confirmar: si la
+transacción A obtiene el id 10 y la B el 11, B puede confirmarse antes. Un
+lector que vea el 11 y avance su cursor hasta ahí no volverá a pedir el 10
+cuando A se confirme, y ese cambio se pierde para él.
+
+``committed_changes`` solo devuelve el tramo de ids consecutivos tras
+``since``: ante un hueco se detiene hasta que aparezca el id que falta. Un
+hueco también puede ser definitivo (una transacción que se deshizo tras
+reservar el id en la secuencia de PostgreSQL), así que se da por cerrado
+cuando la fila siguiente lleva más de ``CHANGES_GAP_TIMEOUT_MS`` insertada:
+ninguna escritura de planetas mantiene una transacción abierta tanto tiempo.
+
+Lo comparten ``GET /planetas/changes``, el broker ``changelog`` y el índice
+de nombres.
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import as_naive_utc
+from app.models.planeta_change import PlanetaChange
+
+
+def committed_changes(db: Session, since: int, limit: Optional[int] = None,
+                      gap_timeout: Optional[float] = None) -> list:
+    """Filas ``(id, planeta_id, operation, changed_at)`` posteriores a ``since``, hasta el primer hueco reciente."""
+    if gap_timeout is None:
+        gap_timeout = settings.CHANGES_GAP_TIMEOUT_MS / 1000
+    query = (
+        db.query(PlanetaChange.id, PlanetaChange.planeta_id, PlanetaChange.operation, PlanetaChange.changed_at)
+        .filter(PlanetaChange.id > since)
+        .order_by(PlanetaChange.id)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    settled_before = datetime.utcnow() - timedelta(seconds=gap_timeout)
+    rows: List = []
+    expected = since + 1
+    for row in query:
+        if row.id != expected and row.changed_at is not None and as_naive_utc(row.changed_at) > settled_before:
+            # Falta un id reciente: puede ser una transacción que aún no se ha confirmado
+            break
+        rows.append(row)
+        expected = row.id + 1
+    return rows
@@ -1,19 +1,119 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./planetas.db"
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
+    # Con RS256/ES256 las llaves se leen de JWT_KEYS_DIR (<kid>.pem activas, <kid>.pub.pem retiradas)
+    JWT_KEYS_DIR: Optional[str] = None
+    JWT_ACTIVE_KID: Optional[str] = None
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Caché por worker de la comprobación de usuario (0 = desactivada): un cambio de rol o una
+    # desactivación tarda hasta este tiempo en aplicarse a los access tokens ya emitidos
+    AUTH_USER_CACHE_TTL_SECONDS: int = 30
     ALLOWED_ORIGINS: str = "*"
+
+    # Hash de contraseñas: el primer esquema se usa para hashes nuevos, el resto solo se verifica
+    PASSWORD_HASH_SCHEMES: str = "bcrypt"
+    PASSWORD_HASH_ROUNDS: Optional[int] = None  # None = valor por defecto de passlib
+    PASSWORD_HASH_CALIBRATE: bool = False  # calcular las rondas al arrancar según el hardware
+    PASSWORD_HASH_TARGET_MS: int = 250  # tiempo objetivo de verificación al calibrar
     ENVIRONMENT: str = "development"
 
+    # Arranque en frío (Vercel/serverless): componentes opcionales
+    DOCS_ENABLED: Optional[bool] = None  # None = /docs, /redoc y /openapi.json salvo en producción
+    METRICS_ENABLED: bool = True  # /metrics e instrumentación de Prometheus
+    ADMIN_ROUTES_ENABLED: bool = True  # /admin/profile (profiler por muestreo)
+
+    # Concurrencia (app.launcher calcula los valores no indicados)
+    WEB_CONCURRENCY: Optional[int] = None  # workers de gunicorn
+    WORKER_MEMORY_MB: int = 256  # memoria estimada por worker para limitar su número
+    THREADPOOL_TOKENS: Optional[int] = None  # hilos para rutas síncronas (app.launcher: pool + overflow del worker)
+    THREADPOOL_QUEUE_DEADLINE_MS: int = 0  # 503 inmediato si la espera estimada lo supera (0 = desactivado)
+
+    # Control de admisión adaptativo (AIMD) por clase de ruta
+    ADMISSION_CONTROL_ENABLED: bool = False
+    ADMISSION_INITIAL_LIMIT: int = 20
+    ADMISSION_TARGET_MS_AUTH: int = 1000
+    ADMISSION_TARGET_MS_READ: int = 300
+    ADMISSION_TARGET_MS_WRITE: int = 500
+    DB_POOL_SIZE: Optional[int] = None  # conexiones por worker (SQLAlchemy usa 5 por defecto)
+    DB_MAX_OVERFLOW: int = 10
+    DB_MAX_CONNECTIONS: int = 100  # max_connections del servidor de base de datos
+    DB_RESERVED_CONNECTIONS: int = 5  # conexiones reservadas para migraciones y administración
+
+    # Buckets de latencia HTTP (segundos) ajustados a los SLO
+    METRICS_LATENCY_BUCKETS: str = "0.005,0.01,0.025,0.05,0.1,0.2,0.3,0.5,0.75,1,2,5"
+
+    # Instrumentación SQL por petición
+    SLOW_QUERY_THRESHOLD_MS: int = 100
+    SERVER_TIMING_ENABLED: bool = False  # cabecera Server-Timing para perfilar en local
+
+    # Coalescencia de lecturas idénticas concurrentes (GET /planetas/ y /planetas/{id})
+    SINGLEFLIGHT_ENABLED: bool = True
+
+    # Índice de nombres en memoria para evitar el SELECT de duplicados al crear/renombrar
+    NAME_INDEX_ENABLED: bool = True
+    NAME_INDEX_MAX_STALENESS_MS: int = 1000  # cada cuánto se leen como mucho los cambios de otros workers
+
+    # Idempotency-Key en POST /planetas/ y /auth/register: se reenvía la primera respuesta a los reintentos
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_STORE: Optional[str] = None  # "memory" (por worker) o "database" (compartida); sin valor, según WEB_CONCURRENCY
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_MAX_KEYS: int = 10000
+
+    # Group commit: altas/modificaciones concurrentes confirmadas en una sola transacción
+    GROUP_COMMIT_ENABLED: bool = False
+    GROUP_COMMIT_WINDOW_MS: float = 2.0
+    GROUP_COMMIT_MAX_OPS: int = 32
+
+    # Cabeceras de caché para CDN en las lecturas de planetas y purga por etiquetas tras cada escritura
+    CACHE_HEADERS_ENABLED: bool = True
+    CACHE_VISIBILITY: str = "private"  # "public": el CDN guarda las lecturas (con Vary: Authorization)
+    CACHE_MAX_AGE_SECONDS: int = 0  # navegador
+    CACHE_EDGE_MAX_AGE_SECONDS: int = 300  # s-maxage del CDN (solo public); las escrituras purgan antes
+    CACHE_STALE_WHILE_REVALIDATE_SECONDS: int = 30
+    CACHE_PURGER: str = "none"  # "none", "local" (pruebas) o "webhook"
+    CACHE_PURGE_URL: Optional[str] = None
+    CACHE_PURGE_TOKEN: Optional[str] = None
+
+    # Un hueco en los ids de planeta_changes se espera este tiempo antes de darlo por descartado
+    CHANGES_GAP_TIMEOUT_MS: int = 5000
+
+    # Flujo de cambios en tiempo real (/planetas/stream)
+    EVENT_BROKER: str = "memory"  # "memory" (un worker) o "changelog" (todos los workers, sondeando planeta_changes)
+    EVENT_QUEUE_SIZE: int = 100  # eventos pendientes por suscriptor antes de desconectarlo
+    EVENT_POLL_INTERVAL_MS: int = 500
+    EVENT_HEARTBEAT_SECONDS: float = 15.0
+
+    # Perfilado por muestreo de peticiones individuales (cabecera X-Profile: 1)
+    PROFILING_ENABLED: bool = False
+    PROFILING_INTERVAL_MS: float = 1.0
+
     model_config = SettingsConfigDict(
         env_file=".env", case_sensitive=True, extra="ignore"
     )
 
+    def get_password_hash_schemes(self) -> List[str]:
+        return [scheme.strip() for scheme in self.PASSWORD_HASH_SCHEMES.split(",") if scheme.strip()]
+
+    def docs_enabled(self) -> bool:
+        if self.DOCS_ENABLED is not None:
+            return self.DOCS_ENABLED
+        return self.ENVIRONMENT != "production"
+
+    def idempotency_store(self) -> str:
+        if self.IDEMPOTENCY_STORE is not None:
+            return self.IDEMPOTENCY_STORE
+        # Con varios workers un reintento puede llegar a otro proceso: las claves tienen que compartirse
+        return "database" if (self.WEB_CONCURRENCY or 1) > 1 else "memory"
+
+    def get_latency_buckets(self) -> List[float]:
+        return sorted(float(b) for b in self.METRICS_LATENCY_BUCKETS.split(",") if b.strip())
+
     def get_allowed_origins(self) -> List[str]:
         if self.ALLOWED_ORIGINS == "*":
             return ["*"]
@@ -1,22 +1,88 @@
+from datetime import datetime
+
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
+from app.core.monitoring import install_query_instrumentation
+from app.core.threadpool import threadpool_slot
 
 engine_args = {}
 # El argumento 'check_same_thread' es solo para SQLite.
 if settings.DATABASE_URL.startswith("sqlite"):
     engine_args["connect_args"] = {"check_same_thread": False}
+else:
+    # Tamaño del pool calculado por app.launcher para no superar max_connections
+    if settings.DB_POOL_SIZE:
+        engine_args["pool_size"] = settings.DB_POOL_SIZE
+    engine_args["max_overflow"] = settings.DB_MAX_OVERFLOW
 
 engine = create_engine(
     settings.DATABASE_URL, **engine_args
 )
 
+install_query_instrumentation()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Límite conservador de parámetros por sentencia en consultas IN por lotes (SQLite admite 999 en versiones antiguas)
+IN_CLAUSE_CHUNK_SIZE = 400
+
+
+def as_naive_utc(value: datetime) -> datetime:
+    # SQLite devuelve fechas sin zona horaria y PostgreSQL con zona; se comparan en UTC naive
+    if value.tzinfo is not None:
+        value = (value - value.utcoffset()).replace(tzinfo=None)
+    return value
+
+
+class LazySession:
+    """
+    Proxy de ``Session`` que solo crea la sesión en el primer uso.
+
+    Las peticiones rechazadas por autenticación o servidas sin consultar la base
+    de datos nunca crean sesión ni toman una conexión del pool.
+    """
+
+    __slots__ = ("_factory", "_session")
+
+    def __init__(self, factory=None):
+        self._factory = factory or SessionLocal
+        self._session = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._session is not None
+
+    def __getattr__(self, name):
+        if self._session is None:
+            self._session = self._factory()
+        return getattr(self._session, name)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
 def get_db():
-    db = SessionLocal()
+    # Primera dependencia síncrona: mide la espera hasta obtener un hilo del threadpool
+    with threadpool_slot():
+        db = LazySession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+def get_stream_db():
+    """
+    Sesión para conexiones largas (SSE/WebSocket), cuyas rutas no se ejecutan
+    en el threadpool: no usa ``threadpool_slot`` para no mezclar su espera con
+    la de las rutas ``def``.
+    """
+    db = LazySession()
     try:
         yield db
     finally:
@@ -27,36 +93,21 @@ def init_db():
     """Inicializar la base de datos con usuarios de prueba"""
     from app.models.user import User
     from app.models.planeta import Planeta
-    from app.core.security import get_password_hash
+    from app.models.planeta_change import PlanetaChange
+    from app.models.refresh_token import RefreshToken
+    from app.models.idempotency_key import IdempotencyKey
+    from app.schemas.schemas import UserCreate, UserRole
+    from app.services.auth_service import AuthService
     
     Base.metadata.create_all(bind=engine)
     
     db = SessionLocal()
     try:
         # Crear usuarios si no existen
-        admin = db.query(User).filter(User.username == "admin").first()
-        if not admin:
-            admin = User(
-                username="admin",
-                email="admin@planetas.com",
-                hashed_password=get_password_hash("admin123"),
-                role="ADMIN",
-                is_active=True
-            )
-            db.add(admin)
-        
-        usuario = db.query(User).filter(User.username == "usuario").first()
-        if not usuario:
-            usuario = User(
-                username="usuario",
-                email="usuario@planetas.com",
-                hashed_password=get_password_hash("usuario123"),
-                role="USUARIO",
-                is_active=True
-            )
-            db.add(usuario)
-        
-        db.commit()
+        AuthService.create_users_bulk(db, [
+            UserCreate(username="admin", email="admin@planetas.com", password="admin123", role=UserRole.ADMIN),
+            UserCreate(username="usuario", email="usuario@planetas.com", password="usuario123", role=UserRole.USUARIO),
+        ])
         print("✅ Base de datos inicializada correctamente")
         print("👤 Usuario Admin: admin / admin123")
         print("👤 Usuario Normal: usuario / usuario123")
@@ -0,0 +1,300 @@
+"""
+Difusión en tiempo real de cambios de planetas (SSE y WebSocket).
+
+Cada cambio se serializa una sola vez (``PlanetaEvent`` guarda ya el JSON y
+la trama SSE) y se reparte a los suscriptores del worker a través de colas
+acotadas. Un suscriptor que no consume a tiempo llena su cola y se desconecta
+(evento ``overflow``), en lugar de acumular memoria o frenar al resto; al
+reconectar puede recuperar lo perdido con ``GET /planetas/changes``.
+
+El broker se elige con ``EVENT_BROKER``:
+
+- ``memory``: ``PlanetaService`` publica directamente en el worker que hizo
+  el cambio. Suficiente con un único worker.
+- ``changelog``: cada worker sondea la tabla ``planeta_changes`` (que
+  escriben todos los workers) cada ``EVENT_POLL_INTERVAL_MS`` mientras tenga
+  suscriptores, así los eventos llegan a todos los workers de gunicorn sin
+  infraestructura adicional.
+"""
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from anyio import to_thread
+from prometheus_client import Counter, Gauge
+
+from app.core.config import settings
+from app.schemas.schemas import PlanetaResponse
+
+EVENT_SUBSCRIBERS = Gauge(
+    "planetas_event_subscribers",
+    "Suscriptores conectados al flujo de cambios",
+    multiprocess_mode="livesum",
+)
+EVENTS_PUBLISHED = Counter(
+    "planetas_events_published_total",
+    "Eventos de cambio difundidos por el worker",
+    ["operation"],
+)
+EVENT_SLOW_CONSUMERS = Counter(
+    "planetas_event_slow_consumers_total",
+    "Suscriptores desconectados por llenar su cola",
+)
+
+_POLL_BATCH_SIZE = 500
+# Espera máxima entre reintentos cuando el sondeo falla (base de datos caída, pool agotado)
+_MAX_POLL_BACKOFF = 30.0
+
+
+@dataclass(frozen=True)
+class PlanetaEvent:
+    change_id: int
+    operation: str
+    json: str
+    sse: bytes
+
+
+def build_event(change_id: int, operation: str, planeta_id: int, planeta=None) -> PlanetaEvent:
+    """Serializa el evento una única vez para todos los suscriptores."""
+    planeta_json = PlanetaResponse.model_validate(planeta).model_dump_json() if planeta is not None else "null"
+    data = (
+        f'{{"change_id":{change_id},"operation":"{operation}",'
+        f'"planeta_id":{planeta_id},"planeta":{planeta_json}}}'
+    )
+    return PlanetaEvent(
+        change_id=change_id,
+        operation=operation,
+        json=data,
+        sse=f"id: {change_id}\nevent: {operation}\ndata: {data}\n\n".encode(),
+    )
+
+
+class Subscriber:
+    """Cola acotada de un cliente; ``None`` indica fin del flujo."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.loop = loop
+        self.queue: "asyncio.Queue[Optional[PlanetaEvent]]" = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+        self.overflowed = False
+
+    def offer(self, event: PlanetaEvent) -> bool:
+        if self.closed:
+            return True
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def get(self) -> Optional[PlanetaEvent]:
+        return await self.queue.get()
+
+
+class Broadcaster:
+    """
+    Reparte eventos a los suscriptores del worker.
+
+    ``publish`` se puede llamar desde cualquier hilo (las rutas síncronas
+    corren en el threadpool): el reparto se programa en el event loop de cada
+    suscriptor con una sola llamada por loop, no por suscriptor.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[asyncio.AbstractEventLoop, Set[Subscriber]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(subscriber.loop, set()).add(subscriber)
+        EVENT_SUBSCRIBERS.inc()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.loop)
+            if subscribers is None or subscriber not in subscribers:
+                return
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[subscriber.loop]
+        EVENT_SUBSCRIBERS.dec()
+
+    def publish(self, event: PlanetaEvent) -> None:
+        with self._lock:
+            loops = list(self._subscribers)
+        if loops:
+            EVENTS_PUBLISHED.labels(event.operation).inc()
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._dispatch, loop, event)
+            except RuntimeError:
+                pass  # loop cerrado: sus suscriptores ya no existen
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop, event: PlanetaEvent) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(loop, ()))
+        for subscriber in subscribers:
+            if not subscriber.offer(event):
+                # Consumidor lento: se desconecta en lugar de bloquear o crecer sin límite
+                self.unsubscribe(subscriber)
+                subscriber.overflowed = True
+                subscriber.close()
+                EVENT_SLOW_CONSUMERS.inc()
+
+
+class MemoryBroker:
+    """Entrega los eventos solo a los suscriptores del worker que hizo el cambio."""
+
+    def __init__(self, broadcaster: Broadcaster):
+        self.broadcaster = broadcaster
+
+    def subscribe(self) -> Subscriber:
+        return self.broadcaster.subscribe()
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.broadcaster.unsubscribe(subscriber)
+
+    def publish(self, change_id: int, operation: str, planeta_id: int, planeta=None) -> None:
+        # Sin suscriptores no se serializa nada
+        if self.broadcaster.has_subscribers:
+            self.broadcaster.publish(build_event(change_id, operation, planeta_id, planeta))
+
+    async def stop(self) -> None:
+        pass
+
+
+class ChangelogBroker:
+    """
+    Entrega entre workers leyendo ``planeta_changes``: el registro de cambios
+    hace de canal, así que ``publish`` no hace nada.
+    """
+
+    def __init__(self, broadcaster: Broadcaster, session_factory=None, interval: float = 0.5):
+        self.broadcaster = broadcaster
+        self.session_factory = session_factory
+        self.interval = interval
+        self._cursor: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> Subscriber:
+        subscriber = self.broadcaster.subscribe()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.broadcaster.unsubscribe(subscriber)
+
+    def publish(self, change_id: int, operation: str, planeta_id: int, planeta=None) -> None:
+        pass
+
+    def poll_once(self) -> List[PlanetaEvent]:
+        """Lee los cambios posteriores al cursor (se ejecuta en el threadpool)."""
+        from sqlalchemy import func
+
+        from app.core.changelog import committed_changes
+        from app.models.planeta import Planeta
+        from app.models.planeta_change import PlanetaChange
+
+        if self.session_factory is None:
+            from app.core.database import SessionLocal
+            self.session_factory = SessionLocal
+        db = self.session_factory()
+        try:
+            if self._cursor is None:
+                # Primer sondeo: solo se difunde lo que ocurra a partir de ahora
+                self._cursor = db.query(func.max(PlanetaChange.id)).scalar() or 0
+                return []
+            # Solo hasta el primer id que pueda seguir sin confirmar: el cursor no lo salta
+            rows = committed_changes(db, self._cursor, _POLL_BATCH_SIZE)
+            if not rows:
+                return []
+            ids = {row.planeta_id for row in rows if row.operation != "delete"}
+            planetas = {p.id: p for p in db.query(Planeta).filter(Planeta.id.in_(ids))} if ids else {}
+            self._cursor = rows[-1].id
+            return [
+                build_event(row.id, row.operation, row.planeta_id, planetas.get(row.planeta_id))
+                for row in rows
+                # Un alta o cambio de un planeta ya borrado se omite: llegará su "delete"
+                if row.operation == "delete" or row.planeta_id in planetas
+            ]
+        finally:
+            db.close()
+
+    async def _run(self) -> None:
+        failures = 0
+        while self.broadcaster.has_subscribers:
+            try:
+                events = await to_thread.run_sync(self.poll_once)
+            except Exception as exc:
+                # Un error no debe terminar la tarea: los suscriptores se quedarían sin eventos
+                failures += 1
+                delay = min(self.interval * 2 ** failures, _MAX_POLL_BACKOFF)
+                print(f"⚠️  Fallo al sondear planeta_changes ({exc.__class__.__name__}: {exc}); reintento en {delay:.1f} s")
+                await asyncio.sleep(delay)
+                continue
+            failures = 0
+            for event in events:
+                self.broadcaster.publish(event)
+            await asyncio.sleep(self.interval)
+        # Sin suscriptores se deja de sondear; el siguiente empieza desde el último cambio
+        self._cursor = None
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+async def sse_frames(broker, heartbeat: float) -> AsyncIterator[bytes]:
+    """Tramas SSE de una suscripción, con comentarios periódicos para mantener viva la conexión."""
+    subscriber = broker.subscribe()
+    try:
+        yield b"retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            if event is None:
+                yield b"event: overflow\ndata: {}\n\n"
+                return
+            yield event.sse
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broadcaster = Broadcaster(settings.EVENT_QUEUE_SIZE)
+                if settings.EVENT_BROKER == "memory":
+                    _broker = MemoryBroker(broadcaster)
+                elif settings.EVENT_BROKER == "changelog":
+                    _broker = ChangelogBroker(broadcaster, interval=settings.EVENT_POLL_INTERVAL_MS / 1000)
+                else:
+                    raise ValueError(f"EVENT_BROKER desconocido: {settings.EVENT_BROKER}")
+    return _broker
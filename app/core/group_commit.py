@@ -0,0 +1,91 @@
+"""
+Group commit: varias escrituras concurrentes, una sola transacción.
+
+Con ``GROUP_COMMIT_ENABLED`` las escrituras que llegan dentro de una ventana
+corta (``GROUP_COMMIT_WINDOW_MS`` o ``GROUP_COMMIT_MAX_OPS`` operaciones, lo
+que ocurra antes) se agrupan: el primer hilo en llegar (líder) espera la
+ventana, recoge las pendientes y las aplica todas con un único commit; los
+demás esperan su resultado. Así el coste del commit (fsync en SQLite) se
+reparte entre todas las peticiones del grupo.
+
+Los grupos se aplican de uno en uno: mientras el líder confirma, el siguiente
+grupo se va llenando. Un grupo nunca pasa de ``GROUP_COMMIT_MAX_OPS``: al
+llenarse se cierra y la siguiente escritura abre otro con su propio líder. Cómo aplicar el grupo y repartir resultados o errores
+lo decide la función ``apply`` (ver ``PlanetaService``).
+"""
+import threading
+from typing import Any, Callable, List, Optional
+
+from prometheus_client import Histogram
+
+GROUP_COMMIT_SIZE = Histogram(
+    "planetas_group_commit_size",
+    "Operaciones confirmadas en cada commit agrupado",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+
+class GroupItem:
+    __slots__ = ("payload", "result", "error", "done")
+
+    def __init__(self, payload: Any):
+        self.payload = payload
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class _Group:
+    __slots__ = ("items", "full")
+
+    def __init__(self):
+        self.items: List[GroupItem] = []
+        self.full = threading.Event()
+
+
+class GroupCommitter:
+
+    def __init__(self, apply: Callable[[Any, List[GroupItem]], None], window: float, max_items: int):
+        self.apply = apply
+        self.window = window
+        self.max_items = max_items
+        self._open: Optional[_Group] = None  # grupo que aún admite operaciones
+        self._lock = threading.Lock()
+        self._apply_lock = threading.Lock()
+
+    def submit(self, db, payload: Any) -> Any:
+        """Encola la operación y devuelve su resultado (o lanza su error) cuando el grupo se confirma."""
+        item = GroupItem(payload)
+        with self._lock:
+            group = self._open
+            leader = group is None
+            if leader:
+                group = self._open = _Group()
+            group.items.append(item)
+            if len(group.items) >= self.max_items:
+                # Grupo completo: la siguiente operación abre otro aunque este siga esperando turno
+                self._open = None
+                group.full.set()
+
+        if leader:
+            group.full.wait(self.window)
+            with self._apply_lock:
+                with self._lock:
+                    if self._open is group:
+                        self._open = None
+                items = group.items
+                GROUP_COMMIT_SIZE.observe(len(items))
+                try:
+                    self.apply(db, items)
+                except BaseException as exc:
+                    for pending in items:
+                        if pending.result is None and pending.error is None:
+                            pending.error = exc
+                finally:
+                    for pending in items:
+                        pending.done.set()
+
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.result
@@ -0,0 +1,346 @@
+"""
+Claves de idempotencia (cabecera ``Idempotency-Key``) para las altas.
+
+Cuando JMeter o un cliente móvil agota su timeout y reintenta ``POST
+/planetas/`` o ``POST /auth/register``, el reintento repetía la escritura
+completa y casi siempre acababa en 409. Con la cabecera ``Idempotency-Key``
+la primera respuesta se guarda y los reintentos la reciben tal cual (con
+``Idempotent-Replayed: true``) tras una sola consulta al almacén, sin
+autenticar, validar ni tocar las tablas de planetas o usuarios:
+
+- Misma clave y misma petición (método, ruta y cuerpo): se reenvía la
+  respuesta guardada.
+- Misma clave con otra petición: 422, la clave no se puede reutilizar.
+- Misma clave mientras la primera sigue en curso: 409 + Retry-After.
+
+Las claves se separan por remitente (hash de la cabecera ``Authorization``),
+así que dos usuarios pueden usar la misma clave sin verse. Solo se guardan
+respuestas definitivas: las 5xx, 401, 403 y 429 liberan la clave para que el
+reintento vuelva a ejecutarse.
+
+El almacén se elige con ``IDEMPOTENCY_STORE``:
+
+- ``memory``: LRU por worker, acotado a ``IDEMPOTENCY_MAX_KEYS``. Un
+  reintento que llegue a otro worker se ejecuta de nuevo (y la restricción
+  única del nombre responde 409 como antes).
+- ``database``: tabla ``idempotency_keys``, compartida por todos los workers.
+
+Sin valor se usa ``database`` si ``WEB_CONCURRENCY`` es mayor que 1 y
+``memory`` con un solo worker.
+
+El middleware va dentro de ``CORSMiddleware``: sus propias respuestas (400,
+409, 422 y los reenvíos) reciben las cabeceras CORS del origen de cada
+petición, y las ``access-control-*`` no se guardan con la respuesta.
+
+En ambos casos las claves caducan a los ``IDEMPOTENCY_TTL_SECONDS``.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from anyio import to_thread
+from prometheus_client import Counter
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.database import as_naive_utc
+from app.models.idempotency_key import IdempotencyKey
+
+IDEMPOTENCY_REQUESTS = Counter(
+    "planetas_idempotency_requests_total",
+    "Peticiones con Idempotency-Key, por resultado",
+    ["result"],
+)
+
+IDEMPOTENT_ROUTES = {("POST", "/planetas/"), ("POST", "/auth/register")}
+MAX_KEY_LENGTH = 200
+# Una clave en curso cuyo worker murió se libera pasado este plazo
+_IN_FLIGHT_SECONDS = 60
+_NOT_STORED = {401, 403, 429}
+_PURGE_EVERY = 100
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    status_code: Optional[int] = None  # None: la primera petición sigue en curso
+    headers: Optional[Headers] = None
+    body: bytes = b""
+
+
+def fingerprint_request(method: str, path: str, query_string: bytes, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query_string, body):
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def scoped_key(authorization: bytes, key: str) -> str:
+    sender = hashlib.sha256(authorization).hexdigest()[:16] if authorization else "anon"
+    return f"{sender}:{key}"
+
+
+class MemoryIdempotencyStore:
+
+    def __init__(self, ttl: float, max_keys: int):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._entries: "OrderedDict[str, Tuple[float, StoredResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def reserve(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """Reserva la clave y devuelve ``None``, o devuelve la entrada existente."""
+        now = time.monotonic()
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current[0] > now:
+                self._entries.move_to_end(key)
+                return current[1]
+            self._entries[key] = (now + min(self.ttl, _IN_FLIGHT_SECONDS), StoredResponse(fingerprint))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        return None
+
+    def complete(self, key: str, status_code: int, headers: Headers, body: bytes) -> None:
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None:
+                current[1].status_code = status_code
+                current[1].headers = headers
+                current[1].body = body
+                self._entries[key] = (time.monotonic() + self.ttl, current[1])
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class DatabaseIdempotencyStore:
+    """Tabla ``idempotency_keys``; los métodos son síncronos y se llaman desde el threadpool."""
+
+    def __init__(self, ttl: float, max_keys: int, session_factory=None):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.session_factory = session_factory
+        self._writes = 0
+
+    def _session(self):
+        if self.session_factory is None:
+            from app.core.database import SessionLocal
+            self.session_factory = SessionLocal
+        return self.session_factory()
+
+    @staticmethod
+    def _stored(row: IdempotencyKey) -> StoredResponse:
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in json.loads(row.headers)] if row.headers else None
+        return StoredResponse(row.fingerprint, row.status_code, headers, row.body or b"")
+
+    def reserve(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        now = datetime.utcnow()
+        db = self._session()
+        try:
+            row = db.get(IdempotencyKey, key)
+            if row is not None:
+                if as_naive_utc(row.expires_at) > now:
+                    return self._stored(row)
+                db.delete(row)
+                db.flush()
+            db.add(IdempotencyKey(
+                key=key,
+                fingerprint=fingerprint,
+                created_at=now,
+                expires_at=now + timedelta(seconds=min(self.ttl, _IN_FLIGHT_SECONDS)),
+            ))
+            try:
+                db.commit()
+            except IntegrityError:
+                # Otro worker reservó la misma clave entre la lectura y la inserción
+                db.rollback()
+                row = db.get(IdempotencyKey, key)
+                return self._stored(row) if row is not None else StoredResponse(fingerprint)
+        finally:
+            db.close()
+        self._writes += 1
+        if self._writes % _PURGE_EVERY == 0:
+            self.purge()
+        return None
+
+    def complete(self, key: str, status_code: int, headers: Headers, body: bytes) -> None:
+        db = self._session()
+        try:
+            row = db.get(IdempotencyKey, key)
+            if row is not None:
+                row.status_code = status_code
+                row.headers = json.dumps([[name.decode("latin-1"), value.decode("latin-1")] for name, value in headers])
+                row.body = body
+                row.expires_at = datetime.utcnow() + timedelta(seconds=self.ttl)
+                db.commit()
+        finally:
+            db.close()
+
+    def release(self, key: str) -> None:
+        db = self._session()
+        try:
+            db.query(IdempotencyKey).filter(IdempotencyKey.key == key).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def purge(self) -> None:
+        """Borra las claves caducadas y, si aún sobran, las más antiguas."""
+        db = self._session()
+        try:
+            db.query(IdempotencyKey).filter(IdempotencyKey.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+            excess = db.query(IdempotencyKey).count() - self.max_keys
+            if excess > 0:
+                oldest = [
+                    row.key for row in
+                    db.query(IdempotencyKey.key).order_by(IdempotencyKey.created_at).limit(excess)
+                ]
+                db.query(IdempotencyKey).filter(IdempotencyKey.key.in_(oldest)).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_idempotency_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                kind = settings.idempotency_store()
+                if kind == "memory":
+                    _store = MemoryIdempotencyStore(settings.IDEMPOTENCY_TTL_SECONDS, settings.IDEMPOTENCY_MAX_KEYS)
+                elif kind == "database":
+                    _store = DatabaseIdempotencyStore(settings.IDEMPOTENCY_TTL_SECONDS, settings.IDEMPOTENCY_MAX_KEYS)
+                else:
+                    raise ValueError(f"IDEMPOTENCY_STORE desconocido: {kind}")
+    return _store
+
+
+async def _call(store, method: str, *args):
+    # El almacén en memoria responde al instante; el de base de datos va al threadpool
+    if isinstance(store, MemoryIdempotencyStore):
+        return getattr(store, method)(*args)
+    return await to_thread.run_sync(getattr(store, method), *args)
+
+
+async def _send_json(send, status_code: int, body: bytes, extra_headers: Headers = ()) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [(b"content-type", b"application/json"), *extra_headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not settings.IDEMPOTENCY_ENABLED
+            or (scope["method"], scope["path"]) not in IDEMPOTENT_ROUTES
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        raw_key = headers.get(b"idempotency-key")
+        if raw_key is None:
+            await self.app(scope, receive, send)
+            return
+        key = raw_key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, b'{"detail":"Idempotency-Key debe tener entre 1 y 200 caracteres"}')
+            return
+
+        # El cuerpo se lee entero para calcular la huella y se vuelve a entregar a la aplicación
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        store = get_idempotency_store()
+        key = scoped_key(headers.get(b"authorization", b""), key)
+        fingerprint = fingerprint_request(scope["method"], scope["path"], scope.get("query_string", b""), body)
+        stored = await _call(store, "reserve", key, fingerprint)
+
+        if stored is not None:
+            if stored.fingerprint != fingerprint:
+                IDEMPOTENCY_REQUESTS.labels("mismatch").inc()
+                await _send_json(send, 422, b'{"detail":"Idempotency-Key ya usada con otra peticion"}')
+            elif stored.status_code is None:
+                IDEMPOTENCY_REQUESTS.labels("in_progress").inc()
+                await _send_json(send, 409, b'{"detail":"Peticion con la misma Idempotency-Key en curso"}',
+                                 [(b"retry-after", b"1")])
+            else:
+                IDEMPOTENCY_REQUESTS.labels("replayed").inc()
+                await send({
+                    "type": "http.response.start",
+                    "status": stored.status_code,
+                    "headers": [*stored.headers, (b"idempotent-replayed", b"true")],
+                })
+                await send({"type": "http.response.body", "body": stored.body})
+            return
+
+        IDEMPOTENCY_REQUESTS.labels("stored").inc()
+        replayed = False
+
+        async def replay_receive():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status_code = 500
+        response_headers: Headers = []
+        response_body = []
+
+        async def capture_send(message):
+            nonlocal status_code, response_headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Las cabeceras CORS dependen del Origin de cada petición: las pone el reenvío
+                response_headers = [
+                    (name, value) for name, value in message.get("headers", [])
+                    if not name.lower().startswith(b"access-control-")
+                ]
+            elif message["type"] == "http.response.body":
+                response_body.append(message.get("body", b""))
+            await send(message)
+
+        completed = False
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            if status_code < 500 and status_code not in _NOT_STORED:
+                await _call(store, "complete", key, status_code, response_headers, b"".join(response_body))
+                completed = True
+        finally:
+            if not completed:
+                await _call(store, "release", key)
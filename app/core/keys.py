@@ -0,0 +1,156 @@
+"""
+Llaves de firma de los JWT.
+
+Con algoritmos simétricos (HS256) se usa ``SECRET_KEY`` como hasta ahora.
+Con algoritmos asimétricos (RS256/ES256) las llaves privadas se leen de
+``JWT_KEYS_DIR``: cada fichero ``<kid>.pem`` es una llave activa y cada
+``<kid>.pub.pem`` una llave pública retirada que solo sirve para verificar
+tokens emitidos antes de la rotación. La llave de firma es ``JWT_ACTIVE_KID``
+o, si no se indica, la última por orden alfabético.
+
+Las llaves se parsean una sola vez y se guardan como objetos ``jose`` listos
+para verificar; un ``kid`` desconocido provoca como mucho una relectura del
+directorio cada ``_RELOAD_INTERVAL`` segundos, de modo que los workers
+recogen llaves nuevas sin reiniciar.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Optional
+
+from app.core.config import settings
+
+# jose/cryptography solo se importan si se usan llaves asimétricas
+if TYPE_CHECKING:
+    from jose.backends.base import Key
+
+ASYMMETRIC_ALGORITHMS = {"RS256", "RS384", "RS512", "ES256", "ES384", "ES512"}
+_RELOAD_INTERVAL = 30.0
+
+
+@dataclass(frozen=True)
+class LoadedKey:
+    kid: str
+    private: Optional["Key"]
+    public: "Key"
+
+
+class KeyRing:
+
+    def __init__(self, algorithm: str, keys_dir: Optional[str] = None, active_kid: Optional[str] = None,
+                 allow_ephemeral: bool = True):
+        if algorithm == "EdDSA":
+            raise ValueError("EdDSA no está soportado por python-jose; use RS256 o ES256")
+        self.algorithm = algorithm
+        self.keys_dir = keys_dir
+        self.active_kid = active_kid
+        self.allow_ephemeral = allow_ephemeral
+        self._keys: Dict[str, LoadedKey] = {}
+        self._lock = threading.Lock()
+        self._loaded_at = 0.0
+        if self.is_asymmetric:
+            self.reload()
+
+    @property
+    def is_asymmetric(self) -> bool:
+        return self.algorithm in ASYMMETRIC_ALGORITHMS
+
+    def reload(self) -> None:
+        from jose import jwk
+
+        keys: Dict[str, LoadedKey] = {}
+        if self.keys_dir:
+            for filename in sorted(os.listdir(self.keys_dir)):
+                if not filename.endswith(".pem"):
+                    continue
+                with open(os.path.join(self.keys_dir, filename), "rb") as fh:
+                    pem = fh.read()
+                if filename.endswith(".pub.pem"):
+                    kid = filename[:-len(".pub.pem")]
+                    keys.setdefault(kid, LoadedKey(kid, None, jwk.construct(pem, self.algorithm)))
+                else:
+                    kid = filename[:-len(".pem")]
+                    private = jwk.construct(pem, self.algorithm)
+                    keys[kid] = LoadedKey(kid, private, private.public_key())
+        else:
+            # Cada worker generaría su propia llave con el mismo kid: un token firmado en
+            # un worker daría 401 en los demás y el JWKS cambiaría según quién responda
+            if not self.allow_ephemeral:
+                raise ValueError(
+                    f"{self.algorithm} requiere JWT_KEYS_DIR fuera de desarrollo o con varios workers "
+                    "(la llave efímera solo sirve para un único proceso)"
+                )
+            print("⚠️  JWT_KEYS_DIR no configurado: se genera una llave efímera (solo desarrollo, un único worker)")
+            kid = "ephemeral"
+            private = jwk.construct(generate_private_key_pem(self.algorithm), self.algorithm)
+            keys[kid] = LoadedKey(kid, private, private.public_key())
+
+        if not any(k.private for k in keys.values()):
+            raise ValueError(f"No hay llaves privadas para {self.algorithm} en {self.keys_dir}")
+        with self._lock:
+            self._keys = keys
+            self._loaded_at = time.monotonic()
+
+    def signing_key(self) -> LoadedKey:
+        kid = self.active_kid
+        if kid is None:
+            kid = [k.kid for k in self._keys.values() if k.private][-1]
+        key = self._keys.get(kid)
+        if key is None or key.private is None:
+            raise ValueError(f"La llave activa '{kid}' no existe o no tiene parte privada")
+        return key
+
+    def verification_key(self, kid: Optional[str]) -> Optional["Key"]:
+        key = self._keys.get(kid)
+        if key is None and self.keys_dir and time.monotonic() - self._loaded_at > _RELOAD_INTERVAL:
+            self.reload()
+            key = self._keys.get(kid)
+        return key.public if key else None
+
+    def jwks(self) -> dict:
+        if not self.is_asymmetric:
+            return {"keys": []}
+        return {
+            "keys": [
+                {**key.public.to_dict(), "kid": key.kid, "use": "sig"}
+                for key in self._keys.values()
+            ]
+        }
+
+
+def generate_private_key_pem(algorithm: str) -> bytes:
+    """Genera una llave privada PEM (PKCS8) adecuada para el algoritmo."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+    if algorithm.startswith("RS"):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm.startswith("ES"):
+        curve = {"ES256": ec.SECP256R1(), "ES384": ec.SECP384R1(), "ES512": ec.SECP521R1()}[algorithm]
+        private_key = ec.generate_private_key(curve)
+    else:
+        raise ValueError(f"Algoritmo no asimétrico: {algorithm}")
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+
+
+_keyring: Optional[KeyRing] = None
+_keyring_lock = threading.Lock()
+
+
+def get_keyring() -> KeyRing:
+    global _keyring
+    if _keyring is None:
+        with _keyring_lock:
+            if _keyring is None:
+                _keyring = KeyRing(
+                    settings.ALGORITHM,
+                    settings.JWT_KEYS_DIR,
+                    settings.JWT_ACTIVE_KID,
+                    allow_ephemeral=settings.ENVIRONMENT == "development" and (settings.WEB_CONCURRENCY or 1) == 1,
+                )
+    return _keyring
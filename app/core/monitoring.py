@@ -0,0 +1,201 @@
+"""
+Métricas propias que complementan las de ``Instrumentator``.
+
+Además de las métricas SQL se definen histogramas de las fases de
+autenticación (verificación de contraseña, JWT) y de base de datos (duración
+por tipo de sentencia, commit) y contadores de negocio. Todas son operaciones
+``observe``/``inc`` en memoria, baratas incluso a plena carga.
+
+Consultas SQL por petición: los eventos de SQLAlchemy acumulan número de
+sentencias, tiempo total y sentencias lentas en un objeto guardado en un
+``ContextVar``. El middleware lo crea al inicio de cada petición; como anyio
+copia el contexto al threadpool, las rutas síncronas escriben en el mismo
+objeto. Al terminar se publican histogramas etiquetados por ruta y,
+opcionalmente, la cabecera ``Server-Timing``.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from prometheus_client import Counter, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+
+logger = logging.getLogger("planetas.sql")
+
+DB_STATEMENTS = Histogram(
+    "planetas_db_statements_per_request",
+    "Sentencias SQL ejecutadas por petición",
+    ["method", "handler"],
+    buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50),
+)
+DB_TIME = Histogram(
+    "planetas_db_time_per_request_seconds",
+    "Tiempo total en la base de datos por petición",
+    ["method", "handler"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+DB_SLOW_STATEMENTS = Counter(
+    "planetas_db_slow_statements_total",
+    "Sentencias SQL que superan SLOW_QUERY_THRESHOLD_MS",
+    ["method", "handler"],
+)
+
+DB_STATEMENT_DURATION = Histogram(
+    "planetas_db_statement_duration_seconds",
+    "Duración de cada sentencia SQL por tipo",
+    ["operation"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+DB_COMMIT_DURATION = Histogram(
+    "planetas_db_commit_seconds",
+    "Duración de los commits de sesión (flush incluido)",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+AUTH_PASSWORD_VERIFY = Histogram(
+    "planetas_auth_password_verify_seconds",
+    "Tiempo de verificación de contraseña (bcrypt)",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1, 2),
+)
+AUTH_JWT_DECODE = Histogram(
+    "planetas_auth_jwt_decode_seconds",
+    "Tiempo de verificación y decodificación del JWT",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01),
+)
+PLANETA_OPERATIONS = Counter(
+    "planetas_operations_total",
+    "Planetas creados, actualizados o eliminados, por tipo",
+    ["operation", "tipo"],
+)
+
+
+_STATEMENT_KINDS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+
+def _statement_kind(statement: str) -> str:
+    keyword = statement.lstrip()[:6].upper()
+    return keyword if keyword in _STATEMENT_KINDS else "OTHER"
+
+
+def record_planeta_operation(operation: str, tipo) -> None:
+    PLANETA_OPERATIONS.labels(operation, getattr(tipo, "value", tipo) or "desconocido").inc()
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_time: float = 0.0
+    slow: List[str] = field(default_factory=list)
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _query_stats.get()
+
+
+@contextmanager
+def track_queries():
+    """Acumula las sentencias ejecutadas dentro del bloque (también fuera de una petición)."""
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    DB_STATEMENT_DURATION.labels(_statement_kind(statement)).observe(elapsed)
+    is_slow = elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.total_time += elapsed
+        if is_slow:
+            stats.slow.append(statement)
+    if is_slow:
+        logger.warning("Consulta lenta (%.1f ms): %s", elapsed * 1000, statement)
+
+
+def _handle_error(context):
+    # Una sentencia fallida no llega a after_cursor_execute: sin esto su inicio quedaría en la
+    # conexión del pool y la siguiente sentencia se mediría desde ese instante
+    connection = context.connection
+    if connection is not None and connection.info.get("query_start_time"):
+        connection.info["query_start_time"].pop()
+
+
+def _before_commit(session):
+    session.info["commit_start_time"] = time.perf_counter()
+
+
+def _after_commit(session):
+    start = session.info.pop("commit_start_time", None)
+    if start is not None:
+        DB_COMMIT_DURATION.observe(time.perf_counter() - start)
+
+
+def install_query_instrumentation() -> None:
+    """Registra los eventos a nivel de ``Engine``/``Session`` (cubre también los motores de pruebas)."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+        event.listen(Session, "before_commit", _before_commit)
+        event.listen(Session, "after_commit", _after_commit)
+
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class QueryMetricsMiddleware:
+    """Middleware ASGI que publica las métricas SQL de cada petición."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and settings.SERVER_TIMING_ENABLED:
+                total_ms = (time.perf_counter() - start) * 1000
+                db_ms = stats.total_time * 1000
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={db_ms:.2f};desc="{stats.count} queries", app;dur={total_ms - db_ms:.2f}'
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _query_stats.reset(token)
+            labels = (scope["method"], route_label(scope))
+            DB_STATEMENTS.labels(*labels).observe(stats.count)
+            DB_TIME.labels(*labels).observe(stats.total_time)
+            if stats.slow:
+                DB_SLOW_STATEMENTS.labels(*labels).inc(len(stats.slow))
@@ -0,0 +1,122 @@
+"""
+Índice exacto de nombres de planetas por worker.
+
+Antes de crear o renombrar un planeta se comprueba si el nombre existe. Con
+el índice cargado (al arrancar, ``NAME_INDEX_ENABLED``) esa comprobación se
+resuelve en memoria en el caso habitual:
+
+- Nombre ausente: se omite el SELECT. Si otro worker acaba de crearlo y el
+  índice aún no lo sabe, la restricción ``UNIQUE`` de la tabla sigue siendo la
+  garantía final (IntegrityError → 409).
+- Nombre presente: solo es una pista y se confirma con el SELECT de siempre,
+  que ve lo que la transacción en curso ya ha hecho. Así un lote
+  ``[borrar Tierra, crear Tierra]`` o un renombrado seguido de un alta con el
+  nombre antiguo no reciben un 409 falso, ni tampoco un planeta borrado o
+  renombrado en otro worker que el índice aún no conozca.
+
+Las escrituras del propio worker actualizan el índice al confirmarse y las de
+otros workers llegan leyendo ``planeta_changes`` desde el último token visto,
+como mucho cada ``NAME_INDEX_MAX_STALENESS_MS`` y en una sesión propia para
+no ver cambios sin confirmar. Mientras no se cargue (por ejemplo en las
+pruebas, que no ejecutan el lifespan) no responde nada y se usa el SELECT.
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+from prometheus_client import Counter
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.changelog import committed_changes
+from app.core.database import IN_CLAUSE_CHUNK_SIZE
+from app.models.planeta import Planeta
+from app.models.planeta_change import PlanetaChange
+
+NAME_INDEX_LOOKUPS = Counter(
+    "planetas_name_index_lookups_total",
+    "Comprobaciones de nombre resueltas en memoria, por resultado",
+    ["result"],
+)
+
+
+class NameIndex:
+
+    def __init__(self):
+        self.loaded = False
+        self._ids: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+        self._cursor = 0
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()  # una sola sincronización a la vez
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def load(self, db: Session) -> None:
+        # El token se lee antes que los nombres: lo que cambie entre ambas consultas se reaplica al sincronizar
+        cursor = db.query(func.max(PlanetaChange.id)).scalar() or 0
+        rows = db.query(Planeta.id, Planeta.nombre).all()
+        with self._lock:
+            self._names = {row.id: row.nombre for row in rows}
+            self._ids = {row.nombre: row.id for row in rows}
+            self._cursor = cursor
+            self._synced_at = time.monotonic()
+            self.loaded = True
+
+    def _set(self, planeta_id: int, nombre: Optional[str]) -> None:
+        old = self._names.pop(planeta_id, None)
+        if old is not None and self._ids.get(old) == planeta_id:
+            del self._ids[old]
+        if nombre is not None:
+            self._names[planeta_id] = nombre
+            self._ids[nombre] = planeta_id
+
+    def record(self, planeta_id: int, nombre: Optional[str]) -> None:
+        """Refleja una escritura confirmada en este worker (``nombre=None`` para una baja)."""
+        if self.loaded:
+            with self._lock:
+                self._set(planeta_id, nombre)
+
+    def sync(self, db: Session) -> None:
+        """Aplica los cambios de ``planeta_changes`` posteriores al último token visto."""
+        with self._sync_lock:
+            self._sync(db)
+
+    def _sync(self, db: Session) -> None:
+        with self._lock:
+            cursor = self._cursor
+        # Sin pasar de un id que pueda seguir sin confirmar: el token no lo volvería a leer
+        changes = committed_changes(db, cursor)
+        current: Dict[int, str] = {}
+        changed_ids = list({c.planeta_id for c in changes})
+        for start in range(0, len(changed_ids), IN_CLAUSE_CHUNK_SIZE):
+            chunk = changed_ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+            current.update(db.query(Planeta.id, Planeta.nombre).filter(Planeta.id.in_(chunk)).all())
+        with self._lock:
+            for planeta_id in changed_ids:
+                self._set(planeta_id, current.get(planeta_id))
+            if changes:
+                self._cursor = max(self._cursor, changes[-1].id)
+            self._synced_at = time.monotonic()
+
+    def contains(self, db: Session, nombre: str, max_staleness: float) -> Optional[bool]:
+        """``True``/``False`` si el índice puede responder; ``None`` si no está cargado."""
+        if not self.loaded:
+            return None
+        # Solo un hilo sincroniza (con una segunda conexión del pool); el resto responde
+        # con lo que ya hay en lugar de esperar o pedir otra conexión a la vez
+        if time.monotonic() - self._synced_at > max_staleness and self._sync_lock.acquire(blocking=False):
+            try:
+                # Sesión propia: la de la petición puede tener cambios aún sin confirmar
+                with Session(bind=db.get_bind()) as committed:
+                    self._sync(committed)
+            finally:
+                self._sync_lock.release()
+        present = nombre in self._ids
+        NAME_INDEX_LOOKUPS.labels("present" if present else "absent").inc()
+        return present
+
+
+planeta_names = NameIndex()
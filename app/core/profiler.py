@@ -0,0 +1,163 @@
+"""
+Profiler por muestreo de pila para diagnosticar latencia dentro de un worker.
+
+Un hilo en segundo plano lee ``sys._current_frames()`` cada ``interval``
+segundos y cuenta las pilas vistas. El resultado se exporta en formato
+"collapsed" (``marco1;marco2;marco3 N``), compatible con flamegraph.pl,
+speedscope e inferno. No requiere dependencias ni instrumentar el código.
+"""
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    return f"{code.co_name} ({filename}:{frame.f_lineno})".replace(";", ":")
+
+
+class SamplingProfiler:
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self._stacks.most_common())
+
+
+# Solo un perfil global a la vez por worker: el muestreo tiene coste
+_profile_lock = threading.Lock()
+
+
+def try_acquire_profiler() -> bool:
+    return _profile_lock.acquire(blocking=False)
+
+
+def release_profiler() -> None:
+    _profile_lock.release()
+
+
+class _RecentProfiles:
+    """Últimos perfiles de peticiones individuales, limitados en número."""
+
+    def __init__(self, max_items: int = 20):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, collapsed: str) -> str:
+        profile_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._items[profile_id] = collapsed
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[str]:
+        with self._lock:
+            return self._items.get(profile_id)
+
+
+recent_profiles = _RecentProfiles()
+
+
+def _is_admin_request(scope) -> bool:
+    """Token ADMIN válido según sus claims (sin consultar la base de datos)."""
+    from fastapi import HTTPException
+
+    from app.core.security import decode_token
+
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    if not authorization.lower().startswith("bearer "):
+        return False
+    try:
+        return decode_token(authorization[7:]).get("role") == "ADMIN"
+    except HTTPException:
+        return False
+
+
+class RequestProfilerMiddleware:
+    """
+    Perfila una petición concreta de extremo a extremo si trae la cabecera
+    ``X-Profile: 1``, ``PROFILING_ENABLED`` está activo y la envía un ADMIN.
+
+    Se muestrean todos los hilos del worker mientras dura la petición, así que
+    conviene usarlo con poca concurrencia. La respuesta incluye ``X-Profile-Id``
+    para descargar las pilas desde ``GET /admin/profile/requests/{id}``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not settings.PROFILING_ENABLED
+            or (b"x-profile", b"1") not in scope["headers"]
+            or not _is_admin_request(scope)
+            or not try_acquire_profiler()
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = SamplingProfiler(settings.PROFILING_INTERVAL_MS / 1000).start()
+        start = time.perf_counter()
+        profile_id = None
+
+        async def send_with_profile(message):
+            nonlocal profile_id
+            if message["type"] == "http.response.start" and profile_id is None:
+                profiler.stop()
+                profile_id = recent_profiles.add(profiler.collapsed())
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Profile-Id", profile_id)
+                headers.append("X-Profile-Samples", str(profiler.samples))
+                headers.append("X-Profile-Duration-Ms", f"{(time.perf_counter() - start) * 1000:.1f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            profiler.stop()
+            release_profiler()
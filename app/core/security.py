@@ -1,24 +1,148 @@
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 from app.core.config import settings
+from app.core.keys import get_keyring
+from app.core.monitoring import AUTH_JWT_DECODE, AUTH_PASSWORD_VERIFY
 from app.models.user import User
-from app.core.database import get_db
+from app.core.database import get_db, get_stream_db
+
+# passlib y jose (que arrastra cryptography) se importan al primer uso: reduce el arranque en frío
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+def _rounds_policy(scheme: str, rounds: Optional[int], tolerance: bool = False) -> dict:
+    """
+    Opciones de passlib para fijar las rondas; los hashes con otro coste quedan marcados para rehash.
+
+    Con ``tolerance`` se acepta un margen (±1 ronda en bcrypt, ±10 % en los
+    esquemas lineales): dos workers que calibran con mediciones algo distintas
+    no se rehashean los hashes el uno al otro en cada login.
+    """
+    if not rounds:
+        return {}
+    margin = 0
+    if tolerance:
+        from passlib.registry import get_crypt_handler
+
+        margin = 1 if get_crypt_handler(scheme).rounds_cost == "log2" else max(1, rounds // 10)
+    return {
+        f"{scheme}__default_rounds": rounds,
+        f"{scheme}__min_desired_rounds": rounds - margin,
+        f"{scheme}__max_desired_rounds": rounds + margin,
+    }
+
+
+def build_pwd_context(rounds: Optional[int] = None) -> "CryptContext":
+    from passlib.context import CryptContext
+
+    schemes = settings.get_password_hash_schemes()
+    return CryptContext(schemes=schemes, deprecated="auto", **_rounds_policy(schemes[0], rounds))
+
+
+_pwd_context: Optional["CryptContext"] = None
+_pwd_context_lock = threading.Lock()
+
+
+def get_pwd_context() -> "CryptContext":
+    """Contexto global de passlib, construido la primera vez que se necesita."""
+    global _pwd_context
+    if _pwd_context is None:
+        with _pwd_context_lock:
+            if _pwd_context is None:
+                _pwd_context = build_pwd_context(settings.PASSWORD_HASH_ROUNDS)
+    return _pwd_context
+
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+# bcrypt libera el GIL, así que los hashes en lote escalan con los núcleos disponibles
+password_hash_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 2, thread_name_prefix="pwd-hash")
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with AUTH_PASSWORD_VERIFY.time():
+        return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+
+def hash_passwords(passwords: Iterable[str]) -> List[str]:
+    """Hashea varias contraseñas en paralelo conservando el orden."""
+    return list(password_hash_executor.map(get_password_hash, passwords))
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True si el hash usa un esquema obsoleto o un número de rondas distinto al configurado."""
+    try:
+        return get_pwd_context().needs_update(hashed_password)
+    except ValueError:
+        return False
+
+
+def calibrate_password_rounds(target_ms: int, scheme: Optional[str] = None) -> Optional[int]:
+    """
+    Busca el número de rondas cuyo hash tarda como máximo ``target_ms`` en este hardware.
+
+    Para esquemas de coste logarítmico (bcrypt) cada ronda duplica el tiempo;
+    para los lineales (pbkdf2, sha512_crypt) se escala desde una medición.
+    """
+    from passlib.registry import get_crypt_handler
+
+    handler = get_crypt_handler(scheme or settings.get_password_hash_schemes()[0])
+    if "rounds" not in getattr(handler, "setting_kwds", ()):
+        return None
+
+    def measure(rounds: int) -> float:
+        start = time.perf_counter()
+        handler.using(rounds=rounds).hash("calibracion")
+        return (time.perf_counter() - start) * 1000
+
+    # La primera llamada incluye la carga del backend; no cuenta para la medición
+    measure(handler.min_rounds if handler.rounds_cost == "log2" else 1)
+
+    if handler.rounds_cost == "log2":
+        rounds = max(handler.min_rounds, 4)
+        elapsed = measure(rounds)
+        while rounds < handler.max_rounds and elapsed * 2 <= target_ms:
+            rounds += 1
+            elapsed *= 2
+        return rounds
+
+    base = handler.default_rounds
+    rounds = int(base * target_ms / max(measure(base), 0.001))
+    return max(handler.min_rounds, min(rounds, handler.max_rounds))
+
+
+def configure_password_hashing() -> None:
+    """
+    Aplica la calibración de rondas al contexto global (se invoca al arrancar).
+
+    En producción ``app.launcher`` calibra una sola vez y pasa el resultado a
+    todos los workers en ``PASSWORD_HASH_ROUNDS``; esto solo se ejecuta si el
+    worker arranca por su cuenta (uvicorn, tests) con la calibración activada.
+    """
+    if not settings.PASSWORD_HASH_CALIBRATE or settings.PASSWORD_HASH_ROUNDS:
+        return
+    scheme = settings.get_password_hash_schemes()[0]
+    rounds = calibrate_password_rounds(settings.PASSWORD_HASH_TARGET_MS, scheme)
+    if rounds:
+        get_pwd_context().update(**_rounds_policy(scheme, rounds, tolerance=True))
+        print(f"🔐 Hash de contraseñas calibrado: {scheme} con {rounds} rondas (~{settings.PASSWORD_HASH_TARGET_MS} ms)")
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -28,15 +152,44 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
+    from jose import jwt
+
+    keyring = get_keyring()
+    if keyring.is_asymmetric:
+        signing_key = keyring.signing_key()
+        return jwt.encode(
+            to_encode, signing_key.private, algorithm=settings.ALGORITHM, headers={"kid": signing_key.kid}
+        )
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
+def create_refresh_token() -> str:
+    """Genera un refresh token opaco (no es un JWT)."""
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    """HMAC-SHA256 del refresh token; es lo único que se guarda en la base de datos."""
+    return hmac.new(settings.SECRET_KEY.encode(), token.encode(), hashlib.sha256).hexdigest()
+
+
+@AUTH_JWT_DECODE.time()
 def decode_token(token: str) -> dict:
+    from jose import JWTError, jwt
+    from jose.exceptions import JWKError
+
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        keyring = get_keyring()
+        key = settings.SECRET_KEY
+        if keyring.is_asymmetric:
+            key = keyring.verification_key(jwt.get_unverified_header(token).get("kid"))
+            if key is None:
+                raise JWTError("Unknown key id")
+        payload = jwt.decode(token, key, algorithms=[settings.ALGORITHM])
         return payload
-    except JWTError:
+    except (JWTError, JWKError, ValueError):
+        # Un kid desconocido recarga el directorio de llaves: un PEM inválido no debe dar un 500
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -44,42 +197,109 @@ def decode_token(token: str) -> dict:
         )
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    token = credentials.credentials
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """Datos mínimos del usuario autenticado; se pueden cachear entre peticiones."""
+    id: int
+    username: str
+    role: str
+
+
+_user_cache: Dict[str, Tuple[float, AuthenticatedUser]] = {}
+_user_cache_lock = threading.Lock()
+
+
+# Sentencia construida una vez: cada fallo de caché solo cambia el parámetro y
+# SQLAlchemy reutiliza la compilación; se leen solo las columnas necesarias
+_user_by_username = (
+    select(User.id, User.username, User.role, User.is_active)
+    .where(User.username == bindparam("username"))
+    .limit(1)
+)
+
+
+def _load_authenticated_user(db: Session, username: str) -> Optional[AuthenticatedUser]:
+    user = db.execute(_user_by_username, {"username": username}).first()
+    # Un usuario desactivado se trata como inexistente (401), igual que en /auth/refresh
+    if user is None or user.is_active is False:
+        return None
+    return AuthenticatedUser(id=user.id, username=user.username, role=user.role)
+
+
+def clear_user_cache() -> None:
+    with _user_cache_lock:
+        _user_cache.clear()
+
+
+async def authorize(token: str, roles: Tuple[str, ...], db: Session) -> AuthenticatedUser:
+    """
+    Valida el token y el rol (claim ``role``) antes de tocar la base de datos.
+
+    La existencia del usuario (activo) se confirma con una caché por worker de
+    ``AUTH_USER_CACHE_TTL_SECONDS``; solo en un fallo de caché se usa la sesión
+    (que se abre en ese momento) y la consulta se ejecuta en el threadpool. Un
+    cambio de rol o una desactivación tarda como mucho ese TTL en aplicarse.
+    """
     payload = decode_token(token)
     username: str = payload.get("sub")
-    
     if username is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
+    if roles and payload.get("role") not in roles:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Not enough permissions. {' or '.join(roles).title()} role required."
         )
-    
-    return user
 
+    now = time.monotonic()
+    cached = _user_cache.get(username)
+    if cached and cached[0] > now:
+        user = cached[1]
+    else:
+        user = await run_in_threadpool(_load_authenticated_user, db, username)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if settings.AUTH_USER_CACHE_TTL_SECONDS > 0:
+            with _user_cache_lock:
+                _user_cache[username] = (now + settings.AUTH_USER_CACHE_TTL_SECONDS, user)
 
-async def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
-    if current_user.role != "ADMIN":
+    # El rol del token puede haber quedado desactualizado
+    if roles and user.role not in roles:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions. Admin role required."
+            detail=f"Not enough permissions. {' or '.join(roles).title()} role required."
         )
-    return current_user
+    return user
 
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
-    if not current_user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
+def require_roles(*roles: str):
+    """Construye una dependencia de autorización por roles (ver ``authorize``)."""
+    async def dependency(
+        credentials: HTTPAuthorizationCredentials = Depends(security),
+        db: Session = Depends(get_db)
+    ) -> AuthenticatedUser:
+        return await authorize(credentials.credentials, roles, db)
+
+    return dependency
+
+
+require_user = require_roles()
+require_admin = require_roles("ADMIN")
+
+
+async def require_admin_stream(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_stream_db)
+) -> AuthenticatedUser:
+    """Como ``require_admin`` para conexiones y peticiones largas (streams, perfilado): la conexión vuelve al pool tras autorizar."""
+    try:
+        return await authorize(credentials.credentials, ("ADMIN",), db)
+    finally:
+        db.close()
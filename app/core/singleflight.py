@@ -0,0 +1,74 @@
+"""
+Coalescencia de lecturas idénticas concurrentes ("single-flight").
+
+Si llegan a la vez muchas peticiones con la misma clave (por ejemplo
+``GET /planetas/?skip=0&limit=100``), solo la primera (líder) ejecuta la
+consulta y la serialización; las demás esperan a que termine y reutilizan el
+mismo resultado, o la misma excepción. No es una caché: en cuanto el líder
+termina la clave se olvida y la siguiente petición vuelve a consultar, así
+que como mucho se comparte un resultado tan antiguo como la consulta en curso.
+
+Las rutas síncronas corren en el threadpool, por eso la coordinación se hace
+con hilos. Ratio de coalescencia en Prometheus::
+
+    sum(rate(planetas_singleflight_calls_total{role="follower"}[5m]))
+      / sum(rate(planetas_singleflight_calls_total[5m]))
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from prometheus_client import Counter
+
+SINGLEFLIGHT_CALLS = Counter(
+    "planetas_singleflight_calls_total",
+    "Lecturas atendidas como líder (ejecutan la consulta) o seguidor (comparten el resultado)",
+    ["group", "role"],
+)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+
+    def __init__(self, group: str):
+        self.group = group
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Ejecuta ``fn`` una sola vez por clave en vuelo; devuelve ``(resultado, compartido)``."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            SINGLEFLIGHT_CALLS.labels(self.group, "follower").inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        SINGLEFLIGHT_CALLS.labels(self.group, "leader").inc()
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, call.followers > 0
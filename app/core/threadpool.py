@@ -0,0 +1,151 @@
+"""
+Visibilidad y protección del threadpool de anyio que ejecutan las rutas ``def``.
+
+- ``threadpool_slot`` envuelve la primera dependencia síncrona de cada petición
+  (``get_db``) y mide cuánto esperó la petición hasta obtener un hilo.
+- ``instrument_sync_routes`` envuelve el endpoint de cada ruta ``def`` para
+  medir, dentro del propio hilo, cuánto tiempo lo retiene (media móvil
+  exponencial). Las esperas async y el cierre de dependencias no cuentan.
+- ``ThreadpoolSheddingMiddleware`` publica ocupación y cola del limitador al
+  llegar y al terminar cada petición (así los gauges vuelven a 0 cuando cesa
+  el tráfico) y, si ``THREADPOOL_QUEUE_DEADLINE_MS`` > 0, responde 503 de
+  inmediato cuando la espera estimada (``tareas en cola / hilos × tiempo medio
+  retenido``) supera ese plazo, en lugar de encolar la petición sin límite.
+"""
+import asyncio
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from anyio import to_thread
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import settings
+
+THREADPOOL_IN_USE = Gauge(
+    "planetas_threadpool_tokens_in_use",
+    "Hilos del threadpool ocupados",
+    multiprocess_mode="livesum",
+)
+THREADPOOL_QUEUE_DEPTH = Gauge(
+    "planetas_threadpool_queue_depth",
+    "Tareas esperando un hilo del threadpool",
+    multiprocess_mode="livesum",
+)
+THREADPOOL_WAIT = Histogram(
+    "planetas_threadpool_wait_seconds",
+    "Espera de la petición hasta obtener un hilo del threadpool",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+THREADPOOL_SHED = Counter(
+    "planetas_threadpool_shed_total",
+    "Peticiones rechazadas con 503 por espera estimada excesiva en el threadpool",
+)
+
+_EXEMPT_PATHS = ("/health", "/metrics")
+_EWMA_ALPHA = 0.2
+
+_request_arrival: ContextVar[Optional[float]] = ContextVar("request_arrival", default=None)
+
+
+class _HoldTime:
+    """Media móvil exponencial del tiempo que una petición retiene un hilo."""
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.value = seconds if self.value == 0.0 else self.value + _EWMA_ALPHA * (seconds - self.value)
+
+
+hold_time = _HoldTime()
+
+
+@contextmanager
+def threadpool_slot():
+    """Registra la espera de la petición hasta obtener su primer hilo."""
+    arrival = _request_arrival.get()
+    if arrival is not None:
+        THREADPOOL_WAIT.observe(time.perf_counter() - arrival)
+    yield
+
+
+def timed_in_thread(fn: Callable) -> Callable:
+    """Envuelve una función que se ejecuta en el threadpool para medir cuánto retiene el hilo."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            hold_time.observe(time.perf_counter() - start)
+    return wrapper
+
+
+def instrument_sync_routes(app) -> None:
+    """Mide el tiempo retenido del hilo en todas las rutas ``def`` (llamar tras registrar las rutas)."""
+    from fastapi.routing import APIRoute
+
+    for route in app.routes:
+        if isinstance(route, APIRoute) and not asyncio.iscoroutinefunction(route.dependant.call):
+            if not hasattr(route.dependant.call, "__wrapped__"):
+                route.dependant.call = timed_in_thread(route.dependant.call)
+
+
+def estimated_wait(tasks_waiting: int, total_tokens: float) -> float:
+    if tasks_waiting <= 0 or not total_tokens:
+        return 0.0
+    return tasks_waiting / total_tokens * hold_time.value
+
+
+def publish_statistics(limiter):
+    stats = limiter.statistics()
+    THREADPOOL_IN_USE.set(stats.borrowed_tokens)
+    THREADPOOL_QUEUE_DEPTH.set(stats.tasks_waiting)
+    return stats
+
+
+class ThreadpoolSheddingMiddleware:
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limiter = to_thread.current_default_thread_limiter()
+        stats = publish_statistics(limiter)
+
+        deadline_ms = settings.THREADPOOL_QUEUE_DEADLINE_MS
+        if deadline_ms > 0 and scope["path"] not in _EXEMPT_PATHS:
+            wait = estimated_wait(stats.tasks_waiting, stats.total_tokens)
+            if wait * 1000 > deadline_ms:
+                THREADPOOL_SHED.inc()
+                await send({
+                    "type": "http.response.start",
+                    "status": 503,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"retry-after", str(max(1, math.ceil(wait))).encode()),
+                    ],
+                })
+                await send({
+                    "type": "http.response.body",
+                    "body": b'{"detail":"Servidor saturado, reintente en unos segundos"}',
+                })
+                return
+
+        token = _request_arrival.set(time.perf_counter())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_arrival.reset(token)
+            publish_statistics(limiter)
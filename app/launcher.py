@@ -0,0 +1,157 @@
+"""
+Lanzador de producción: calcula el plan de concurrencia y arranca gunicorn.
+
+Workers, tokens del threadpool (el ``CapacityLimiter`` de anyio que usan las
+rutas ``def``) y pool de conexiones se calculan juntos a partir de las CPU y la
+memoria disponibles (respetando los límites del cgroup del contenedor) y de
+``Settings``, de modo que ``workers × (pool + overflow)`` nunca supere
+``DB_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS`` y cada worker no tenga más
+hilos que conexiones (un hilo sin conexión solo espera en ``pool_timeout``).
+
+Uso:
+    python -m app.launcher            # calcula el plan, lo muestra y ejecuta gunicorn
+    python -m app.launcher --dry-run  # solo muestra el plan
+"""
+import argparse
+import json
+import os
+import sys
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from app.core.config import Settings, settings
+
+@dataclass(frozen=True)
+class LaunchPlan:
+    cpus: int
+    memory_mb: Optional[int]
+    workers: int
+    threadpool_tokens: int
+    db_pool_size: int
+    db_max_overflow: int
+    db_connections_total: int
+    db_connection_limit: Optional[int]
+
+    def as_env(self) -> dict:
+        return {
+            "WEB_CONCURRENCY": str(self.workers),
+            "THREADPOOL_TOKENS": str(self.threadpool_tokens),
+            "DB_POOL_SIZE": str(self.db_pool_size),
+            "DB_MAX_OVERFLOW": str(self.db_max_overflow),
+        }
+
+
+def _read_first_line(path: str) -> Optional[str]:
+    try:
+        with open(path) as fh:
+            return fh.readline().strip()
+    except OSError:
+        return None
+
+
+def available_cpus() -> int:
+    """CPUs utilizables, teniendo en cuenta afinidad y cuota del cgroup v2."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    quota = _read_first_line("/sys/fs/cgroup/cpu.max")
+    if quota and not quota.startswith("max"):
+        limit, period = quota.split()
+        cpus = min(cpus, max(1, int(int(limit) / int(period))))
+    return max(1, cpus)
+
+
+def available_memory_mb() -> Optional[int]:
+    """Memoria disponible: límite del cgroup (v2 o v1) o memoria física."""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        value = _read_first_line(path)
+        if value and value.isdigit() and int(value) < 1 << 60:
+            return int(value) // (1024 * 1024)
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def compute_plan(config: Settings, cpus: int, memory_mb: Optional[int]) -> LaunchPlan:
+    # Workers: 2 × CPU + 1 (regla habitual de gunicorn), limitado por memoria
+    workers = config.WEB_CONCURRENCY or 2 * cpus + 1
+    if not config.WEB_CONCURRENCY and memory_mb:
+        workers = min(workers, max(1, memory_mb // config.WORKER_MEMORY_MB))
+
+    pool_size = config.DB_POOL_SIZE or 5
+    max_overflow = config.DB_MAX_OVERFLOW
+
+    connection_limit = None
+    if not config.DATABASE_URL.startswith("sqlite"):
+        connection_limit = max(1, config.DB_MAX_CONNECTIONS - config.DB_RESERVED_CONNECTIONS)
+        # Cada worker necesita al menos una conexión
+        workers = min(workers, connection_limit)
+        per_worker = connection_limit // workers
+        pool_size = max(1, min(pool_size, per_worker))
+        max_overflow = max(0, min(max_overflow, per_worker - pool_size))
+
+    # Hilos = conexiones del worker: THREADPOOL_TOKENS solo puede reducirlo
+    connections_per_worker = pool_size + max_overflow
+    threadpool_tokens = min(config.THREADPOOL_TOKENS or connections_per_worker, connections_per_worker)
+
+    return LaunchPlan(
+        cpus=cpus,
+        memory_mb=memory_mb,
+        workers=workers,
+        threadpool_tokens=threadpool_tokens,
+        db_pool_size=pool_size,
+        db_max_overflow=max_overflow,
+        db_connections_total=workers * (pool_size + max_overflow),
+        db_connection_limit=connection_limit,
+    )
+
+
+def password_rounds_env(config: Settings) -> dict:
+    """
+    Calibra las rondas del hash de contraseñas una sola vez para todos los
+    workers. Si cada worker calibrase por su cuenta podrían obtener rondas
+    distintas y rehashear en cada login lo que otro worker acaba de guardar.
+    """
+    if not config.PASSWORD_HASH_CALIBRATE or config.PASSWORD_HASH_ROUNDS:
+        return {}
+    from app.core.security import calibrate_password_rounds
+
+    rounds = calibrate_password_rounds(config.PASSWORD_HASH_TARGET_MS)
+    if not rounds:
+        return {}
+    return {"PASSWORD_HASH_ROUNDS": str(rounds), "PASSWORD_HASH_CALIBRATE": "false"}
+
+
+def describe(plan: LaunchPlan) -> str:
+    lines = [
+        f"⚙️  Plan de concurrencia: {plan.workers} workers × {plan.threadpool_tokens} hilos "
+        f"({plan.cpus} CPU, {plan.memory_mb or '?'} MB)",
+        f"   Pool de BD por worker: {plan.db_pool_size} + {plan.db_max_overflow} overflow "
+        f"→ {plan.db_connections_total} conexiones"
+        + (f" de {plan.db_connection_limit} disponibles" if plan.db_connection_limit else ""),
+    ]
+    return "\n".join(lines)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.launcher", description="Arranca gunicorn con un plan de concurrencia calculado")
+    parser.add_argument("--dry-run", action="store_true", help="Mostrar el plan sin arrancar el servidor")
+    parser.add_argument("--json", action="store_true", help="Mostrar el plan en JSON")
+    parser.add_argument("--app", default="app.main:app")
+    parser.add_argument("--config", default="gunicorn.conf.py")
+    args = parser.parse_args(argv)
+
+    plan = compute_plan(settings, available_cpus(), available_memory_mb())
+    print(json.dumps(asdict(plan)) if args.json else describe(plan), flush=True)
+    if args.dry_run:
+        return
+
+    os.environ.update(plan.as_env())
+    password_env = password_rounds_env(settings)
+    if password_env:
+        print(f"🔐 Hash de contraseñas calibrado: {password_env['PASSWORD_HASH_ROUNDS']} rondas para todos los workers", flush=True)
+        os.environ.update(password_env)
+    os.execvp("gunicorn", ["gunicorn", "-c", args.config, args.app])
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
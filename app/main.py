@@ -1,30 +1,93 @@
 from contextlib import asynccontextmanager
+from anyio import to_thread
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
-from sqlalchemy.exc import IntegrityError
-from app.api import auth, planetas
-
-# --- MONITOREO ---
-from prometheus_fastapi_instrumentator import Instrumentator
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.api import auth, batch, jwks, planetas
+from app.core.admission import AdmissionControlMiddleware
+from app.core.cdn import get_purger
+from app.core.config import settings
+from app.core.events import get_broker
+from app.core.idempotency import IdempotencyMiddleware, get_idempotency_store
+from app.core.database import SessionLocal
+from app.core.keys import get_keyring
+from app.core.name_index import planeta_names
+from app.core.monitoring import QueryMetricsMiddleware
+from app.core.profiler import RequestProfilerMiddleware
+from app.core.threadpool import ThreadpoolSheddingMiddleware, instrument_sync_routes
+from app.core.security import configure_password_hashing
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manejador del ciclo de vida de la aplicación."""
     print("🚀 Iniciando aplicación en Docker...")
+    configure_password_hashing()
+    get_keyring()  # falla al arrancar si las llaves JWT no son válidas
+    # Igual con CACHE_PURGER e IDEMPOTENCY_STORE: si no, el error saltaría tras confirmar la primera escritura
+    get_purger()
+    if settings.IDEMPOTENCY_ENABLED:
+        get_idempotency_store()
+    limiter = to_thread.current_default_thread_limiter()
+    if settings.THREADPOOL_TOKENS:
+        limiter.total_tokens = settings.THREADPOOL_TOKENS
+    print(f"⚙️  Threadpool: {limiter.total_tokens} hilos")
+    if settings.NAME_INDEX_ENABLED:
+        try:
+            with SessionLocal() as db:
+                planeta_names.load(db)
+            print(f"📇 Índice de nombres: {len(planeta_names)} planetas")
+        except SQLAlchemyError as exc:
+            # Sin índice se sigue comprobando el nombre con un SELECT
+            print(f"⚠️  Índice de nombres no disponible: {exc.__class__.__name__}")
     yield
+    await get_broker().stop()
     print("👋 Apagando aplicación...")
 
+# En producción la documentación se desactiva: el esquema OpenAPI no se genera nunca
+docs_enabled = settings.docs_enabled()
+
 app = FastAPI(
     title="Sistema de Gestión de Planetas",
     description="API REST para la gestión de planetas con monitoreo y pruebas de carga.",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    docs_url="/docs" if docs_enabled else None,
+    redoc_url="/redoc" if docs_enabled else None,
+    openapi_url="/openapi.json" if docs_enabled else None,
 )
 
+# --- CONFIGURACIÓN DE MONITOREO (Prometheus) ---
+# Buckets ajustados a los SLO y gauge de peticiones en curso por worker
+if settings.METRICS_ENABLED:
+    from prometheus_fastapi_instrumentator import Instrumentator
+
+    Instrumentator(
+        should_instrument_requests_inprogress=True,
+        inprogress_labels=True,
+        excluded_handlers=["/metrics"],
+    ).instrument(
+        app,
+        latency_highr_buckets=settings.get_latency_buckets(),
+        # http_request_duration_seconds (el histograma por handler de dashboards y alertas) con los mismos buckets
+        latency_lowr_buckets=settings.get_latency_buckets(),
+    ).expose(app)
+# Sentencias SQL y tiempo de base de datos por petición (y Server-Timing opcional)
+app.add_middleware(QueryMetricsMiddleware)
+# Perfil de una petición concreta con la cabecera X-Profile: 1 (si PROFILING_ENABLED)
+app.add_middleware(RequestProfilerMiddleware)
+# Métricas de cola del threadpool y 503 rápido si THREADPOOL_QUEUE_DEADLINE_MS se superaría
+app.add_middleware(ThreadpoolSheddingMiddleware)
+# Límite de concurrencia adaptativo (auth / lectura / escritura); /health y /metrics exentos
+app.add_middleware(AdmissionControlMiddleware)
+# Reintentos con Idempotency-Key: se reenvía la primera respuesta sin ocupar admisión ni threadpool
+app.add_middleware(IdempotencyMiddleware)
+
 # --- CONFIGURACIÓN DE CORS ---
-# Permitir "*" es vital para que Vercel y JMeter no sean bloqueados
+# Permitir "*" es vital para que Vercel y JMeter no sean bloqueados.
+# Se registra el último (el más externo): así también los 503/409/422 que
+# generan los middlewares anteriores llevan las cabeceras CORS.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -33,10 +96,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# --- CONFIGURACIÓN DE MONITOREO (Prometheus) ---
-# Debe ir después de CORS para registrar peticiones externas
-Instrumentator().instrument(app).expose(app)
-
 # Manejadores de Excepciones (Para mejores reportes en JMeter)
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -49,16 +108,29 @@ async def integrity_exception_handler(request: Request, exc: IntegrityError):
 
 # Rutas
 app.include_router(auth.router)
+app.include_router(jwks.router)
 app.include_router(planetas.router)
+app.include_router(batch.router)
+if settings.ADMIN_ROUTES_ENABLED:
+    from app.api import admin
+
+    app.include_router(admin.router)
 
 @app.get("/", tags=["Root"])
 def root():
-    return {"message": "API de Gestión de Planetas", "docs": "/docs", "metrics": "/metrics"}
+    return {
+        "message": "API de Gestión de Planetas",
+        "docs": "/docs" if docs_enabled else None,
+        "metrics": "/metrics" if settings.METRICS_ENABLED else None,
+    }
 
 @app.get("/health", tags=["Health"])
 def health_check():
     return {"status": "healthy"}
 
+# Tiempo que cada ruta def retiene su hilo (para estimar la espera del threadpool)
+instrument_sync_routes(app)
+
 if __name__ == "__main__":
     import uvicorn
     # Se usa 0.0.0.0 para que sea accesible desde fuera del contenedor Docker
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, Text
+from app.core.database import Base
+
+
+class IdempotencyKey(Base):
+    """Primera respuesta a una petición con ``Idempotency-Key``; ``status_code`` nulo mientras está en curso."""
+    __tablename__ = "idempotency_keys"
+
+    # Hash del remitente (cabecera Authorization) + ":" + clave enviada por el cliente
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    headers = Column(Text, nullable=True)  # JSON [[nombre, valor], ...]
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), index=True, nullable=False)
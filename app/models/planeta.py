@@ -27,4 +27,4 @@ class Planeta(Base):
     estado = Column(SQLEnum(EstadoPlaneta), default=EstadoPlaneta.EN_ESTUDIO)
     fechaDescubrimiento = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), index=True)
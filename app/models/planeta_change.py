@@ -0,0 +1,21 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class PlanetaChange(Base):
+    """Registro de cambios de planetas; ``id`` es el token monotónico de sincronización."""
+    __tablename__ = "planeta_changes"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # Sin clave foránea: las bajas se conservan como tombstones tras borrar el planeta
+    planeta_id = Column(Integer, index=True, nullable=False)
+    operation = Column(String(10), nullable=False)  # "create", "update" o "delete"
+    # Se fija al insertar (cuando se asigna el id), no al confirmar; ver app.core.changelog
+    changed_at = Column(DateTime(timezone=True), default=_utcnow, server_default=func.now())
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, field_validator, ConfigDict
-from typing import Optional
+from typing import Annotated, Literal, Optional, Union
 from datetime import datetime
 from enum import Enum
 
@@ -40,11 +40,29 @@ class UserResponse(UserBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class UserBulkCreate(BaseModel):
+    users: list[UserCreate] = Field(..., min_length=1, max_length=10000)
+
+
+class UserBulkSkipped(BaseModel):
+    username: str
+    reason: str
+
+
+class UserBulkResult(BaseModel):
+    created: int
+    skipped: list[UserBulkSkipped]
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
 
 
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str = Field(..., min_length=1)
+
+
 class TokenData(BaseModel):
     username: Optional[str] = None
 
@@ -106,6 +124,60 @@ class PlanetaListResponse(BaseModel):
     planetas: list[PlanetaResponse]
 
 
+class PlanetaBatchRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=1000, description="IDs de planetas a consultar")
+
+
+class PlanetaBatchResponse(BaseModel):
+    planetas: list[PlanetaResponse] = Field(..., description="Planetas encontrados, en el orden pedido")
+    missing: list[int] = Field(..., description="IDs que no existen")
+
+
+class PlanetaChangesResponse(BaseModel):
+    upserts: list[PlanetaResponse] = Field(..., description="Planetas creados o modificados (estado actual)")
+    deleted: list[int] = Field(..., description="IDs de planetas eliminados")
+    next_token: int = Field(..., description="Token para la siguiente llamada (since)")
+    has_more: bool = Field(..., description="Quedan cambios: repetir con next_token")
+
+
+# Schemas del lote transaccional (POST /batch)
+class BatchCreateOperation(BaseModel):
+    op: Literal["create"]
+    data: PlanetaCreate
+
+
+class BatchUpdateOperation(BaseModel):
+    op: Literal["update"]
+    id: int
+    data: PlanetaUpdate
+
+
+class BatchDeleteOperation(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+
+BatchOperation = Annotated[
+    Union[BatchCreateOperation, BatchUpdateOperation, BatchDeleteOperation],
+    Field(discriminator="op"),
+]
+
+
+class BatchRequest(BaseModel):
+    operations: list[BatchOperation] = Field(..., min_length=1, max_length=500)
+
+
+class BatchOperationResult(BaseModel):
+    index: int
+    op: str
+    id: int
+    planeta: Optional[PlanetaResponse] = Field(None, description="Estado final (null si se eliminó en el lote)")
+
+
+class BatchResponse(BaseModel):
+    results: list[BatchOperationResult]
+
+
 class ErrorResponse(BaseModel):
     detail: str
 
@@ -1,10 +1,23 @@
-from datetime import timedelta
+import secrets
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from app.models.user import User
+from app.models.refresh_token import RefreshToken
 from app.schemas.schemas import UserCreate, LoginRequest
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.security import (
+    verify_password,
+    get_password_hash,
+    hash_passwords,
+    password_needs_rehash,
+    create_access_token,
+    create_refresh_token,
+    hash_refresh_token,
+)
 from app.core.config import settings
+from app.core.database import IN_CLAUSE_CHUNK_SIZE, as_naive_utc
 
 
 class AuthService:
@@ -29,20 +42,24 @@ class AuthService:
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Usuario inactivo"
             )
+        # Rehash transparente si cambió el esquema o las rondas configuradas
+        if password_needs_rehash(user.hashed_password):
+            user.hashed_password = get_password_hash(password)
+            db.commit()
         return user
     
     @staticmethod
     def create_user(db: Session, user: UserCreate) -> User:
-        # Verificar si el usuario ya existe
-        db_user = db.query(User).filter(User.username == user.username).first()
+        # Verificar en una sola consulta si el usuario o el email ya existen
+        db_user = db.query(User).filter(
+            or_(User.username == user.username, User.email == user.email)
+        ).first()
         if db_user:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="El nombre de usuario ya está registrado"
-            )
-        
-        db_email = db.query(User).filter(User.email == user.email).first()
-        if db_email:
+            if db_user.username == user.username:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="El nombre de usuario ya está registrado"
+                )
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="El email ya está registrado"
@@ -64,17 +81,80 @@ class AuthService:
         return db_user
     
     @staticmethod
-    def login(db: Session, login_data: LoginRequest) -> dict:
-        user = AuthService.authenticate_user(db, login_data.username, login_data.password)
-        
+    def create_users_bulk(db: Session, users: List[UserCreate]) -> dict:
+        """
+        Alta masiva de usuarios para seeding y aprovisionamiento.
+
+        Las existencias se comprueban con consultas IN por lotes, los hashes se
+        calculan en paralelo y todo se inserta con un único commit. Los usuarios
+        cuyo username o email ya existen (o se repiten en la entrada) se omiten.
+        """
+        skipped = []
+        candidates = []
+        seen_usernames, seen_emails = set(), set()
+        for user in users:
+            if user.username in seen_usernames or user.email in seen_emails:
+                skipped.append({"username": user.username, "reason": "duplicado en la solicitud"})
+                continue
+            seen_usernames.add(user.username)
+            seen_emails.add(user.email)
+            candidates.append(user)
+
+        existing_usernames, existing_emails = set(), set()
+        for start in range(0, len(candidates), IN_CLAUSE_CHUNK_SIZE):
+            chunk = candidates[start:start + IN_CLAUSE_CHUNK_SIZE]
+            rows = db.query(User.username, User.email).filter(or_(
+                User.username.in_([u.username for u in chunk]),
+                User.email.in_([u.email for u in chunk])
+            )).all()
+            existing_usernames.update(row.username for row in rows)
+            existing_emails.update(row.email for row in rows)
+
+        to_create = []
+        for user in candidates:
+            if user.username in existing_usernames:
+                skipped.append({"username": user.username, "reason": "el nombre de usuario ya está registrado"})
+            elif user.email in existing_emails:
+                skipped.append({"username": user.username, "reason": "el email ya está registrado"})
+            else:
+                to_create.append(user)
+
+        hashed_passwords = hash_passwords(u.password for u in to_create)
+        db.add_all([
+            User(
+                username=user.username,
+                email=user.email,
+                hashed_password=hashed_password,
+                role=user.role.value,
+                is_active=True
+            )
+            for user, hashed_password in zip(to_create, hashed_passwords)
+        ])
+        db.commit()
+
+        return {"created": len(to_create), "skipped": skipped}
+    
+    @staticmethod
+    def issue_tokens(db: Session, user: User, family: Optional[str] = None) -> dict:
+        """Emite un access token y un refresh token nuevo (guardado como hash)."""
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
             data={"sub": user.username, "role": user.role},
             expires_delta=access_token_expires
         )
-        
+
+        refresh_token = create_refresh_token()
+        db.add(RefreshToken(
+            user_id=user.id,
+            token_hash=hash_refresh_token(refresh_token),
+            family=family or secrets.token_hex(16),
+            expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        ))
+        db.commit()
+
         return {
             "access_token": access_token,
+            "refresh_token": refresh_token,
             "token_type": "bearer",
             "user": {
                 "id": user.id,
@@ -83,3 +163,70 @@ class AuthService:
                 "role": user.role
             }
         }
+
+    @staticmethod
+    def login(db: Session, login_data: LoginRequest) -> dict:
+        user = AuthService.authenticate_user(db, login_data.username, login_data.password)
+        return AuthService.issue_tokens(db, user)
+
+    @staticmethod
+    def refresh(db: Session, refresh_token: str) -> dict:
+        """
+        Rota un refresh token: revoca el presentado y emite un par nuevo.
+
+        Cuesta un HMAC y una búsqueda por índice, sin volver a ejecutar bcrypt.
+        Si se presenta un token ya revocado (posible robo), se revoca toda su familia.
+        """
+        invalid = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token inválido o expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+        now = datetime.utcnow()
+        db_token = db.query(RefreshToken).filter(
+            RefreshToken.token_hash == hash_refresh_token(refresh_token)
+        ).first()
+        if not db_token:
+            raise invalid
+
+        if db_token.revoked_at is not None:
+            AuthService._revoke_family(db, db_token.family, now)
+            db.commit()
+            raise invalid
+
+        if as_naive_utc(db_token.expires_at) <= now:
+            raise invalid
+
+        user = db.query(User).filter(User.id == db_token.user_id).first()
+        if not user or not user.is_active:
+            raise invalid
+
+        # Revocación atómica: de dos renovaciones concurrentes con el mismo token solo
+        # una actualiza la fila; la otra es una reutilización y revoca la familia
+        revoked = db.query(RefreshToken).filter(
+            RefreshToken.id == db_token.id,
+            RefreshToken.revoked_at.is_(None)
+        ).update({RefreshToken.revoked_at: now}, synchronize_session=False)
+        if revoked == 0:
+            AuthService._revoke_family(db, db_token.family, now)
+            db.commit()
+            raise invalid
+        return AuthService.issue_tokens(db, user, family=db_token.family)
+
+    @staticmethod
+    def logout(db: Session, refresh_token: str) -> dict:
+        """Revoca el refresh token y todos los obtenidos por rotación a partir de él."""
+        db_token = db.query(RefreshToken).filter(
+            RefreshToken.token_hash == hash_refresh_token(refresh_token)
+        ).first()
+        if db_token:
+            AuthService._revoke_family(db, db_token.family, datetime.utcnow())
+            db.commit()
+        return {"message": "Sesión cerrada correctamente"}
+
+    @staticmethod
+    def _revoke_family(db: Session, family: str, now: datetime) -> None:
+        db.query(RefreshToken).filter(
+            RefreshToken.family == family,
+            RefreshToken.revoked_at.is_(None)
+        ).update({RefreshToken.revoked_at: now}, synchronize_session=False)
@@ -1,20 +1,56 @@
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
-from typing import List, Optional
+import threading
+from typing import Dict, List, Optional, Tuple
+from pydantic import TypeAdapter
+from app.core.config import settings
+from app.core.cdn import COLLECTION_TAG, get_purger, planeta_tag
+from app.core.changelog import committed_changes
+from app.core.database import IN_CLAUSE_CHUNK_SIZE
+from app.core.events import get_broker
+from app.core.group_commit import GroupCommitter, GroupItem
+from app.core.monitoring import record_planeta_operation
+from app.core.name_index import planeta_names
+from app.core.singleflight import SingleFlight
 from app.models.planeta import Planeta
-from app.schemas.schemas import PlanetaCreate, PlanetaUpdate
+from app.models.planeta_change import PlanetaChange
+from app.schemas.schemas import BatchOperation, PlanetaCreate, PlanetaResponse, PlanetaUpdate
+
+_planetas_adapter = TypeAdapter(List[PlanetaResponse])
+
+# Lecturas idénticas concurrentes comparten consulta y cuerpo serializado
+planeta_reads = SingleFlight("planetas")
+
+# Consultas calientes construidas una sola vez con parámetros enlazados: cada
+# llamada solo aporta los valores y SQLAlchemy reutiliza la sentencia compilada
+# de su caché, sin volver a montar Query/filter en Python
+_planetas_page = select(Planeta).offset(bindparam("skip")).limit(bindparam("limit"))
+_planeta_by_id = select(Planeta).where(Planeta.id == bindparam("planeta_id")).limit(1)
+_planeta_by_nombre = select(Planeta).where(Planeta.nombre == bindparam("nombre")).limit(1)
+
+_write_group: Optional[GroupCommitter] = None
+_write_group_lock = threading.Lock()
 
 
 class PlanetaService:
+
+    @staticmethod
+    def _log_change(db: Session, planeta_id: int, operation: str) -> int:
+        """Añade la entrada del registro de cambios a la transacción en curso y devuelve su token."""
+        change = PlanetaChange(planeta_id=planeta_id, operation=operation)
+        db.add(change)
+        db.flush()
+        return change.id
     
     @staticmethod
     def get_all_planetas(db: Session, skip: int = 0, limit: int = 100) -> List[Planeta]:
-        return db.query(Planeta).offset(skip).limit(limit).all()
+        return db.scalars(_planetas_page, {"skip": skip, "limit": limit}).all()
     
     @staticmethod
     def get_planeta_by_id(db: Session, planeta_id: int) -> Planeta:
-        planeta = db.query(Planeta).filter(Planeta.id == planeta_id).first()
+        planeta = db.scalars(_planeta_by_id, {"planeta_id": planeta_id}).first()
         if not planeta:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -22,36 +58,156 @@ class PlanetaService:
             )
         return planeta
     
+    @staticmethod
+    def get_planetas_by_ids(db: Session, ids: List[int]) -> Tuple[List[Planeta], List[int]]:
+        """
+        Resuelve varios IDs con consultas ``IN`` por lotes. Devuelve los planetas
+        en el orden pedido (sin duplicados) y los IDs que no existen.
+        """
+        unique_ids = list(dict.fromkeys(ids))
+        found: Dict[int, Planeta] = {}
+        for start in range(0, len(unique_ids), IN_CLAUSE_CHUNK_SIZE):
+            chunk = unique_ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+            found.update((planeta.id, planeta) for planeta in db.query(Planeta).filter(Planeta.id.in_(chunk)))
+        planetas = [found[planeta_id] for planeta_id in unique_ids if planeta_id in found]
+        missing = [planeta_id for planeta_id in unique_ids if planeta_id not in found]
+        return planetas, missing
+
+    @staticmethod
+    def get_all_planetas_json(db: Session, skip: int = 0, limit: int = 100) -> bytes:
+        """Página de planetas serializada a JSON (coalescida con ``planeta_reads``)."""
+        def load() -> bytes:
+            planetas = PlanetaService.get_all_planetas(db, skip=skip, limit=limit)
+            return _planetas_adapter.dump_json(_planetas_adapter.validate_python(planetas, from_attributes=True))
+
+        if not settings.SINGLEFLIGHT_ENABLED:
+            return load()
+        body, _ = planeta_reads.do(("list", skip, limit), load)
+        return body
+
+    @staticmethod
+    def get_planeta_json(db: Session, planeta_id: int) -> bytes:
+        """Planeta serializado a JSON; el 404 también se comparte entre peticiones coalescidas."""
+        def load() -> bytes:
+            planeta = PlanetaService.get_planeta_by_id(db, planeta_id)
+            return PlanetaResponse.model_validate(planeta).model_dump_json().encode()
+
+        if not settings.SINGLEFLIGHT_ENABLED:
+            return load()
+        body, _ = planeta_reads.do(("get", planeta_id), load)
+        return body
+
+    @staticmethod
+    def get_changes(db: Session, since: int = 0, limit: int = 1000) -> Tuple[List[Planeta], List[int], int, bool]:
+        """
+        Cambios posteriores al token ``since``: (planetas actuales, IDs eliminados,
+        siguiente token, quedan más). Cuesta O(cambios), no O(tabla): se lee el
+        registro de cambios por su clave primaria y solo se cargan los planetas
+        afectados. Varios cambios del mismo planeta se resumen en el último. El
+        token no pasa de un id cuya transacción pueda seguir en curso (ver
+        ``app.core.changelog``).
+        """
+        rows = committed_changes(db, since, limit + 1)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if not rows:
+            return [], [], since, False
+
+        last_operation: Dict[int, str] = {}
+        for row in rows:
+            last_operation[row.planeta_id] = row.operation
+        upserted_ids = [pid for pid, operation in last_operation.items() if operation != "delete"]
+        planetas = (
+            db.query(Planeta).filter(Planeta.id.in_(upserted_ids)).order_by(Planeta.id).all()
+            if upserted_ids else []
+        )
+        # Un planeta borrado en un cambio posterior a esta página también se informa como eliminado
+        found = {planeta.id for planeta in planetas}
+        deleted = sorted(pid for pid in last_operation if pid not in found)
+        return planetas, deleted, rows[-1].id, has_more
+
     @staticmethod
     def get_planeta_by_nombre(db: Session, nombre: str) -> Optional[Planeta]:
-        return db.query(Planeta).filter(Planeta.nombre == nombre).first()
+        return db.scalars(_planeta_by_nombre, {"nombre": nombre}).first()
     
     @staticmethod
-    def create_planeta(db: Session, planeta: PlanetaCreate) -> Planeta:
+    def _name_taken(db: Session, nombre: str) -> bool:
+        """Un nombre ausente del índice en memoria se da por libre; el resto se comprueba con un SELECT."""
+        if planeta_names.contains(db, nombre, settings.NAME_INDEX_MAX_STALENESS_MS / 1000) is False:
+            return False
+        return PlanetaService.get_planeta_by_nombre(db, nombre) is not None
+
+    @staticmethod
+    def _stage_create(db: Session, planeta: PlanetaCreate) -> Tuple[Planeta, int]:
+        """Valida y añade el planeta a la transacción en curso, sin confirmarla."""
         # Verificar si ya existe un planeta con ese nombre
-        existing_planeta = PlanetaService.get_planeta_by_nombre(db, planeta.nombre)
-        if existing_planeta:
+        if PlanetaService._name_taken(db, planeta.nombre):
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail=f"Ya existe un planeta con el nombre '{planeta.nombre}'"
             )
-        
+
+        db_planeta = Planeta(
+            nombre=planeta.nombre,
+            tipo=planeta.tipo,
+            distanciaAlSol=planeta.distanciaAlSol,
+            numeroLunas=planeta.numeroLunas,
+            masa=planeta.masa,
+            estado=planeta.estado,
+            fechaDescubrimiento=planeta.fechaDescubrimiento
+        )
+        db.add(db_planeta)
+        db.flush()
+        return db_planeta, PlanetaService._log_change(db, db_planeta.id, "create")
+
+    @staticmethod
+    def _stage_update(db: Session, planeta_id: int, planeta_update: PlanetaUpdate) -> Tuple[Planeta, int]:
+        """Valida y aplica la actualización en la transacción en curso, sin confirmarla."""
+        db_planeta = PlanetaService.get_planeta_by_id(db, planeta_id)
+
+        # Si se está actualizando el nombre, verificar que no exista otro planeta con ese nombre
+        if planeta_update.nombre and planeta_update.nombre != db_planeta.nombre:
+            if PlanetaService._name_taken(db, planeta_update.nombre):
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Ya existe otro planeta con el nombre '{planeta_update.nombre}'"
+                )
+
+        update_data = planeta_update.model_dump(exclude_unset=True)
+        for field, value in update_data.items():
+            setattr(db_planeta, field, value)
+        return db_planeta, PlanetaService._log_change(db, db_planeta.id, "update")
+
+    @staticmethod
+    def _stage_delete(db: Session, planeta_id: int) -> Tuple[Planeta, int]:
+        """Marca el planeta para borrar en la transacción en curso, sin confirmarla."""
+        db_planeta = PlanetaService.get_planeta_by_id(db, planeta_id)
+        db.delete(db_planeta)
+        return db_planeta, PlanetaService._log_change(db, db_planeta.id, "delete")
+
+    @staticmethod
+    def _committed(operation: str, planeta: Planeta, change_id: int, exists: bool = True) -> None:
+        """Métricas y difusión del cambio, solo tras confirmar la transacción."""
+        record_planeta_operation(operation, planeta.tipo)
+        planeta_names.record(planeta.id, planeta.nombre if exists else None)
+        get_broker().publish(change_id, operation, planeta.id, planeta if exists else None)
+        get_purger().purge((COLLECTION_TAG, planeta_tag(planeta.id)))
+
+    @staticmethod
+    def create_planeta(db: Session, planeta: PlanetaCreate) -> Planeta:
+        if settings.GROUP_COMMIT_ENABLED:
+            return PlanetaService._write_group().submit(db, ("create", planeta))
+        return PlanetaService._create_and_commit(db, planeta)
+
+    @staticmethod
+    def _create_and_commit(db: Session, planeta: PlanetaCreate) -> Planeta:
         try:
-            db_planeta = Planeta(
-                nombre=planeta.nombre,
-                tipo=planeta.tipo,
-                distanciaAlSol=planeta.distanciaAlSol,
-                numeroLunas=planeta.numeroLunas,
-                masa=planeta.masa,
-                estado=planeta.estado,
-                fechaDescubrimiento=planeta.fechaDescubrimiento
-            )
-            
-            db.add(db_planeta)
+            db_planeta, change_id = PlanetaService._stage_create(db, planeta)
             db.commit()
             db.refresh(db_planeta)
-            return db_planeta
-            
+        except HTTPException:
+            db.rollback()
+            raise
         except IntegrityError:
             db.rollback()
             raise HTTPException(
@@ -64,29 +220,24 @@ class PlanetaService:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al crear el planeta: {str(e)}"
             )
+        PlanetaService._committed("create", db_planeta, change_id)
+        return db_planeta
     
     @staticmethod
     def update_planeta(db: Session, planeta_id: int, planeta_update: PlanetaUpdate) -> Planeta:
-        db_planeta = PlanetaService.get_planeta_by_id(db, planeta_id)
-        
-        # Si se está actualizando el nombre, verificar que no exista otro planeta con ese nombre
-        if planeta_update.nombre and planeta_update.nombre != db_planeta.nombre:
-            existing = PlanetaService.get_planeta_by_nombre(db, planeta_update.nombre)
-            if existing:
-                raise HTTPException(
-                    status_code=status.HTTP_409_CONFLICT,
-                    detail=f"Ya existe otro planeta con el nombre '{planeta_update.nombre}'"
-                )
-        
+        if settings.GROUP_COMMIT_ENABLED:
+            return PlanetaService._write_group().submit(db, ("update", planeta_id, planeta_update))
+        return PlanetaService._update_and_commit(db, planeta_id, planeta_update)
+
+    @staticmethod
+    def _update_and_commit(db: Session, planeta_id: int, planeta_update: PlanetaUpdate) -> Planeta:
         try:
-            update_data = planeta_update.model_dump(exclude_unset=True)
-            for field, value in update_data.items():
-                setattr(db_planeta, field, value)
-            
+            db_planeta, change_id = PlanetaService._stage_update(db, planeta_id, planeta_update)
             db.commit()
             db.refresh(db_planeta)
-            return db_planeta
-            
+        except HTTPException:
+            db.rollback()
+            raise
         except IntegrityError:
             db.rollback()
             raise HTTPException(
@@ -99,18 +250,155 @@ class PlanetaService:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al actualizar el planeta: {str(e)}"
             )
+        PlanetaService._committed("update", db_planeta, change_id)
+        return db_planeta
     
+    @staticmethod
+    def _write_group() -> GroupCommitter:
+        global _write_group
+        if _write_group is None:
+            with _write_group_lock:
+                if _write_group is None:
+                    _write_group = GroupCommitter(
+                        PlanetaService._apply_write_group,
+                        window=settings.GROUP_COMMIT_WINDOW_MS / 1000,
+                        max_items=settings.GROUP_COMMIT_MAX_OPS,
+                    )
+        return _write_group
+
+    @staticmethod
+    def _apply_write_group(db: Session, items: List[GroupItem]) -> None:
+        """
+        Aplica un grupo de altas/modificaciones con un solo commit. Los errores
+        de validación (404, 409 por nombre) solo afectan a su operación; si el
+        commit falla por integridad (p. ej. una carrera con otro worker), se
+        deshace el grupo y cada operación se repite con su propio commit para
+        que cada petición reciba su resultado correcto.
+        """
+        # Sesión propia del grupo, con el mismo motor que la petición del líder
+        session = Session(bind=db.get_bind(), autoflush=False)
+        try:
+            staged = []
+            # Nombres ya usados en este grupo: el índice de nombres aún no los conoce
+            # y un duplicado llevaría a todo el grupo al camino de un commit por operación
+            staged_names: Dict[str, int] = {}
+            try:
+                for item in items:
+                    kind, *args = item.payload
+                    nombre = args[0].nombre if kind == "create" else args[1].nombre
+                    owner = staged_names.get(nombre)
+                    if owner is not None and (kind == "create" or owner != args[0]):
+                        item.error = HTTPException(
+                            status_code=status.HTTP_409_CONFLICT,
+                            detail=f"Ya existe un planeta con el nombre '{nombre}'"
+                        )
+                        continue
+                    stage = PlanetaService._stage_create if kind == "create" else PlanetaService._stage_update
+                    try:
+                        planeta, change_id = stage(session, *args)
+                    except HTTPException as exc:
+                        item.error = exc
+                        continue
+                    staged_names[planeta.nombre] = planeta.id
+                    staged.append((item, kind, planeta.id, change_id))
+                session.commit()
+            except IntegrityError:
+                session.rollback()
+                for item in items:
+                    kind, *args = item.payload
+                    commit_one = (
+                        PlanetaService._create_and_commit if kind == "create" else PlanetaService._update_and_commit
+                    )
+                    # Una sesión por operación: otro commit en la misma sesión expiraría los resultados anteriores
+                    with Session(bind=db.get_bind(), autoflush=False) as single:
+                        try:
+                            item.result, item.error = commit_one(single, *args), None
+                        except HTTPException as exc:
+                            item.error = exc
+                return
+
+            # Estado final (valores por defecto del servidor incluidos) con una sola consulta
+            current, _ = PlanetaService.get_planetas_by_ids(session, [planeta_id for _, _, planeta_id, _ in staged])
+            current_by_id = {planeta.id: planeta for planeta in current}
+            for item, kind, planeta_id, change_id in staged:
+                item.result = current_by_id[planeta_id]
+                PlanetaService._committed(kind, item.result, change_id)
+        except HTTPException:
+            raise
+        except Exception as e:
+            session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al guardar el planeta: {str(e)}"
+            )
+        finally:
+            session.close()
+
     @staticmethod
     def delete_planeta(db: Session, planeta_id: int) -> dict:
-        db_planeta = PlanetaService.get_planeta_by_id(db, planeta_id)
-        
         try:
-            db.delete(db_planeta)
+            db_planeta, change_id = PlanetaService._stage_delete(db, planeta_id)
             db.commit()
-            return {"message": f"Planeta '{db_planeta.nombre}' eliminado correctamente"}
+        except HTTPException:
+            db.rollback()
+            raise
         except Exception as e:
             db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al eliminar el planeta: {str(e)}"
             )
+        PlanetaService._committed("delete", db_planeta, change_id, exists=False)
+        return {"message": f"Planeta '{db_planeta.nombre}' eliminado correctamente"}
+
+    @staticmethod
+    def apply_batch(db: Session, operations: List[BatchOperation]) -> List[dict]:
+        """
+        Aplica varias operaciones en una sola transacción: o se confirman todas o
+        ninguna. Cada operación ve el efecto de las anteriores (se hace flush tras
+        cada una). Si una falla, se deshace todo y el error indica su posición.
+        """
+        staged = []
+        try:
+            for index, operation in enumerate(operations):
+                try:
+                    if operation.op == "create":
+                        planeta, change_id = PlanetaService._stage_create(db, operation.data)
+                    elif operation.op == "update":
+                        planeta, change_id = PlanetaService._stage_update(db, operation.id, operation.data)
+                    else:
+                        planeta, change_id = PlanetaService._stage_delete(db, operation.id)
+                except HTTPException as exc:
+                    raise HTTPException(
+                        status_code=exc.status_code,
+                        detail=f"Operación {index} ({operation.op}): {exc.detail}. No se aplicó ningún cambio"
+                    )
+                staged.append((index, operation.op, planeta, planeta.id, change_id))
+            db.commit()
+        except HTTPException:
+            db.rollback()
+            raise
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Error de integridad en el lote. No se aplicó ningún cambio"
+            )
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al aplicar el lote: {str(e)}"
+            )
+
+        # Estado final de los planetas que siguen existiendo, con una consulta IN en lugar de un refresh por operación
+        current, _ = PlanetaService.get_planetas_by_ids(
+            db, [planeta_id for _, op, _, planeta_id, _ in staged if op != "delete"]
+        )
+        current_by_id = {planeta.id: planeta for planeta in current}
+        results = []
+        for index, op, planeta, planeta_id, change_id in staged:
+            final = current_by_id.get(planeta_id) if op != "delete" else None
+            PlanetaService._committed(op, final or planeta, change_id, exists=final is not None)
+            results.append({"index": index, "op": op, "id": planeta_id, "planeta": final})
+        return results
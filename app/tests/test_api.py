@@ -1,11 +1,12 @@
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.main import app
-from app.core.database import Base, get_db
-from app.models.user import User
-from app.core.security import get_password_hash
+from app.core.database import Base, get_db, get_stream_db
+from app.schemas.schemas import UserCreate, UserRole
+from app.services.auth_service import AuthService
 
 # Configurar base de datos de prueba
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -24,6 +25,7 @@ def override_get_db():
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_stream_db] = override_get_db
 client = TestClient(app)
 
 
@@ -33,25 +35,12 @@ def setup_database():
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
     
-    # Crear usuarios de prueba
+    # Crear usuarios de prueba (hashes en paralelo)
     db = TestingSessionLocal()
-    admin = User(
-        username="admin_test",
-        email="admin@test.com",
-        hashed_password=get_password_hash("admin123"),
-        role="ADMIN",
-        is_active=True
-    )
-    usuario = User(
-        username="usuario_test",
-        email="usuario@test.com",
-        hashed_password=get_password_hash("usuario123"),
-        role="USUARIO",
-        is_active=True
-    )
-    db.add(admin)
-    db.add(usuario)
-    db.commit()
+    AuthService.create_users_bulk(db, [
+        UserCreate(username="admin_test", email="admin@test.com", password="admin123", role=UserRole.ADMIN),
+        UserCreate(username="usuario_test", email="usuario@test.com", password="usuario123", role=UserRole.USUARIO),
+    ])
     db.close()
     
     yield
@@ -80,6 +69,21 @@ def get_usuario_token():
 class TestAuthentication:
     """Pruebas de autenticación y seguridad JWT"""
     
+    def test_inactive_user_rejected(self):
+        """Test: Un usuario desactivado no pasa la autorización aunque su token siga vigente"""
+        from app.core.security import clear_user_cache
+        from app.models.user import User
+        token = get_usuario_token()
+        db = TestingSessionLocal()
+        db.query(User).filter(User.username == "usuario_test").update({User.is_active: False})
+        db.commit()
+        db.close()
+        clear_user_cache()
+        response = client.post("/planetas/", json={"nombre": "Sedna", "tipo": "Enano"},
+                               headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 401
+        clear_user_cache()
+
     def test_login_success_admin(self):
         """Test: Login exitoso con credenciales de admin"""
         response = client.post(
@@ -134,6 +138,145 @@ class TestAuthentication:
         assert response.status_code == 401
 
 
+class TestRegistration:
+    """Pruebas de registro individual y en lote"""
+
+    def test_register_duplicate_username(self):
+        """Test: Error 409 - Username ya registrado"""
+        response = client.post(
+            "/auth/register",
+            json={"username": "admin_test", "email": "otro@test.com", "password": "secreto123"}
+        )
+        assert response.status_code == 409
+        assert "usuario" in response.json()["detail"].lower()
+
+    def test_register_duplicate_email(self):
+        """Test: Error 409 - Email ya registrado"""
+        response = client.post(
+            "/auth/register",
+            json={"username": "nuevo", "email": "admin@test.com", "password": "secreto123"}
+        )
+        assert response.status_code == 409
+        assert "email" in response.json()["detail"].lower()
+
+    def test_register_bulk_admin(self):
+        """Test: ADMIN registra usuarios en lote y se omiten los existentes"""
+        token = get_admin_token()
+        response = client.post(
+            "/auth/register/bulk",
+            json={"users": [
+                {"username": "bulk1", "email": "bulk1@test.com", "password": "secreto123"},
+                {"username": "bulk2", "email": "bulk2@test.com", "password": "secreto123"},
+                {"username": "admin_test", "email": "x@test.com", "password": "secreto123"},
+                {"username": "bulk1", "email": "bulk1b@test.com", "password": "secreto123"},
+            ]},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 201
+        data = response.json()
+        assert data["created"] == 2
+        assert {s["username"] for s in data["skipped"]} == {"admin_test", "bulk1"}
+
+        login = client.post("/auth/login", json={"username": "bulk2", "password": "secreto123"})
+        assert login.status_code == 200
+
+    def test_register_bulk_usuario_forbidden(self):
+        """Test: USUARIO no puede registrar en lote"""
+        token = get_usuario_token()
+        response = client.post(
+            "/auth/register/bulk",
+            json={"users": [{"username": "bulk1", "email": "bulk1@test.com", "password": "secreto123"}]},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 403
+
+
+class TestRefreshTokens:
+    """Pruebas de renovación de sesión con refresh tokens"""
+
+    def login_admin(self):
+        response = client.post(
+            "/auth/login",
+            json={"username": "admin_test", "password": "admin123"}
+        )
+        return response.json()
+
+    def test_login_returns_refresh_token(self):
+        """Test: El login devuelve también un refresh token"""
+        data = self.login_admin()
+        assert data["refresh_token"]
+        assert data["refresh_token"] != data["access_token"]
+
+    def test_refresh_rotates_token(self):
+        """Test: Refresh devuelve un access token válido y rota el refresh token"""
+        data = self.login_admin()
+        response = client.post("/auth/refresh", json={"refresh_token": data["refresh_token"]})
+        assert response.status_code == 200
+        refreshed = response.json()
+        assert refreshed["refresh_token"] != data["refresh_token"]
+        assert refreshed["user"]["role"] == "ADMIN"
+
+        list_response = client.get(
+            "/planetas/",
+            headers={"Authorization": f"Bearer {refreshed['access_token']}"}
+        )
+        assert list_response.status_code == 200
+
+    def test_refresh_reuse_revokes_family(self):
+        """Test: Reutilizar un refresh token rotado revoca toda la sesión"""
+        data = self.login_admin()
+        first = client.post("/auth/refresh", json={"refresh_token": data["refresh_token"]}).json()
+
+        reuse = client.post("/auth/refresh", json={"refresh_token": data["refresh_token"]})
+        assert reuse.status_code == 401
+
+        # El token emitido en la rotación también queda revocado
+        response = client.post("/auth/refresh", json={"refresh_token": first["refresh_token"]})
+        assert response.status_code == 401
+
+    def test_concurrent_refresh_with_same_token(self):
+        """Test: Dos renovaciones simultáneas con el mismo token: solo una obtiene un par nuevo"""
+        from app.models.refresh_token import RefreshToken
+        data = self.login_admin()
+        primera, segunda = TestingSessionLocal(), TestingSessionLocal()
+        try:
+            # La segunda petición ya leyó el token (sin revocar) cuando la primera lo revoca
+            leidos = segunda.query(RefreshToken).all()
+            assert all(t.revoked_at is None for t in leidos)
+            rotado = AuthService.refresh(primera, data["refresh_token"])
+            with pytest.raises(HTTPException) as exc:
+                AuthService.refresh(segunda, data["refresh_token"])
+            assert exc.value.status_code == 401
+        finally:
+            primera.close()
+            segunda.close()
+
+        # La reutilización revoca también el token emitido a la primera
+        response = client.post("/auth/refresh", json={"refresh_token": rotado["refresh_token"]})
+        assert response.status_code == 401
+
+    def test_refresh_invalid_token(self):
+        """Test: Refresh con token desconocido"""
+        response = client.post("/auth/refresh", json={"refresh_token": "no-existe"})
+        assert response.status_code == 401
+
+    def test_jwks_endpoint(self):
+        """Test: El JWKS se publica con caché (vacío con HS256)"""
+        response = client.get("/.well-known/jwks.json")
+        assert response.status_code == 200
+        assert "keys" in response.json()
+        assert "max-age" in response.headers["cache-control"]
+
+    def test_logout_revokes_refresh_token(self):
+        """Test: Logout revoca el refresh token"""
+        data = self.login_admin()
+        response = client.post("/auth/logout", json={"refresh_token": data["refresh_token"]})
+        assert response.status_code == 200
+
+        response = client.post("/auth/refresh", json={"refresh_token": data["refresh_token"]})
+        assert response.status_code == 401
+
+
 class TestPlanetaCRUD:
     """Pruebas de operaciones CRUD de planetas"""
     
@@ -411,6 +554,580 @@ class TestPlanetaCRUD:
         assert response.status_code == 403
 
 
+class TestPlanetaBatch:
+    """Pruebas de la consulta de varios planetas por ID"""
+
+    def _create(self, headers, *nombres):
+        return [
+            client.post("/planetas/", json={"nombre": nombre, "tipo": "Rocoso"}, headers=headers).json()["id"]
+            for nombre in nombres
+        ]
+
+    def test_batch_get_preserves_order_and_reports_missing(self, monkeypatch):
+        """Test: Orden pedido, IDs inexistentes en missing y consultas IN por lotes"""
+        import app.services.planeta_service as planeta_service
+        monkeypatch.setattr(planeta_service, "IN_CLAUSE_CHUNK_SIZE", 2)
+        headers = {"Authorization": f"Bearer {get_admin_token()}"}
+        tierra, marte, venus = self._create(headers, "Tierra", "Marte", "Venus")
+
+        response = client.get(f"/planetas/batch?ids={venus},999,{tierra},{marte},{venus}", headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert [p["nombre"] for p in data["planetas"]] == ["Venus", "Tierra", "Marte"]
+        assert data["missing"] == [999]
+
+    def test_batch_post(self):
+        """Test: Lista de IDs en el cuerpo"""
+        headers = {"Authorization": f"Bearer {get_admin_token()}"}
+        ids = self._create(headers, "Jupiter", "Saturno")
+        response = client.post("/planetas/batch", json={"ids": list(reversed(ids))}, headers=headers)
+        assert response.status_code == 200
+        assert [p["nombre"] for p in response.json()["planetas"]] == ["Saturno", "Jupiter"]
+
+    def test_batch_invalid_ids(self):
+        """Test: IDs no numéricos devuelven 400"""
+        headers = {"Authorization": f"Bearer {get_admin_token()}"}
+        assert client.get("/planetas/batch?ids=1,abc", headers=headers).status_code == 400
+        assert client.post("/planetas/batch", json={"ids": []}, headers=headers).status_code == 400
+
+    def test_batch_usuario_forbidden(self):
+        """Test: USUARIO no puede consultar por lotes"""
+        token = get_usuario_token()
+        response = client.get("/planetas/batch?ids=1", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 403
+
+
+class TestTransactionalBatch:
+    """Pruebas del lote transaccional POST /batch"""
+
+    def test_batch_applies_all_operations(self):
+        """Test: Alta, modificación y baja en una sola transacción"""
+        headers = {"Authorization": f"Bearer {get_admin_token()}"}
+        tierra = client.post("/planetas/", json={"nombre": "Tierra", "tipo": "Rocoso"}, headers=headers).json()
+        venus = client.post("/planetas/", json={"nombre": "Venus", "tipo": "Rocoso"}, headers=headers).json()
+
+        response = client.post("/batch", json={"operations": [
+            {"op": "create", "data": {"nombre": "Marte", "tipo": "Rocoso", "numeroLunas": 2}},
+            {"op": "update", "id": tierra["id"], "data": {"numeroLunas": 1}},
+            {"op": "delete", "id": venus["id"]},
+        ]}, headers=headers)
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["op"] for r in results] == ["create", "update", "delete"]
+        assert results[0]["planeta"]["nombre"] == "Marte"
+        assert results[1]["planeta"]["numeroLunas"] == 1
+        assert results[2]["planeta"] is None
+
+        planetas = client.get("/planetas/", headers=headers).json()
+        assert sorted(p["nombre"] for p in planetas) == ["Marte", "Tierra"]
+
+    def test_batch_rolls_back_on_error(self):
+        """Test: Si una operación falla no se aplica ninguna"""
+        headers = {"Authorization": f"Bearer {get_admin_token()}"}
+        response = client.post("/batch", json={"operations": [
+            {"op": "create", "data": {"nombre": "Jupiter", "tipo": "Gaseoso"}},
+            {"op": "update", "id": 9999, "data": {"numeroLunas": 1}},
+        ]}, headers=headers)
+        assert response.status_code == 404
+        assert response.json()["detail"].startswith("Operación 1 (update)")
+        assert client.get("/planetas/", headers=headers).json() == []
+
+    def test_batch_duplicate_name_within_batch(self):
+        """Test: Cada operación ve las anteriores del mismo lote"""
+        headers = {"Authorization": f"Bearer {get_admin_token()}"}
+        response = client.post("/batch", json={"operations": [
+            {"op": "create", "data": {"nombre": "Saturno", "tipo": "Gaseoso"}},
+            {"op": "create", "data": {"nombre": "Saturno", "tipo": "Gaseoso"}},
+        ]}, headers=headers)
+        assert response.status_code == 409
+        assert client.get("/planetas/", headers=headers).json() == []
+
+    def test_batch_reuses_freed_names_with_name_index(self, monkeypatch):
+        """Test: Con el índice de nombres cargado, un nombre liberado en el lote se puede reutilizar"""
+        import app.services.planeta_service as planeta_service
+        from app.core.name_index import NameIndex
+        headers = {"Authorization": f"Bearer {get_admin_token()}"}
+        tierra = client.post("/planetas/", json={"nombre": "Tierra", "tipo": "Rocoso"}, headers=headers).json()
+        venus = client.post("/planetas/", json={"nombre": "Venus", "tipo": "Rocoso"}, headers=headers).json()
+        index = NameIndex()
+        db = TestingSessionLocal()
+        index.load(db)
+        db.close()
+        monkeypatch.setattr(planeta_service, "planeta_names", index)
+
+        response = client.post("/batch", json={"operations": [
+            {"op": "delete", "id": tierra["id"]},
+            {"op": "create", "data": {"nombre": "Tierra", "tipo": "Rocoso"}},
+        ]}, headers=headers)
+        assert response.status_code == 200
+
+        response = client.post("/batch", json={"operations": [
+            {"op": "update", "id": venus["id"], "data": {"nombre": "Lucero"}},
+            {"op": "create", "data": {"nombre": "Venus", "tipo": "Rocoso"}},
+        ]}, headers=headers)
+        assert response.status_code == 200
+
+        planetas = client.get("/planetas/", headers=headers).json()
+        assert sorted(p["nombre"] for p in planetas) == ["Lucero", "Tierra", "Venus"]
+
+    def test_batch_usuario_forbidden(self):
+        """Test: USUARIO no puede aplicar lotes"""
+        token = get_usuario_token()
+        response = client.post(
+            "/batch",
+            json={"operations": [{"op": "delete", "id": 1}]},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 403
+
+
+class TestIdempotency:
+    """Pruebas de la cabecera Idempotency-Key"""
+
+    def test_retry_replays_first_response(self):
+        """Test: Un reintento recibe la respuesta original en lugar de un 409"""
+        import uuid
+        token = get_admin_token()
+        headers = {"Authorization": f"Bearer {token}", "Idempotency-Key": str(uuid.uuid4())}
+        planeta = {"nombre": "Kepler-22b", "tipo": "Rocoso"}
+
+        first = client.post("/planetas/", json=planeta, headers=headers)
+        assert first.status_code == 201
+        retry = client.post("/planetas/", json=planeta, headers=headers)
+        assert retry.status_code == 201
+        assert retry.json() == first.json()
+        assert retry.headers["idempotent-replayed"] == "true"
+
+        listado = client.get("/planetas/", headers={"Authorization": f"Bearer {token}"})
+        assert len(listado.json()) == 1
+
+    def test_key_reused_with_different_body(self):
+        """Test: Reutilizar la clave con otro cuerpo devuelve 422"""
+        import uuid
+        token = get_admin_token()
+        headers = {"Authorization": f"Bearer {token}", "Idempotency-Key": str(uuid.uuid4())}
+        assert client.post("/planetas/", json={"nombre": "Gliese", "tipo": "Rocoso"}, headers=headers).status_code == 201
+        response = client.post("/planetas/", json={"nombre": "Otro", "tipo": "Rocoso"}, headers=headers)
+        assert response.status_code == 422
+
+    def test_keys_scoped_per_sender(self):
+        """Test: La misma clave de otro usuario no reenvía la respuesta ajena"""
+        import uuid
+        key = str(uuid.uuid4())
+        planeta = {"nombre": "Trappist", "tipo": "Rocoso"}
+        admin = client.post("/planetas/", json=planeta,
+                            headers={"Authorization": f"Bearer {get_admin_token()}", "Idempotency-Key": key})
+        assert admin.status_code == 201
+        usuario = client.post("/planetas/", json=planeta,
+                              headers={"Authorization": f"Bearer {get_usuario_token()}", "Idempotency-Key": key})
+        assert usuario.status_code == 409
+        assert "idempotent-replayed" not in usuario.headers
+
+    def test_unauthorized_response_not_stored(self):
+        """Test: Un 401 no se guarda; el reintento autenticado se ejecuta"""
+        import uuid
+        key = str(uuid.uuid4())
+        planeta = {"nombre": "Proxima b", "tipo": "Rocoso"}
+        assert client.post("/planetas/", json=planeta,
+                           headers={"Authorization": "Bearer invalido", "Idempotency-Key": key}).status_code == 401
+        assert client.post("/planetas/", json=planeta,
+                           headers={"Authorization": "Bearer invalido", "Idempotency-Key": key}).status_code == 401
+
+    def test_register_replay(self):
+        """Test: El registro repetido con la misma clave devuelve el usuario creado"""
+        import uuid
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        user = {"username": "reintento", "email": "reintento@test.com", "password": "secreto123"}
+        first = client.post("/auth/register", json=user, headers=headers)
+        assert first.status_code == 201
+        retry = client.post("/auth/register", json=user, headers=headers)
+        assert retry.status_code == 201
+        assert retry.json() == first.json()
+
+    def test_invalid_key(self):
+        """Test: Una clave demasiado larga se rechaza"""
+        response = client.post("/auth/register", json={}, headers={"Idempotency-Key": "x" * 201})
+        assert response.status_code == 400
+
+    def test_cors_headers_follow_each_request(self):
+        """Test: Los reenvíos y los errores de la clave llevan las cabeceras CORS de su propio Origin"""
+        import uuid
+        from app.core.idempotency import get_idempotency_store
+        key = str(uuid.uuid4())
+        user = {"username": "cors", "email": "cors@test.com", "password": "secreto123"}
+        first = client.post("/auth/register", json=user, headers={
+            "Idempotency-Key": key, "Origin": "https://a.example.com", "Cookie": "sesion=1"})
+        assert first.headers["access-control-allow-origin"] == "https://a.example.com"
+
+        retry = client.post("/auth/register", json=user, headers={
+            "Idempotency-Key": key, "Origin": "https://b.example.com", "Cookie": "sesion=1"})
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert retry.headers["access-control-allow-origin"] == "https://b.example.com"
+        stored = [name for _, entry in get_idempotency_store()._entries.values() for name, _ in entry.headers or []]
+        assert not any(name.startswith(b"access-control-") for name in stored)
+
+        mismatch = client.post("/auth/register", json={**user, "username": "otro"}, headers={
+            "Idempotency-Key": key, "Origin": "https://b.example.com"})
+        assert mismatch.status_code == 422
+        assert "access-control-allow-origin" in mismatch.headers
+
+
+class TestCacheHeaders:
+    """Pruebas de cabeceras de caché y purga por etiquetas"""
+
+    def test_read_headers(self):
+        """Test: Lecturas con Cache-Control y etiquetas por planeta y colección"""
+        token = get_admin_token()
+        headers = {"Authorization": f"Bearer {token}"}
+        planeta_id = client.post("/planetas/", json={"nombre": "Ceres", "tipo": "Rocoso"}, headers=headers).json()["id"]
+
+        detalle = client.get(f"/planetas/{planeta_id}", headers=headers)
+        assert detalle.headers["cache-control"].startswith("private")
+        assert detalle.headers["surrogate-key"] == f"planeta-{planeta_id}"
+
+        listado = client.get("/planetas/", headers=headers)
+        assert listado.headers["cache-tag"] == "planetas"
+        assert client.get(f"/planetas/batch?ids={planeta_id}", headers=headers).headers["surrogate-key"] == "planetas"
+        assert client.get("/planetas/changes", headers=headers).headers["cache-control"] == "no-store"
+
+    def test_errors_not_cacheable(self):
+        """Test: Un 404 no lleva política de caché"""
+        token = get_admin_token()
+        response = client.get("/planetas/99999", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 404
+        assert "surrogate-key" not in response.headers
+
+    def test_writes_purge_tags(self, monkeypatch):
+        """Test: Alta, modificación y baja purgan el planeta y la colección"""
+        from app.core import cdn
+        purger = cdn.LocalPurger()
+        monkeypatch.setattr(cdn, "_purger", purger)
+        token = get_admin_token()
+        headers = {"Authorization": f"Bearer {token}"}
+
+        planeta_id = client.post("/planetas/", json={"nombre": "Eris", "tipo": "Rocoso"}, headers=headers).json()["id"]
+        client.put(f"/planetas/{planeta_id}", json={"numeroLunas": 1}, headers=headers)
+        client.delete(f"/planetas/{planeta_id}", headers=headers)
+        assert purger.purged == ["planetas", f"planeta-{planeta_id}"] * 3
+
+
+class TestPlanetaChanges:
+    """Pruebas de la sincronización incremental"""
+
+    def test_changes_since_token(self):
+        """Test: Altas, modificaciones y bajas desde un token"""
+        headers = {"Authorization": f"Bearer {get_admin_token()}"}
+        tierra = client.post("/planetas/", json={"nombre": "Tierra", "tipo": "Rocoso"}, headers=headers).json()
+        venus = client.post("/planetas/", json={"nombre": "Venus", "tipo": "Rocoso"}, headers=headers).json()
+
+        response = client.get("/planetas/changes?since=0", headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert [p["nombre"] for p in data["upserts"]] == ["Tierra", "Venus"]
+        assert data["deleted"] == []
+        assert data["has_more"] is False
+        token = data["next_token"]
+
+        client.put(f"/planetas/{tierra['id']}", json={"numeroLunas": 1}, headers=headers)
+        client.delete(f"/planetas/{venus['id']}", headers=headers)
+
+        data = client.get(f"/planetas/changes?since={token}", headers=headers).json()
+        assert [p["numeroLunas"] for p in data["upserts"]] == [1]
+        assert data["deleted"] == [venus["id"]]
+        assert data["next_token"] > token
+
+        data = client.get(f"/planetas/changes?since={data['next_token']}", headers=headers).json()
+        assert data == {"upserts": [], "deleted": [], "next_token": data["next_token"], "has_more": False}
+
+    def test_changes_paginated(self):
+        """Test: has_more indica que quedan cambios"""
+        headers = {"Authorization": f"Bearer {get_admin_token()}"}
+        for nombre in ("Mercurio", "Marte", "Jupiter"):
+            client.post("/planetas/", json={"nombre": nombre, "tipo": "Rocoso"}, headers=headers)
+        first = client.get("/planetas/changes?since=0&limit=2", headers=headers).json()
+        assert len(first["upserts"]) == 2
+        assert first["has_more"] is True
+        second = client.get(f"/planetas/changes?since={first['next_token']}&limit=2", headers=headers).json()
+        assert [p["nombre"] for p in second["upserts"]] == ["Jupiter"]
+        assert second["has_more"] is False
+
+    def test_changes_wait_for_out_of_order_commit(self):
+        """Test: El token no salta un cambio cuya transacción se confirma después"""
+        from datetime import datetime, timedelta
+        from app.models.planeta import Planeta, TipoPlaneta
+        from app.models.planeta_change import PlanetaChange
+        headers = {"Authorization": f"Bearer {get_admin_token()}"}
+        token = client.get("/planetas/changes?since=0", headers=headers).json()["next_token"]
+
+        db = TestingSessionLocal()
+        marte = Planeta(nombre="Marte", tipo=TipoPlaneta.ROCOSO)
+        venus = Planeta(nombre="Venus", tipo=TipoPlaneta.ROCOSO)
+        db.add_all([marte, venus])
+        db.flush()
+        # La transacción con el id token+2 se confirma antes que la del id token+1
+        db.add(PlanetaChange(id=token + 2, planeta_id=venus.id, operation="create"))
+        db.commit()
+
+        data = client.get(f"/planetas/changes?since={token}", headers=headers).json()
+        assert data == {"upserts": [], "deleted": [], "next_token": token, "has_more": False}
+
+        db.add(PlanetaChange(id=token + 1, planeta_id=marte.id, operation="create"))
+        db.commit()
+        data = client.get(f"/planetas/changes?since={token}", headers=headers).json()
+        assert [p["nombre"] for p in data["upserts"]] == ["Marte", "Venus"]
+        assert data["next_token"] == token + 2
+
+        # Un hueco antiguo (transacción deshecha) no bloquea el token para siempre
+        db.add(PlanetaChange(id=token + 4, planeta_id=marte.id, operation="update",
+                             changed_at=datetime.utcnow() - timedelta(minutes=1)))
+        db.commit()
+        db.close()
+        data = client.get(f"/planetas/changes?since={token + 2}", headers=headers).json()
+        assert data["next_token"] == token + 4
+
+    def test_changes_usuario_forbidden(self):
+        """Test: USUARIO no puede sincronizar"""
+        token = get_usuario_token()
+        response = client.get("/planetas/changes", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 403
+
+
+class TestPlanetaStream:
+    """Pruebas del flujo de cambios en tiempo real"""
+
+    def test_websocket_receives_changes(self):
+        """Test: El WebSocket recibe altas y bajas serializadas"""
+        token = get_admin_token()
+        headers = {"Authorization": f"Bearer {token}"}
+        with client.websocket_connect(f"/planetas/stream/ws?token={token}") as websocket:
+            planeta = client.post("/planetas/", json={"nombre": "Neptuno", "tipo": "Gaseoso"}, headers=headers).json()
+            event = websocket.receive_json()
+            assert event["operation"] == "create"
+            assert event["planeta"]["nombre"] == "Neptuno"
+
+            client.delete(f"/planetas/{planeta['id']}", headers=headers)
+            event = websocket.receive_json()
+            assert event["operation"] == "delete"
+            assert event["planeta_id"] == planeta["id"]
+            assert event["planeta"] is None
+
+    def test_websocket_usuario_rejected(self):
+        """Test: USUARIO no puede suscribirse"""
+        from starlette.websockets import WebSocketDisconnect
+        token = get_usuario_token()
+        with pytest.raises(WebSocketDisconnect) as exc:
+            with client.websocket_connect(f"/planetas/stream/ws?token={token}") as websocket:
+                websocket.receive_json()
+        assert exc.value.code == 1008
+
+    def test_sse_usuario_forbidden(self):
+        """Test: USUARIO no puede abrir el flujo SSE"""
+        token = get_usuario_token()
+        response = client.get("/planetas/stream", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 403
+
+
+class TestMonitoring:
+    """Pruebas de la instrumentación SQL por petición"""
+
+    def test_server_timing_header(self, monkeypatch):
+        """Test: Server-Timing informa el número de consultas y el tiempo de BD"""
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "SERVER_TIMING_ENABLED", True)
+        token = get_admin_token()
+        response = client.get("/planetas/", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert "db;dur=" in response.headers["server-timing"]
+        assert "queries" in response.headers["server-timing"]
+
+    def test_db_metrics_exposed(self):
+        """Test: Las métricas SQL por ruta aparecen en /metrics"""
+        token = get_admin_token()
+        client.get("/planetas/", headers={"Authorization": f"Bearer {token}"})
+        response = client.get("/metrics")
+        assert 'planetas_db_statements_per_request_count{handler="/planetas/",method="GET"}' in response.text
+
+    def test_business_and_auth_metrics_exposed(self):
+        """Test: Contadores de negocio, fases de auth y peticiones en curso en /metrics"""
+        token = get_admin_token()
+        client.post(
+            "/planetas/",
+            json={"nombre": "Ceres", "tipo": "Enano"},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        text = client.get("/metrics").text
+        assert 'planetas_operations_total{operation="create",tipo="Enano"}' in text
+        assert "planetas_auth_password_verify_seconds_count" in text
+        assert "planetas_auth_jwt_decode_seconds_count" in text
+        assert "planetas_db_commit_seconds_count" in text
+        assert "http_requests_inprogress" in text
+
+    def test_request_duration_uses_slo_buckets(self):
+        """Test: http_request_duration_seconds usa los buckets del SLO, no los por defecto"""
+        from app.core.config import settings
+        client.get("/health")
+        text = client.get("/metrics").text
+        for bucket in settings.get_latency_buckets():
+            assert f'http_request_duration_seconds_bucket{{handler="/health",le="{float(bucket)}"' in text
+
+
+class TestThreadpool:
+    """Pruebas de métricas y descarte de carga del threadpool"""
+
+    def test_threadpool_metrics_exposed(self):
+        """Test: Ocupación y cola del threadpool en /metrics"""
+        client.get("/health")
+        text = client.get("/metrics").text
+        assert "planetas_threadpool_tokens_in_use" in text
+        assert "planetas_threadpool_queue_depth" in text
+
+    def test_shed_when_estimated_wait_exceeds_deadline(self, monkeypatch):
+        """Test: 503 + Retry-After si la espera estimada supera el plazo; /health exento"""
+        from app.core import threadpool
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "THREADPOOL_QUEUE_DEADLINE_MS", 100)
+        monkeypatch.setattr(threadpool, "estimated_wait", lambda waiting, tokens: 2.5)
+
+        response = client.get("/planetas/", headers={"Origin": "https://planetas.vercel.app"})
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "3"
+        # El 503 pasa por CORS: el navegador puede leerlo y reintentar
+        assert "access-control-allow-origin" in response.headers
+
+        assert client.get("/health").status_code == 200
+
+    def test_hold_time_measured_inside_thread(self, monkeypatch):
+        """Test: El tiempo retenido es el del endpoint en su hilo, no el de la petición completa"""
+        import time
+        from app.api import planetas as planetas_api
+        from app.core import threadpool
+        monkeypatch.setattr(threadpool, "hold_time", threadpool._HoldTime())
+        token = get_admin_token()
+
+        client.get("/planetas/", headers={"Authorization": f"Bearer {token}"})
+        assert 0 < threadpool.hold_time.value < 0.5
+
+        slow = lambda *args, **kwargs: time.sleep(0.2) or b"[]"
+        monkeypatch.setattr(planetas_api.PlanetaService, "get_all_planetas_json", slow)
+        monkeypatch.setattr(threadpool, "hold_time", threadpool._HoldTime())
+        client.get("/planetas/", headers={"Authorization": f"Bearer {token}"})
+        assert threadpool.hold_time.value >= 0.2
+
+
+class TestAdmissionControl:
+    """Pruebas del control de admisión"""
+
+    def test_rejects_when_class_limit_reached(self, monkeypatch):
+        """Test: 503 + Retry-After al superar el límite de la clase; /health exento"""
+        from app.core.admission import AdmissionControlMiddleware
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "ADMISSION_CONTROL_ENABLED", True)
+
+        middleware = app.middleware_stack
+        while not isinstance(middleware, AdmissionControlMiddleware):
+            middleware = middleware.app
+        monkeypatch.setattr(middleware.limiters["read"], "in_flight", 10_000)
+
+        response = client.get("/planetas/")
+        assert response.status_code == 503
+        assert "retry-after" in response.headers
+        assert client.get("/health").status_code == 200
+
+
+class TestProfiling:
+    """Pruebas del profiler por muestreo"""
+
+    def test_profile_worker_admin(self):
+        """Test: ADMIN obtiene pilas en formato collapsed"""
+        token = get_admin_token()
+        response = client.post(
+            "/admin/profile?seconds=0.2&interval_ms=5",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200
+        assert response.text
+        last_line = response.text.splitlines()[-1]
+        assert last_line.rsplit(" ", 1)[1].isdigit()
+
+    def test_profile_worker_releases_session_before_sampling(self, monkeypatch):
+        """Test: La sesión de la autorización se cierra antes del muestreo"""
+        from app.api import admin
+        from app.core.security import clear_user_cache
+        sessions = []
+
+        def tracked_db():
+            db = TestingSessionLocal()
+            sessions.append(db)
+            yield db
+            db.close()
+
+        start = admin.SamplingProfiler.start
+
+        def check_start(profiler):
+            assert sessions and all(not db.in_transaction() for db in sessions)
+            return start(profiler)
+
+        monkeypatch.setitem(app.dependency_overrides, get_stream_db, tracked_db)
+        monkeypatch.setattr(admin.SamplingProfiler, "start", check_start)
+        clear_user_cache()
+        response = client.post("/admin/profile?seconds=0.1", headers={"Authorization": f"Bearer {get_admin_token()}"})
+        assert response.status_code == 200
+
+    def test_profile_worker_usuario_forbidden(self):
+        """Test: USUARIO no puede perfilar el worker"""
+        token = get_usuario_token()
+        response = client.post(
+            "/admin/profile?seconds=0.1",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 403
+
+    def test_profile_single_request(self, monkeypatch):
+        """Test: La cabecera X-Profile perfila una petición y el perfil se descarga después"""
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+        token = get_admin_token()
+        headers = {"Authorization": f"Bearer {token}"}
+        response = client.get("/planetas/", headers={**headers, "X-Profile": "1"})
+        assert response.status_code == 200
+        profile_id = response.headers["x-profile-id"]
+
+        profile = client.get(f"/admin/profile/requests/{profile_id}", headers=headers)
+        assert profile.status_code == 200
+
+    def test_profile_single_request_requires_admin(self, monkeypatch):
+        """Test: X-Profile sin token ADMIN no activa el profiler"""
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+        token = get_usuario_token()
+        response = client.post("/planetas/", json={"nombre": "Sedna", "tipo": "Rocoso"},
+                               headers={"Authorization": f"Bearer {token}", "X-Profile": "1"})
+        assert response.status_code == 201
+        assert "x-profile-id" not in response.headers
+        assert "x-profile-id" not in client.get("/health", headers={"X-Profile": "1"}).headers
+
+    def test_profile_worker_stops_sampler_on_cancel(self):
+        """Test: Si se cancela el perfil (cliente desconectado) el hilo de muestreo termina"""
+        import asyncio
+        import threading
+        from app.api.admin import profile_worker
+        from app.core.security import AuthenticatedUser
+
+        async def cancel_midway():
+            task = asyncio.ensure_future(profile_worker(
+                seconds=30, interval_ms=5, current_user=AuthenticatedUser(id=1, username="admin", role="ADMIN")
+            ))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        asyncio.run(cancel_midway())
+        assert not any(t.name == "sampling-profiler" for t in threading.enumerate())
+
+
 class TestValidations:
     """Pruebas de validaciones de datos"""
     
@@ -0,0 +1,58 @@
+from app.core.admission import AIMDLimiter, route_class
+
+
+class TestAdmissionControl:
+    """Pruebas unitarias del limitador AIMD"""
+
+    def test_route_classes(self):
+        assert route_class("POST", "/auth/login") == "auth"
+        assert route_class("POST", "/planetas/") == "write"
+        assert route_class("DELETE", "/planetas/1") == "write"
+        assert route_class("GET", "/planetas/") == "read"
+
+    def test_rejects_over_limit(self):
+        """✗ Se rechaza lo que excede el límite actual"""
+        limiter = AIMDLimiter("read", target_latency=0.1, initial=2)
+        assert limiter.try_acquire()
+        assert limiter.try_acquire()
+        assert not limiter.try_acquire()
+
+    def test_additive_increase_on_fast_responses(self):
+        """✓ Respuestas rápidas suben el límite de forma aditiva"""
+        limiter = AIMDLimiter("read", target_latency=0.1, initial=4)
+        for _ in range(4):
+            limiter.try_acquire()
+            limiter.release(0.01, failed=False)
+        assert 4.9 < limiter.limit < 5.1
+
+    def test_multiplicative_decrease_on_slow_or_failed(self):
+        """✓ Latencia alta o 5xx reducen el límite de forma multiplicativa"""
+        limiter = AIMDLimiter("write", target_latency=0.1, initial=10)
+        limiter.try_acquire()
+        limiter.release(0.5, failed=False)
+        assert limiter.limit == 9
+        for _ in range(9):
+            limiter.try_acquire()
+            limiter.release(0.01, failed=True)
+        assert limiter.limit == 8.1
+
+    def test_burst_decreases_once_per_window(self):
+        """✓ Una ráfaga de respuestas lentas de la misma ventana reduce el límite una sola vez"""
+        limiter = AIMDLimiter("read", target_latency=0.1, initial=20)
+        for _ in range(15):
+            limiter.try_acquire()
+        for _ in range(15):
+            limiter.release(1.0, failed=False)
+        assert limiter.limit == 18
+        # Completada la ventana (18 respuestas tras la reducción) vuelve a reducir
+        for _ in range(4):
+            limiter.try_acquire()
+            limiter.release(1.0, failed=False)
+        assert limiter.limit == 16.2
+
+    def test_limit_never_below_minimum(self):
+        limiter = AIMDLimiter("auth", target_latency=0.1, initial=1)
+        limiter.try_acquire()
+        limiter.release(5, failed=True)
+        assert limiter.limit == 1
+        assert limiter.retry_after() == 5
@@ -54,7 +54,7 @@ class TestAuthServiceUnitTests:
         mock_query = Mock()
         mock_db.query.return_value = mock_query
         mock_query.filter.return_value = mock_query
-        mock_query.first.side_effect = [None, None]  # No existe usuario ni email
+        mock_query.first.return_value = None  # No existe usuario ni email
         
         # Mock de get_password_hash para evitar bcrypt
         with patch('app.services.auth_service.get_password_hash', return_value="hashed_password"):
@@ -97,11 +97,11 @@ class TestAuthServiceUnitTests:
             password="password123"
         )
         
-        # Mock: username no existe, pero email sí
+        # Mock: la consulta combinada encuentra un usuario con ese email
         mock_query = Mock()
         mock_db.query.return_value = mock_query
         mock_query.filter.return_value = mock_query
-        mock_query.first.side_effect = [None, mock_user]  # Email existe
+        mock_query.first.return_value = mock_user  # Email existe
         
         with pytest.raises(HTTPException) as exc_info:
             AuthService.create_user(mock_db, user_data)
@@ -109,6 +109,28 @@ class TestAuthServiceUnitTests:
         assert exc_info.value.status_code == 409
         assert "email" in exc_info.value.detail.lower()
     
+    def test_create_users_bulk_skips_existing(self, mock_db):
+        """✓ Alta en lote omite existentes y duplicados con un solo commit"""
+        users = [
+            UserCreate(username="nuevo1", email="n1@test.com", password="password123"),
+            UserCreate(username="testuser", email="n2@test.com", password="password123"),
+            UserCreate(username="nuevo1", email="n3@test.com", password="password123"),
+        ]
+        
+        mock_query = Mock()
+        mock_db.query.return_value = mock_query
+        mock_query.filter.return_value = mock_query
+        mock_query.all.return_value = [Mock(username="testuser", email="test@test.com")]
+        
+        with patch('app.services.auth_service.hash_passwords', side_effect=lambda pwds: ["hash" for _ in pwds]):
+            result = AuthService.create_users_bulk(mock_db, users)
+        
+        assert result["created"] == 1
+        assert [s["username"] for s in result["skipped"]] == ["nuevo1", "testuser"]
+        created = mock_db.add_all.call_args[0][0]
+        assert [u.username for u in created] == ["nuevo1"]
+        mock_db.commit.assert_called_once()
+    
     # ===== PRUEBAS: authenticate_user =====
     
     def test_authenticate_user_success(self, mock_db, mock_user):
@@ -182,6 +204,34 @@ class TestAuthServiceUnitTests:
         assert exc_info.value.status_code == 403
         assert "inactivo" in exc_info.value.detail.lower()
     
+    def test_authenticate_user_rehash_on_login(self, mock_db, mock_user):
+        """✓ Rehash transparente si el hash usa un coste distinto al configurado"""
+        mock_query = Mock()
+        mock_db.query.return_value = mock_query
+        mock_query.filter.return_value = mock_query
+        mock_query.first.return_value = mock_user
+        
+        with patch('app.services.auth_service.verify_password', return_value=True), \
+             patch('app.services.auth_service.password_needs_rehash', return_value=True), \
+             patch('app.services.auth_service.get_password_hash', return_value="nuevo_hash"):
+            result = AuthService.authenticate_user(mock_db, "testuser", "password123")
+        
+        assert result.hashed_password == "nuevo_hash"
+        mock_db.commit.assert_called_once()
+    
+    def test_authenticate_user_no_rehash_when_current(self, mock_db, mock_user):
+        """✓ No se rehashea si el hash ya cumple la política"""
+        mock_query = Mock()
+        mock_db.query.return_value = mock_query
+        mock_query.filter.return_value = mock_query
+        mock_query.first.return_value = mock_user
+        
+        with patch('app.services.auth_service.verify_password', return_value=True), \
+             patch('app.services.auth_service.password_needs_rehash', return_value=False):
+            AuthService.authenticate_user(mock_db, "testuser", "password123")
+        
+        mock_db.commit.assert_not_called()
+    
     # ===== PRUEBAS: login =====
     
     def test_login_success(self, mock_db, mock_user):
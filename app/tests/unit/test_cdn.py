@@ -0,0 +1,90 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from app.core import cdn, idempotency
+from app.core.cdn import CachePolicy, WebhookPurger, cache_headers, planeta_tag
+
+
+class TestCachePolicy:
+    """Pruebas de las políticas de Cache-Control"""
+
+    def test_private_policy(self):
+        assert CachePolicy(public=False, max_age=0, edge_max_age=300).header() == "private, max-age=0"
+
+    def test_public_policy_with_edge_ttl(self):
+        policy = CachePolicy(public=True, max_age=10, edge_max_age=300, stale_while_revalidate=30)
+        assert policy.header() == "public, max-age=10, s-maxage=300, stale-while-revalidate=30"
+
+    def test_public_reads_vary_on_authorization(self, monkeypatch):
+        monkeypatch.setattr(cdn.settings, "CACHE_VISIBILITY", "public")
+        headers = cache_headers("planeta", [planeta_tag(7), "planetas"])
+        assert headers["Vary"] == "Authorization"
+        assert headers["Surrogate-Key"] == "planeta-7 planetas"
+        assert headers["Cache-Tag"] == "planeta-7,planetas"
+
+    def test_changes_not_stored(self):
+        assert cache_headers("changes") == {"Cache-Control": "no-store"}
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(cdn.settings, "CACHE_HEADERS_ENABLED", False)
+        assert cache_headers("planeta", ["planeta-1"]) == {}
+
+
+class TestWebhookPurger:
+    """Pruebas del purgador por webhook"""
+
+    def test_sends_tags_with_token(self):
+        received = []
+        done = threading.Event()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                received.append((self.headers["Authorization"], json.loads(body)))
+                self.send_response(204)
+                self.end_headers()
+                done.set()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.handle_request, daemon=True).start()
+        try:
+            purger = WebhookPurger(f"http://127.0.0.1:{server.server_port}/purge", token="secreto")
+            purger.purge(["planetas", "planeta-3"])
+            assert done.wait(5)
+        finally:
+            server.server_close()
+        assert received == [("Bearer secreto", {"tags": ["planeta-3", "planetas"]})]
+
+
+class TestStartupValidation:
+    """La configuración del purgador y del almacén de idempotencia se valida al arrancar"""
+
+    def start(self, monkeypatch):
+        import app.main as main
+        monkeypatch.setattr(main, "configure_password_hashing", lambda: None)
+        monkeypatch.setattr(cdn, "_purger", None)
+        monkeypatch.setattr(idempotency, "_store", None)
+
+        async def scenario():
+            async with main.lifespan(main.app):
+                pass
+
+        asyncio.run(scenario())
+
+    def test_webhook_without_url(self, monkeypatch):
+        monkeypatch.setattr(cdn.settings, "CACHE_PURGER", "webhook")
+        monkeypatch.setattr(cdn.settings, "CACHE_PURGE_URL", None)
+        with pytest.raises(ValueError, match="CACHE_PURGE_URL"):
+            self.start(monkeypatch)
+
+    def test_unknown_idempotency_store(self, monkeypatch):
+        monkeypatch.setattr(cdn.settings, "IDEMPOTENCY_STORE", "redis")
+        with pytest.raises(ValueError, match="IDEMPOTENCY_STORE"):
+            self.start(monkeypatch)
@@ -0,0 +1,153 @@
+import asyncio
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.core.events import Broadcaster, ChangelogBroker, MemoryBroker, build_event, sse_frames
+from app.models.planeta import Planeta, TipoPlaneta
+from app.models.planeta_change import PlanetaChange
+
+
+class TestEvents:
+    """Pruebas unitarias del reparto de eventos"""
+
+    def test_event_serialized_once(self):
+        planeta = SimpleNamespace(
+            id=1, nombre="Marte", tipo="Rocoso", distanciaAlSol=None, numeroLunas=2, masa=None,
+            estado="Confirmado", fechaDescubrimiento=None, created_at="2024-01-01T00:00:00", updated_at=None,
+        )
+        event = build_event(7, "create", 1, planeta)
+        assert event.sse.startswith(b"id: 7\nevent: create\ndata: {")
+        assert event.sse.endswith(b"\n\n")
+        assert '"nombre":"Marte"' in event.json
+
+    def test_fan_out_to_all_subscribers(self):
+        """✓ Todos los suscriptores reciben el mismo objeto de evento"""
+        async def scenario():
+            broadcaster = Broadcaster(queue_size=10)
+            first, second = broadcaster.subscribe(), broadcaster.subscribe()
+            event = build_event(1, "delete", 3)
+            broadcaster.publish(event)
+            return await first.get(), await second.get(), event
+
+        first, second, event = asyncio.run(scenario())
+        assert first is event and second is event
+
+    def test_slow_consumer_disconnected(self):
+        """✗ Un suscriptor con la cola llena se desconecta sin afectar al resto"""
+        async def scenario():
+            broadcaster = Broadcaster(queue_size=2)
+            slow, fast = broadcaster.subscribe(), broadcaster.subscribe()
+            for change_id in range(1, 4):
+                broadcaster.publish(build_event(change_id, "delete", change_id))
+                await asyncio.sleep(0)
+                assert (await fast.get()).change_id == change_id
+            return slow, await slow.get(), broadcaster.has_subscribers
+
+        slow, received, has_subscribers = asyncio.run(scenario())
+        assert slow.overflowed
+        assert received is None
+        assert has_subscribers  # el rápido sigue suscrito
+
+    def test_sse_frames(self):
+        async def scenario():
+            broker = MemoryBroker(Broadcaster(queue_size=10))
+            frames = sse_frames(broker, heartbeat=0.01)
+            received = [await frames.__anext__()]
+            received.append(await frames.__anext__())  # sin eventos: comentario de heartbeat
+            broker.publish(4, "delete", 9)
+            received.append(await frames.__anext__())
+            await frames.aclose()
+            return received, broker.broadcaster.has_subscribers
+
+        received, has_subscribers = asyncio.run(scenario())
+        assert received[0].startswith(b"retry:")
+        assert received[1] == b": ping\n\n"
+        assert received[2].startswith(b"id: 4\nevent: delete\n")
+        assert not has_subscribers
+
+    def test_changelog_broker_polls_new_changes(self):
+        """✓ El broker por registro de cambios solo difunde lo ocurrido tras el primer sondeo"""
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        db.add(PlanetaChange(planeta_id=1, operation="create"))
+        db.commit()
+
+        broker = ChangelogBroker(Broadcaster(queue_size=10), session_factory=Session)
+        assert broker.poll_once() == []
+
+        planeta = Planeta(nombre="Saturno", tipo=TipoPlaneta.GASEOSO)
+        db.add(planeta)
+        db.flush()
+        db.add_all([
+            PlanetaChange(planeta_id=planeta.id, operation="create"),
+            PlanetaChange(planeta_id=99, operation="update"),
+            PlanetaChange(planeta_id=98, operation="delete"),
+        ])
+        db.commit()
+        db.close()
+
+        events = broker.poll_once()
+        assert [(e.operation, e.change_id) for e in events] == [("create", 2), ("delete", 4)]
+        assert '"nombre":"Saturno"' in events[0].json
+        assert broker.poll_once() == []
+
+    def test_changelog_broker_waits_for_out_of_order_commit(self):
+        """✓ El cursor no salta un cambio cuya transacción se confirma después"""
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        broker = ChangelogBroker(Broadcaster(queue_size=10), session_factory=Session)
+        assert broker.poll_once() == []
+
+        db = Session()
+        db.add(PlanetaChange(id=2, planeta_id=8, operation="delete"))
+        db.commit()
+        assert broker.poll_once() == []
+
+        db.add(PlanetaChange(id=1, planeta_id=7, operation="delete"))
+        db.commit()
+        db.close()
+        assert [e.change_id for e in broker.poll_once()] == [1, 2]
+
+    def test_changelog_broker_survives_poll_errors(self):
+        """✓ Si un sondeo falla, el broker reintenta y los eventos siguen llegando"""
+        from sqlalchemy.exc import OperationalError
+
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        broker = ChangelogBroker(Broadcaster(queue_size=10), session_factory=Session, interval=0.01)
+        poll_once = broker.poll_once
+        calls = []
+
+        def flaky_poll():
+            calls.append(1)
+            if len(calls) == 2:
+                raise OperationalError("SELECT", {}, Exception("base de datos caída"))
+            return poll_once()
+
+        broker.poll_once = flaky_poll
+
+        async def scenario():
+            subscriber = broker.subscribe()
+            for _ in range(300):
+                if len(calls) >= 3:
+                    break
+                await asyncio.sleep(0.01)
+            assert len(calls) >= 3, "el broker dejó de sondear tras el error"
+            with Session() as db:
+                db.add(PlanetaChange(planeta_id=5, operation="delete"))
+                db.commit()
+            event = await asyncio.wait_for(subscriber.get(), 5)
+            broker.unsubscribe(subscriber)
+            await broker.stop()
+            return event
+
+        event = asyncio.run(scenario())
+        assert (event.operation, event.change_id) == ("delete", 1)
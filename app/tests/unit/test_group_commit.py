@@ -0,0 +1,142 @@
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.services.planeta_service as planeta_service
+from app.core.config import settings
+from app.core.database import Base
+from app.core.group_commit import GroupCommitter
+from app.schemas.schemas import PlanetaCreate, PlanetaUpdate
+from app.services.planeta_service import PlanetaService
+
+
+@pytest.fixture
+def group_commit(monkeypatch):
+    """SQLite en fichero y group commit con una ventana amplia para que los hilos coincidan."""
+    engine = create_engine(
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'group.db')}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+
+    monkeypatch.setattr(settings, "GROUP_COMMIT_ENABLED", True)
+    monkeypatch.setattr(planeta_service, "_write_group", GroupCommitter(
+        PlanetaService._apply_write_group, window=0.2, max_items=4
+    ))
+    yield sessionmaker(bind=engine, autoflush=False), commits
+    engine.dispose()
+
+
+def run_concurrently(session_factory, calls):
+    barrier = threading.Barrier(len(calls))
+
+    def run(call):
+        db = session_factory()
+        barrier.wait()
+        try:
+            return call(db)
+        except HTTPException as exc:
+            return exc
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        return list(pool.map(run, calls))
+
+
+class TestGroupCommit:
+    """Pruebas unitarias del group commit de escrituras"""
+
+    def test_concurrent_creates_share_one_commit(self, group_commit):
+        """✓ Cuatro altas concurrentes se confirman con un solo commit"""
+        session_factory, commits = group_commit
+        results = run_concurrently(session_factory, [
+            lambda db, n=n: PlanetaService.create_planeta(db, PlanetaCreate(nombre=f"P{n}", tipo="Rocoso"))
+            for n in range(4)
+        ])
+        assert sorted(p.nombre for p in results) == ["P0", "P1", "P2", "P3"]
+        assert all(p.created_at is not None for p in results)
+        assert len(commits) == 1
+
+    def test_duplicate_name_fails_only_its_request(self, group_commit):
+        """✗ Un nombre duplicado dentro del grupo devuelve 409 solo a esa petición"""
+        session_factory, _ = group_commit
+        results = run_concurrently(session_factory, [
+            lambda db: PlanetaService.create_planeta(db, PlanetaCreate(nombre="Marte", tipo="Rocoso")),
+            lambda db: PlanetaService.create_planeta(db, PlanetaCreate(nombre="Marte", tipo="Rocoso")),
+            lambda db: PlanetaService.create_planeta(db, PlanetaCreate(nombre="Venus", tipo="Rocoso")),
+        ])
+        errors = [r for r in results if isinstance(r, HTTPException)]
+        assert len(errors) == 1 and errors[0].status_code == 409
+        assert sorted(r.nombre for r in results if not isinstance(r, HTTPException)) == ["Marte", "Venus"]
+
+    def test_integrity_error_falls_back_to_single_commits(self, group_commit, monkeypatch):
+        """✓ Si el commit del grupo viola una restricción, cada operación se repite por separado"""
+        session_factory, _ = group_commit
+        db = session_factory()
+        PlanetaService.create_planeta(db, PlanetaCreate(nombre="Tierra", tipo="Rocoso"))
+        db.close()
+        # Simula una carrera con otro worker: la comprobación previa del nombre no ve el duplicado
+        monkeypatch.setattr(PlanetaService, "get_planeta_by_nombre", staticmethod(lambda db, nombre: None))
+        results = run_concurrently(session_factory, [
+            lambda db: PlanetaService.create_planeta(db, PlanetaCreate(nombre="Tierra", tipo="Rocoso")),
+            lambda db: PlanetaService.create_planeta(db, PlanetaCreate(nombre="Venus", tipo="Rocoso")),
+        ])
+        errors = [r for r in results if isinstance(r, HTTPException)]
+        assert len(errors) == 1 and errors[0].status_code == 409
+        assert [r.nombre for r in results if not isinstance(r, HTTPException)] == ["Venus"]
+
+    def test_same_name_in_group_skips_fallback(self, group_commit, monkeypatch):
+        """✗ Dos altas con el mismo nombre en un grupo: 409 a la segunda sin deshacer el grupo"""
+        session_factory, commits = group_commit
+        # Como con el índice de nombres cargado: la comprobación no ve lo añadido en el propio grupo
+        monkeypatch.setattr(PlanetaService, "get_planeta_by_nombre", staticmethod(lambda db, nombre: None))
+        results = run_concurrently(session_factory, [
+            lambda db: PlanetaService.create_planeta(db, PlanetaCreate(nombre="Marte", tipo="Rocoso")),
+            lambda db: PlanetaService.create_planeta(db, PlanetaCreate(nombre="Marte", tipo="Rocoso")),
+            lambda db: PlanetaService.create_planeta(db, PlanetaCreate(nombre="Venus", tipo="Rocoso")),
+        ])
+        errors = [r for r in results if isinstance(r, HTTPException)]
+        assert len(errors) == 1 and errors[0].status_code == 409
+        assert sorted(r.nombre for r in results if not isinstance(r, HTTPException)) == ["Marte", "Venus"]
+        assert len(commits) == 1
+
+    def test_groups_capped_at_max_items(self):
+        """✓ Las operaciones que llegan con el grupo lleno abren otro grupo"""
+        sizes = []
+
+        def apply(db, items):
+            sizes.append(len(items))
+            for item in items:
+                item.result = item.payload
+
+        committer = GroupCommitter(apply, window=0.2, max_items=2)
+        barrier = threading.Barrier(5)
+
+        def submit(n):
+            barrier.wait()
+            return committer.submit(None, n)
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            results = list(pool.map(submit, range(5)))
+        assert results == list(range(5))
+        assert max(sizes) <= 2 and sum(sizes) == 5
+
+    def test_update_in_group(self, group_commit):
+        session_factory, _ = group_commit
+        db = session_factory()
+        creado = PlanetaService.create_planeta(db, PlanetaCreate(nombre="Jupiter", tipo="Gaseoso"))
+        db.close()
+        results = run_concurrently(session_factory, [
+            lambda db: PlanetaService.update_planeta(db, creado.id, PlanetaUpdate(numeroLunas=95)),
+            lambda db: PlanetaService.update_planeta(db, 9999, PlanetaUpdate(numeroLunas=1)),
+        ])
+        assert results[0].numeroLunas == 95
+        assert results[1].status_code == 404
@@ -0,0 +1,117 @@
+import time
+from datetime import timezone
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import Settings
+from app.core.database import Base
+from app.core.idempotency import (
+    DatabaseIdempotencyStore,
+    MemoryIdempotencyStore,
+    fingerprint_request,
+    scoped_key,
+)
+from app.models.idempotency_key import IdempotencyKey
+
+HEADERS = [(b"content-type", b"application/json")]
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+class TestIdempotencyHelpers:
+    """Pruebas de huella y ámbito de las claves"""
+
+    def test_fingerprint_depends_on_body(self):
+        assert fingerprint_request("POST", "/planetas/", b"", b"{}") == fingerprint_request("POST", "/planetas/", b"", b"{}")
+        assert fingerprint_request("POST", "/planetas/", b"", b"{}") != fingerprint_request("POST", "/planetas/", b"", b"[]")
+
+    def test_key_scoped_by_sender(self):
+        assert scoped_key(b"Bearer a", "k") != scoped_key(b"Bearer b", "k")
+        assert scoped_key(b"", "k") == "anon:k"
+
+    def test_store_defaults_to_database_with_several_workers(self):
+        """✓ Con varios workers las claves se comparten en la base de datos"""
+        def make_settings(**overrides):
+            return Settings(_env_file=None, SECRET_KEY="test", **overrides)
+
+        assert make_settings().idempotency_store() == "memory"
+        assert make_settings(WEB_CONCURRENCY=4).idempotency_store() == "database"
+        assert make_settings(WEB_CONCURRENCY=4, IDEMPOTENCY_STORE="memory").idempotency_store() == "memory"
+
+
+class TestMemoryIdempotencyStore:
+    """Pruebas del almacén en memoria"""
+
+    def test_reserve_complete_replay(self):
+        store = MemoryIdempotencyStore(ttl=60, max_keys=10)
+        assert store.reserve("k", "f") is None
+        in_flight = store.reserve("k", "f")
+        assert in_flight.status_code is None
+
+        store.complete("k", 201, HEADERS, b'{"id":1}')
+        stored = store.reserve("k", "f")
+        assert (stored.status_code, stored.body) == (201, b'{"id":1}')
+
+    def test_release_allows_retry(self):
+        store = MemoryIdempotencyStore(ttl=60, max_keys=10)
+        store.reserve("k", "f")
+        store.release("k")
+        assert store.reserve("k", "f") is None
+
+    def test_expired_and_bounded(self):
+        store = MemoryIdempotencyStore(ttl=0.01, max_keys=2)
+        store.reserve("a", "f")
+        store.complete("a", 201, HEADERS, b"")
+        time.sleep(0.02)
+        assert store.reserve("a", "f") is None  # caducada: se vuelve a reservar
+
+        store.reserve("b", "f")
+        store.reserve("c", "f")
+        assert len(store) == 2  # "a" (la más antigua) se descarta
+
+
+class TestDatabaseIdempotencyStore:
+    """Pruebas del almacén en la tabla idempotency_keys"""
+
+    def test_reserve_complete_replay(self, session_factory):
+        store = DatabaseIdempotencyStore(ttl=60, max_keys=10, session_factory=session_factory)
+        assert store.reserve("k", "f") is None
+        assert store.reserve("k", "f").status_code is None
+
+        store.complete("k", 201, HEADERS, b'{"id":1}')
+        stored = store.reserve("k", "f")
+        assert (stored.status_code, stored.headers, stored.body) == (201, HEADERS, b'{"id":1}')
+
+        store.release("k")
+        assert store.reserve("k", "f") is None
+
+    def test_purge_bounds_table(self, session_factory):
+        store = DatabaseIdempotencyStore(ttl=60, max_keys=3, session_factory=session_factory)
+        for i in range(5):
+            store.reserve(f"k{i}", "f")
+        store.purge()
+        with session_factory() as db:
+            assert db.query(IdempotencyKey).count() == 3
+
+    def test_timezone_aware_dates(self, session_factory):
+        """✓ PostgreSQL devuelve expires_at con zona horaria: la comparación no falla"""
+        store = DatabaseIdempotencyStore(ttl=60, max_keys=10, session_factory=session_factory)
+        assert store.reserve("k", "f") is None
+
+        def as_aware(row, context):
+            set_committed_value(row, "expires_at", row.expires_at.replace(tzinfo=timezone.utc))
+
+        event.listen(IdempotencyKey, "load", as_aware)
+        try:
+            assert store.reserve("k", "f").status_code is None
+        finally:
+            event.remove(IdempotencyKey, "load", as_aware)
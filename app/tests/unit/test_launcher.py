@@ -0,0 +1,80 @@
+from app.core.config import Settings
+from app.launcher import compute_plan
+
+
+def make_settings(**overrides):
+    values = {"SECRET_KEY": "test", "DATABASE_URL": "postgresql://u:p@db/planetas"}
+    values.update(overrides)
+    return Settings(_env_file=None, **values)
+
+
+class TestLaunchPlan:
+    """Pruebas unitarias del cálculo del plan de concurrencia"""
+
+    def test_workers_from_cpus(self):
+        """✓ 2 × CPU + 1 workers si hay memoria y conexiones de sobra"""
+        plan = compute_plan(make_settings(), cpus=2, memory_mb=4096)
+        assert plan.workers == 5
+        assert plan.threadpool_tokens == 15  # pool 5 + overflow 10
+
+    def test_workers_limited_by_memory(self):
+        """✓ La memoria limita el número de workers"""
+        plan = compute_plan(make_settings(WORKER_MEMORY_MB=256), cpus=8, memory_mb=512)
+        assert plan.workers == 2
+
+    def test_pool_never_exceeds_connection_limit(self):
+        """✓ workers × (pool + overflow) no supera las conexiones disponibles"""
+        config = make_settings(DB_MAX_CONNECTIONS=25, DB_RESERVED_CONNECTIONS=5, DB_POOL_SIZE=10, DB_MAX_OVERFLOW=10)
+        plan = compute_plan(config, cpus=4, memory_mb=8192)
+        assert plan.workers == 9
+        assert plan.db_connections_total <= 20
+        assert plan.db_pool_size == 2
+        assert plan.db_max_overflow == 0
+
+    def test_workers_capped_by_connections(self):
+        """✓ Nunca hay más workers que conexiones"""
+        plan = compute_plan(make_settings(DB_MAX_CONNECTIONS=4, DB_RESERVED_CONNECTIONS=1), cpus=4, memory_mb=8192)
+        assert plan.workers == 3
+        assert plan.db_connections_total <= 3
+
+    def test_explicit_values_are_respected(self):
+        """✓ WEB_CONCURRENCY y THREADPOOL_TOKENS explícitos se respetan"""
+        plan = compute_plan(make_settings(WEB_CONCURRENCY=2, THREADPOOL_TOKENS=12), cpus=16, memory_mb=256)
+        assert plan.workers == 2
+        assert plan.threadpool_tokens == 12
+
+    def test_threads_never_outnumber_connections(self):
+        """✓ Los hilos se limitan a las conexiones que le tocan a cada worker"""
+        config = make_settings(DB_MAX_CONNECTIONS=25, DB_RESERVED_CONNECTIONS=5, THREADPOOL_TOKENS=40)
+        plan = compute_plan(config, cpus=4, memory_mb=8192)
+        assert plan.threadpool_tokens == plan.db_pool_size + plan.db_max_overflow == 2
+
+    def test_sqlite_has_no_connection_limit(self):
+        plan = compute_plan(make_settings(DATABASE_URL="sqlite:///./planetas.db"), cpus=1, memory_mb=None)
+        assert plan.workers == 3
+        assert plan.db_connection_limit is None
+
+
+class TestPasswordRoundsCalibration:
+    """Pruebas de la calibración única de rondas para todos los workers"""
+
+    def test_calibrated_once_and_passed_to_workers(self, monkeypatch):
+        """✓ El lanzador calibra y desactiva la calibración por worker"""
+        import app.core.security as security
+        from app.launcher import password_rounds_env
+        monkeypatch.setattr(security, "calibrate_password_rounds", lambda target_ms, scheme=None: 11)
+        env = password_rounds_env(make_settings(PASSWORD_HASH_CALIBRATE=True))
+        assert env == {"PASSWORD_HASH_ROUNDS": "11", "PASSWORD_HASH_CALIBRATE": "false"}
+
+    def test_explicit_rounds_not_recalibrated(self):
+        from app.launcher import password_rounds_env
+        assert password_rounds_env(make_settings(PASSWORD_HASH_CALIBRATE=True, PASSWORD_HASH_ROUNDS=12)) == {}
+
+    def test_calibrated_policy_tolerates_neighbouring_rounds(self):
+        """✓ Un hash con una ronda de diferencia no se marca para rehash"""
+        from passlib.context import CryptContext
+        from app.core.security import _rounds_policy
+        context = CryptContext(schemes=["bcrypt"], **_rounds_policy("bcrypt", 5, tolerance=True))
+        assert not context.needs_update(context.hash("x", rounds=4))
+        assert not context.needs_update(context.hash("x", rounds=6))
+        assert context.needs_update(context.hash("x", rounds=7))
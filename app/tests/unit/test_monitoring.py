@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.monitoring import install_query_instrumentation, track_queries
+
+
+class TestQueryInstrumentation:
+    """Pruebas de la instrumentación de sentencias SQL"""
+
+    def test_failed_statement_does_not_leak_start_time(self):
+        """✓ Una sentencia fallida no deja su inicio en la conexión"""
+        install_query_instrumentation()
+        engine = create_engine("sqlite://")
+        with engine.connect() as connection:
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM tabla_inexistente"))
+            assert connection.info.get("query_start_time") == []
+
+            with track_queries() as stats:
+                connection.execute(text("SELECT 1"))
+            assert stats.count == 1
+            assert connection.info["query_start_time"] == []
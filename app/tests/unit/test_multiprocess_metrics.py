@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+from prometheus_client import CollectorRegistry, multiprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+INCREMENT = (
+    "from app.core.monitoring import record_planeta_operation;"
+    "record_planeta_operation('create', 'Rocoso')"
+)
+
+
+class TestMultiprocessMetrics:
+    """Agregación de métricas entre procesos (modo multiproceso de gunicorn)"""
+
+    def test_counters_are_aggregated_across_processes(self, tmp_path):
+        """✓ Un único scrape ve la suma de los contadores de todos los workers"""
+        env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path), "PYTHONPATH": ROOT}
+        for _ in range(3):
+            subprocess.run([sys.executable, "-c", INCREMENT], env=env, cwd=ROOT, check=True)
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=str(tmp_path))
+
+        value = registry.get_sample_value(
+            "planetas_operations_total", {"operation": "create", "tipo": "Rocoso"}
+        )
+        assert value == 3
@@ -0,0 +1,147 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.services.planeta_service as planeta_service
+from app.core.database import Base
+from app.core.name_index import NameIndex
+from app.models.planeta import Planeta, TipoPlaneta
+from app.models.planeta_change import PlanetaChange
+from app.schemas.schemas import PlanetaCreate
+from app.services.planeta_service import PlanetaService
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    session.add(Planeta(nombre="Tierra", tipo=TipoPlaneta.ROCOSO))
+    session.commit()
+    yield session
+    session.close()
+
+
+def other_worker_change(db, planeta_id, operation):
+    db.add(PlanetaChange(planeta_id=planeta_id, operation=operation))
+    db.commit()
+
+
+class TestNameIndex:
+    """Pruebas unitarias del índice de nombres"""
+
+    def test_not_loaded_defers_to_database(self, db):
+        assert NameIndex().contains(db, "Tierra", max_staleness=1) is None
+
+    def test_load_and_lookup(self, db):
+        index = NameIndex()
+        index.load(db)
+        assert index.contains(db, "Tierra", max_staleness=60) is True
+        assert index.contains(db, "Marte", max_staleness=60) is False
+
+    def test_record_local_writes(self, db):
+        index = NameIndex()
+        index.load(db)
+        index.record(10, "Marte")
+        index.record(10, "Marte II")  # renombrado
+        assert index.contains(db, "Marte", max_staleness=60) is False
+        assert index.contains(db, "Marte II", max_staleness=60) is True
+        index.record(10, None)
+        assert index.contains(db, "Marte II", max_staleness=60) is False
+
+    def test_stale_positive_synced_from_changelog(self, db):
+        """✓ Un planeta borrado en otro worker no provoca un 409 falso"""
+        index = NameIndex()
+        index.load(db)
+        tierra = db.query(Planeta).filter(Planeta.nombre == "Tierra").first()
+        db.delete(tierra)
+        other_worker_change(db, tierra.id, "delete")
+
+        assert index.contains(db, "Tierra", max_staleness=60) is True  # aún dentro del margen
+        assert index.contains(db, "Tierra", max_staleness=0) is False
+
+    def test_sync_picks_up_creates_and_renames(self, db):
+        index = NameIndex()
+        index.load(db)
+        venus = Planeta(nombre="Venus", tipo=TipoPlaneta.ROCOSO)
+        db.add(venus)
+        db.commit()
+        other_worker_change(db, venus.id, "create")
+        index.sync(db)
+        assert index.contains(db, "Venus", max_staleness=60) is True
+
+        venus.nombre = "Lucero"
+        db.commit()
+        other_worker_change(db, venus.id, "update")
+        index.sync(db)
+        assert index.contains(db, "Venus", max_staleness=60) is False
+        assert index.contains(db, "Lucero", max_staleness=60) is True
+
+    def test_create_skips_select_and_confirms_duplicates(self, db, monkeypatch):
+        """✓ Con el índice cargado, un alta no consulta el nombre y un duplicado se confirma con un SELECT"""
+        index = NameIndex()
+        index.load(db)
+        monkeypatch.setattr(planeta_service, "planeta_names", index)
+        lookups = []
+        get_planeta_by_nombre = PlanetaService.get_planeta_by_nombre
+
+        def counted_select(db, nombre):
+            lookups.append(nombre)
+            return get_planeta_by_nombre(db, nombre)
+
+        monkeypatch.setattr(PlanetaService, "get_planeta_by_nombre", staticmethod(counted_select))
+        PlanetaService._stage_create(db, PlanetaCreate(nombre="Marte", tipo="Rocoso"))
+        db.rollback()
+        assert lookups == []
+
+        with pytest.raises(HTTPException) as exc:
+            PlanetaService.create_planeta(db, PlanetaCreate(nombre="Tierra", tipo="Rocoso"))
+        assert exc.value.status_code == 409
+        assert lookups == ["Tierra"]
+
+    def test_sync_stops_at_uncommitted_gap(self, db):
+        """✓ El índice no avanza su token más allá de un cambio que se confirma después"""
+        index = NameIndex()
+        index.load(db)
+        venus = Planeta(nombre="Venus", tipo=TipoPlaneta.ROCOSO)
+        marte = Planeta(nombre="Marte", tipo=TipoPlaneta.ROCOSO)
+        db.add_all([venus, marte])
+        db.flush()
+        db.add(PlanetaChange(id=2, planeta_id=marte.id, operation="create"))
+        db.commit()
+        index.sync(db)
+        assert index.contains(db, "Marte", max_staleness=60) is False
+
+        db.add(PlanetaChange(id=1, planeta_id=venus.id, operation="create"))
+        db.commit()
+        index.sync(db)
+        assert index.contains(db, "Venus", max_staleness=60) is True
+        assert index.contains(db, "Marte", max_staleness=60) is True
+
+    def test_concurrent_stale_lookups_sync_once(self, db, monkeypatch):
+        """✓ Varias comprobaciones a la vez con el índice caducado: un solo hilo sincroniza"""
+        index = NameIndex()
+        index.load(db)
+        syncs = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_sync(session):
+            syncs.append(1)
+            started.set()
+            release.wait(5)
+
+        monkeypatch.setattr(index, "_sync", slow_sync)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            first = pool.submit(index.contains, db, "Tierra", 0)
+            assert started.wait(5)
+            others = [pool.submit(index.contains, db, "Tierra", 0) for _ in range(3)]
+            assert [f.result(5) for f in others] == [True, True, True]
+            release.set()
+            assert first.result(5) is True
+        assert len(syncs) == 1
@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from unittest.mock import Mock, patch
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from app.core.database import LazySession
+from app.core.security import (
+    AuthenticatedUser,
+    clear_user_cache,
+    create_access_token,
+    require_roles,
+)
+
+
+def credentials_for(username: str, role: str) -> HTTPAuthorizationCredentials:
+    token = create_access_token({"sub": username, "role": role})
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+class TestAuthorizationChain:
+    """Pruebas unitarias de la dependencia de autorización"""
+
+    @pytest.fixture(autouse=True)
+    def empty_cache(self):
+        clear_user_cache()
+        yield
+        clear_user_cache()
+
+    def test_role_rejected_before_db(self):
+        """✗ Un rol insuficiente se rechaza sin abrir la sesión"""
+        factory = Mock()
+        db = LazySession(factory)
+        dependency = require_roles("ADMIN")
+
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(dependency(credentials_for("usuario", "USUARIO"), db))
+
+        assert exc_info.value.status_code == 403
+        factory.assert_not_called()
+
+    def test_user_lookup_is_cached(self):
+        """✓ La comprobación del usuario se cachea entre peticiones"""
+        dependency = require_roles("ADMIN")
+        user = AuthenticatedUser(id=1, username="admin", role="ADMIN")
+
+        with patch('app.core.security._load_authenticated_user', return_value=user) as loader:
+            first = asyncio.run(dependency(credentials_for("admin", "ADMIN"), Mock()))
+            second = asyncio.run(dependency(credentials_for("admin", "ADMIN"), Mock()))
+
+        assert first == second == user
+        loader.assert_called_once()
+
+    def test_stale_token_role_is_rechecked(self):
+        """✗ Si el rol real ya no es ADMIN se rechaza aunque el token diga lo contrario"""
+        dependency = require_roles("ADMIN")
+        user = AuthenticatedUser(id=1, username="admin", role="USUARIO")
+
+        with patch('app.core.security._load_authenticated_user', return_value=user):
+            with pytest.raises(HTTPException) as exc_info:
+                asyncio.run(dependency(credentials_for("admin", "ADMIN"), Mock()))
+
+        assert exc_info.value.status_code == 403
+
+    def test_unknown_user(self):
+        """✗ Token válido de un usuario inexistente"""
+        dependency = require_roles()
+
+        with patch('app.core.security._load_authenticated_user', return_value=None):
+            with pytest.raises(HTTPException) as exc_info:
+                asyncio.run(dependency(credentials_for("fantasma", "USUARIO"), Mock()))
+
+        assert exc_info.value.status_code == 401
+
+
+class TestLazySession:
+    """Pruebas unitarias de la sesión perezosa"""
+
+    def test_session_created_on_first_use(self):
+        factory = Mock()
+        db = LazySession(factory)
+        assert not db.is_open
+
+        db.query("x")
+
+        factory.assert_called_once()
+        factory.return_value.query.assert_called_once_with("x")
+
+    def test_close_without_use_is_noop(self):
+        factory = Mock()
+        LazySession(factory).close()
+        factory.assert_not_called()
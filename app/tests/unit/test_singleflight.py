@@ -0,0 +1,61 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """Pruebas unitarias de la coalescencia de lecturas"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """✓ Las llamadas concurrentes con la misma clave ejecutan la función una vez"""
+        flight = SingleFlight("test")
+        release = threading.Event()
+        calls = []
+
+        def load():
+            calls.append(1)
+            release.wait(5)
+            return b"[]"
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            futures = [pool.submit(flight.do, "page", load) for _ in range(5)]
+            while len(calls) == 0 or flight._calls["page"].followers < 4:
+                threading.Event().wait(0.001)
+            release.set()
+            results = [f.result() for f in futures]
+
+        assert len(calls) == 1
+        assert all(body is results[0][0] for body, _ in results)
+        assert all(shared for _, shared in results)
+
+    def test_key_forgotten_after_completion(self):
+        """✓ No es una caché: una llamada posterior vuelve a ejecutar"""
+        flight = SingleFlight("test")
+        counter = iter(range(10))
+        assert flight.do("k", lambda: next(counter)) == (0, False)
+        assert flight.do("k", lambda: next(counter)) == (1, False)
+
+    def test_error_shared_with_followers(self):
+        """✗ La excepción del líder se propaga a los seguidores"""
+        flight = SingleFlight("test")
+        started, release = threading.Event(), threading.Event()
+
+        def failing():
+            started.set()
+            release.wait(5)
+            raise LookupError("no encontrado")
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(flight.do, "k", failing)
+            started.wait(5)
+            follower = pool.submit(flight.do, "k", lambda: "no se ejecuta")
+            while flight._calls["k"].followers < 1:
+                threading.Event().wait(0.001)
+            release.set()
+            for future in (leader, follower):
+                with pytest.raises(LookupError):
+                    future.result()
+        assert flight._calls == {}
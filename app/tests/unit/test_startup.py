@@ -0,0 +1,38 @@
+import subprocess
+import sys
+
+from app.core.config import Settings
+from benchmarks.importtime import LAZY_MODULES, parse_importtime
+
+
+def make_settings(**overrides):
+    return Settings(_env_file=None, SECRET_KEY="test", **overrides)
+
+
+class TestColdStart:
+    """Pruebas del coste de arranque en frío"""
+
+    def test_docs_disabled_in_production(self):
+        assert make_settings().docs_enabled()
+        assert not make_settings(ENVIRONMENT="production").docs_enabled()
+        assert make_settings(ENVIRONMENT="production", DOCS_ENABLED=True).docs_enabled()
+
+    def test_crypto_not_imported_at_startup(self):
+        """✓ Importar la app no carga passlib, jose ni cryptography"""
+        code = (
+            "import sys, app.main; "
+            f"print(sorted(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        assert result.stdout.strip().splitlines()[-1] == "[]"
+
+    def test_parse_importtime(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   jose.jwt\n"
+            "import time:      1500 |       1620 | app.main\n"
+        )
+        entries = parse_importtime(stderr)
+        assert entries[0] == {"module": "jose.jwt", "self_us": 120, "cumulative_us": 120, "depth": 1}
+        assert entries[1]["module"] == "app.main"
+        assert entries[1]["depth"] == 0
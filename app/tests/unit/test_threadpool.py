@@ -0,0 +1,32 @@
+from app.core.threadpool import _HoldTime, estimated_wait, hold_time
+
+
+class TestThreadpoolEstimate:
+    """Pruebas unitarias de la estimación de espera del threadpool"""
+
+    def test_no_wait_without_queue(self):
+        assert estimated_wait(0, 40) == 0.0
+
+    def test_wait_scales_with_queue(self, monkeypatch):
+        monkeypatch.setattr(hold_time, "value", 0.2)
+        assert estimated_wait(80, 40) == 0.4
+
+    def test_hold_time_ewma(self):
+        ewma = _HoldTime()
+        ewma.observe(1.0)
+        ewma.observe(0.0)
+        assert ewma.value == 0.8
+
+    def test_timed_in_thread_records_hold_time(self, monkeypatch):
+        import time
+        from app.core import threadpool
+        monkeypatch.setattr(threadpool, "hold_time", _HoldTime())
+
+        @threadpool.timed_in_thread
+        def endpoint(x):
+            time.sleep(0.01)
+            return x
+
+        assert endpoint(3) == 3
+        assert endpoint.__wrapped__ is not None
+        assert threadpool.hold_time.value >= 0.01
@@ -0,0 +1,44 @@
+"""
+Group commit frente a un commit por petición: altas concurrentes sobre SQLite
+en fichero (cada commit es un fsync). Se mide lo que tardan ``WRITERS`` hilos
+en crear ``WRITES_PER_THREAD`` planetas cada uno.
+"""
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import app.services.planeta_service as planeta_service
+from app.core.config import settings
+from app.core.group_commit import GroupCommitter
+from app.schemas.schemas import PlanetaCreate
+from app.services.planeta_service import PlanetaService
+
+WRITERS = 16
+WRITES_PER_THREAD = 10
+
+_names = itertools.count()
+
+
+@pytest.mark.parametrize("group_commit", [False, True], ids=["commit-por-peticion", "group-commit"])
+def bench_concurrent_creates(benchmark, bench_engine, monkeypatch, group_commit):
+    monkeypatch.setattr(settings, "GROUP_COMMIT_ENABLED", group_commit)
+    monkeypatch.setattr(planeta_service, "_write_group", GroupCommitter(
+        PlanetaService._apply_write_group, window=0.002, max_items=WRITERS
+    ))
+    session_factory = sessionmaker(bind=bench_engine, autoflush=False)
+
+    def writer(_):
+        db = session_factory()
+        try:
+            for _ in range(WRITES_PER_THREAD):
+                PlanetaService.create_planeta(db, PlanetaCreate(nombre=f"Grupo-{next(_names)}", tipo="Rocoso"))
+        finally:
+            db.close()
+
+    def run():
+        with ThreadPoolExecutor(max_workers=WRITERS) as pool:
+            list(pool.map(writer, range(WRITERS)))
+
+    benchmark.pedantic(run, rounds=5, warmup_rounds=1)
@@ -0,0 +1,18 @@
+"""Micro-benchmarks de JWT y verificación de contraseñas."""
+from app.core.security import create_access_token, decode_token, verify_password
+
+
+def bench_create_access_token(benchmark):
+    token = benchmark(create_access_token, {"sub": "admin", "role": "ADMIN"})
+    assert token
+
+
+def bench_decode_token(benchmark):
+    token = create_access_token({"sub": "admin", "role": "ADMIN"})
+    payload = benchmark(decode_token, token)
+    assert payload["sub"] == "admin"
+
+
+def bench_verify_password(benchmark, admin_hash):
+    # bcrypt es lento a propósito: pocas rondas bastan para una mediana estable
+    assert benchmark.pedantic(verify_password, args=("admin123", admin_hash), rounds=5, warmup_rounds=1)
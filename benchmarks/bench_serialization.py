@@ -0,0 +1,27 @@
+"""Micro-benchmarks de la validación/serialización de PlanetaResponse."""
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+
+from app.schemas.schemas import PlanetaResponse
+from app.services.planeta_service import PlanetaService
+from benchmarks.conftest import SIZES
+
+planetas_adapter = TypeAdapter(List[PlanetaResponse])
+
+
+@pytest.mark.parametrize("size", SIZES)
+def bench_validate_planeta_response(benchmark, db, size):
+    planetas = PlanetaService.get_all_planetas(db, skip=0, limit=size)
+    result = benchmark(planetas_adapter.validate_python, planetas, from_attributes=True)
+    assert len(result) == size
+
+
+@pytest.mark.parametrize("size", SIZES)
+def bench_dump_planeta_response_json(benchmark, db, size):
+    planetas = planetas_adapter.validate_python(
+        PlanetaService.get_all_planetas(db, skip=0, limit=size), from_attributes=True
+    )
+    body = benchmark(planetas_adapter.dump_json, planetas)
+    assert body.startswith(b"[")
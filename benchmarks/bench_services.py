@@ -0,0 +1,42 @@
+"""Micro-benchmarks de PlanetaService sobre SQLite con datos precargados."""
+import itertools
+
+import pytest
+
+from app.schemas.schemas import PlanetaCreate, PlanetaUpdate
+from app.services.planeta_service import PlanetaService
+from benchmarks.conftest import SIZES
+
+_names = itertools.count()
+
+
+@pytest.mark.parametrize("size", SIZES)
+def bench_get_all_planetas(benchmark, db, size):
+    result = benchmark(PlanetaService.get_all_planetas, db, skip=0, limit=size)
+    assert len(result) == size
+
+
+def bench_get_planeta_by_id(benchmark, db):
+    result = benchmark(PlanetaService.get_planeta_by_id, db, 500)
+    assert result.id == 500
+
+
+def bench_get_planeta_by_nombre(benchmark, db):
+    result = benchmark(PlanetaService.get_planeta_by_nombre, db, "Bench-500")
+    assert result is not None
+
+
+def bench_create_planeta(benchmark, db):
+    def setup():
+        return (db, PlanetaCreate(nombre=f"Nuevo-{next(_names)}", tipo="Rocoso", numeroLunas=1)), {}
+
+    result = benchmark.pedantic(PlanetaService.create_planeta, setup=setup, rounds=200, warmup_rounds=5)
+    assert result.id is not None
+
+
+def bench_update_planeta(benchmark, db):
+    def setup():
+        return (db, 250, PlanetaUpdate(numeroLunas=next(_names) % 100)), {}
+
+    result = benchmark.pedantic(PlanetaService.update_planeta, setup=setup, rounds=200, warmup_rounds=5)
+    assert result.id == 250
@@ -0,0 +1,40 @@
+"""
+Consultas calientes: ``db.query(...).filter(...)`` construido en cada llamada
+frente a las sentencias ``select()`` precompiladas con ``bindparam`` que usan
+``PlanetaService`` y ``_load_authenticated_user``. Cada pareja lee las mismas
+columnas con el mismo SQL; la diferencia es el trabajo en Python de montar la
+sentencia y buscarla en la caché de compilación.
+"""
+import pytest
+
+from app.core.security import _load_authenticated_user
+from app.models.planeta import Planeta
+from app.models.user import User
+from app.services.planeta_service import PlanetaService
+
+QUERIES = {
+    "by-id": (
+        lambda db: db.query(Planeta).filter(Planeta.id == 500).first(),
+        lambda db: PlanetaService.get_planeta_by_id(db, 500),
+    ),
+    "by-nombre": (
+        lambda db: db.query(Planeta).filter(Planeta.nombre == "Bench-500").first(),
+        lambda db: PlanetaService.get_planeta_by_nombre(db, "Bench-500"),
+    ),
+    "by-username": (
+        # Las mismas columnas que _user_by_username, no la entidad User completa
+        lambda db: db.query(User.id, User.username, User.role, User.is_active).filter(User.username == "admin").first(),
+        lambda db: _load_authenticated_user(db, "admin"),
+    ),
+    "pagina-10": (
+        lambda db: db.query(Planeta).offset(0).limit(10).all(),
+        lambda db: PlanetaService.get_all_planetas(db, skip=0, limit=10),
+    ),
+}
+
+
+@pytest.mark.parametrize("query", list(QUERIES))
+@pytest.mark.parametrize("prebuilt", [False, True], ids=["query-por-llamada", "select-precompilado"])
+def bench_hot_query(benchmark, db, query, prebuilt):
+    fn = QUERIES[query][prebuilt]
+    assert benchmark(fn, db) is not None
@@ -0,0 +1,143 @@
+"""
+Fixtures de los micro-benchmarks.
+
+Se ejecutan con ``python -m pytest benchmarks``. Si ``pytest-benchmark`` está
+instalado se usa su fixture ``benchmark`` (con ``--benchmark-json``,
+``--benchmark-compare``, etc.); si no, se usa un temporizador mínimo con la
+misma interfaz que imprime un resumen al final.
+"""
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.core.security import get_password_hash
+from app.models.planeta import Planeta, TipoPlaneta, EstadoPlaneta
+from app.models.user import User
+
+SIZES = [10, 100, 1000]
+
+try:
+    import pytest_benchmark  # noqa: F401
+    HAS_PYTEST_BENCHMARK = True
+except ImportError:
+    HAS_PYTEST_BENCHMARK = False
+
+
+class SimpleBenchmark:
+    """Subconjunto de la API de pytest-benchmark: ``benchmark(fn, ...)`` y ``benchmark.pedantic``."""
+
+    results = []
+
+    def __init__(self, name: str, min_time: float = 0.2, max_rounds: int = 100_000):
+        self.name = name
+        self.min_time = min_time
+        self.max_rounds = max_rounds
+
+    def _record(self, timings):
+        timings.sort()
+        self.results.append({
+            "name": self.name,
+            "rounds": len(timings),
+            "min_us": timings[0] * 1e6,
+            "median_us": timings[len(timings) // 2] * 1e6,
+            "mean_us": sum(timings) / len(timings) * 1e6,
+        })
+
+    def __call__(self, fn, *args, **kwargs):
+        timings = []
+        result = None
+        deadline = time.perf_counter() + self.min_time
+        while len(timings) < self.max_rounds and (len(timings) < 5 or time.perf_counter() < deadline):
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            timings.append(time.perf_counter() - start)
+        self._record(timings)
+        return result
+
+    def pedantic(self, fn, args=(), kwargs=None, setup=None, rounds=1, iterations=1, warmup_rounds=0):
+        kwargs = kwargs or {}
+        timings = []
+        result = None
+        for i in range(warmup_rounds + rounds):
+            if setup is not None:
+                prepared = setup()
+                if prepared is not None:
+                    args, kwargs = prepared
+            start = time.perf_counter()
+            for _ in range(iterations):
+                result = fn(*args, **kwargs)
+            if i >= warmup_rounds:
+                timings.append((time.perf_counter() - start) / iterations)
+        self._record(timings)
+        return result
+
+
+if not HAS_PYTEST_BENCHMARK:
+    @pytest.fixture
+    def benchmark(request):
+        return SimpleBenchmark(request.node.name)
+
+    def pytest_terminal_summary(terminalreporter):
+        if not SimpleBenchmark.results:
+            return
+        terminalreporter.section("benchmarks (temporizador simple; instale pytest-benchmark para más detalle)")
+        terminalreporter.write_line(f"{'nombre':<60} {'rondas':>8} {'min µs':>12} {'mediana µs':>12} {'media µs':>12}")
+        for r in SimpleBenchmark.results:
+            terminalreporter.write_line(
+                f"{r['name']:<60} {r['rounds']:>8} {r['min_us']:>12.1f} {r['median_us']:>12.1f} {r['mean_us']:>12.1f}"
+            )
+
+
+@pytest.fixture(scope="session")
+def bench_engine():
+    """SQLite en fichero temporal con usuarios (hash calculado una sola vez) y planetas precargados."""
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+
+    session = sessionmaker(bind=engine)()
+    hashed = get_password_hash("admin123")
+    session.add_all([
+        User(username="admin", email="admin@bench.com", hashed_password=hashed, role="ADMIN", is_active=True),
+        User(username="usuario", email="usuario@bench.com", hashed_password=hashed, role="USUARIO", is_active=True),
+    ])
+    tipos = list(TipoPlaneta)
+    session.add_all([
+        Planeta(
+            nombre=f"Bench-{i}",
+            tipo=tipos[i % len(tipos)],
+            distanciaAlSol=float(i),
+            numeroLunas=i % 80,
+            masa=1.0 + i,
+            estado=EstadoPlaneta.CONFIRMADO,
+            fechaDescubrimiento=datetime(2000, 1, 1),
+        )
+        for i in range(1, max(SIZES) + 1)
+    ])
+    session.commit()
+    session.close()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(bench_engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=bench_engine)()
+    yield session
+    session.rollback()
+    session.close()
+
+
+@pytest.fixture(scope="session")
+def admin_hash(bench_engine):
+    session = sessionmaker(bind=bench_engine)()
+    try:
+        return session.query(User).filter(User.username == "admin").first().hashed_password
+    finally:
+        session.close()
@@ -0,0 +1,116 @@
+"""
+Coste de arranque en frío: tiempo de importación de ``app.main``.
+
+Lanza varias veces ``python -X importtime -c "import app.main"`` en procesos
+nuevos (como un cold start de Vercel), interpreta la salida de ``-X importtime``
+y muestra la mediana del tiempo total, los módulos más caros y si se cargó
+alguno de los módulos que deberían importarse de forma diferida. Con
+``--baseline`` falla si el tiempo total empeora más de ``--tolerance``.
+
+Uso:
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --runs 10 --top 30 --output resultados/importtime.json
+    python -m benchmarks.importtime --baseline benchmarks/importtime_baseline.json
+    python -m benchmarks.importtime --save-baseline benchmarks/importtime_baseline.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+# Dependencias pesadas que solo se cargan al primer uso (hash de contraseñas, JWT)
+LAZY_MODULES = ("jose", "cryptography", "passlib", "bcrypt")
+
+
+def parse_importtime(stderr: str) -> List[dict]:
+    """Convierte la salida de ``-X importtime`` en ``{module, self_us, cumulative_us, depth}``."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # cabecera "self [us] | cumulative | imported package"
+        entries.append({
+            "module": name.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+        })
+    return entries
+
+
+def measure_once(target: str, env: dict) -> List[dict]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def summarize(runs: List[List[dict]], target: str, top: int) -> dict:
+    totals = [next(e["cumulative_us"] for e in entries if e["module"] == target) for entries in runs]
+    # Módulos más caros por tiempo propio (mediana entre ejecuciones)
+    self_times: Dict[str, List[int]] = {}
+    for entries in runs:
+        for entry in entries:
+            self_times.setdefault(entry["module"], []).append(entry["self_us"])
+    slowest = sorted(
+        ((module, statistics.median(values)) for module, values in self_times.items()),
+        key=lambda item: item[1], reverse=True,
+    )[:top]
+    loaded = {entry["module"].split(".")[0] for entry in runs[0]}
+    return {
+        "target": target,
+        "runs": len(runs),
+        "total_ms": round(statistics.median(totals) / 1000, 1),
+        "min_ms": round(min(totals) / 1000, 1),
+        "max_ms": round(max(totals) / 1000, 1),
+        "modules": len(runs[0]),
+        "eager_heavy_modules": sorted(m for m in LAZY_MODULES if m in loaded),
+        "slowest_self_ms": {module: round(us / 1000, 2) for module, us in slowest},
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.importtime", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--target", default="app.main", help="Módulo a importar")
+    parser.add_argument("--runs", type=int, default=5, help="Procesos nuevos a medir")
+    parser.add_argument("--top", type=int, default=20, help="Módulos más lentos a mostrar")
+    parser.add_argument("--output", help="Fichero donde guardar el informe JSON")
+    parser.add_argument("--baseline", help="Informe base para detectar regresiones")
+    parser.add_argument("--save-baseline", help="Guardar este informe como nuevo informe base")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Margen relativo antes de marcar regresión")
+    args = parser.parse_args(argv)
+
+    # Sin .pyc obsoletos ni caché de otro intérprete: se mide el cold start real del código
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    env.setdefault("SECRET_KEY", "importtime-benchmark")
+    report = summarize([measure_once(args.target, env) for _ in range(args.runs)], args.target, args.top)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        regressions = []
+        if report["total_ms"] > baseline["total_ms"] * (1 + args.tolerance):
+            regressions.append(f"total {report['total_ms']} ms > base {baseline['total_ms']} ms")
+        for module in set(report["eager_heavy_modules"]) - set(baseline.get("eager_heavy_modules", [])):
+            regressions.append(f"{module} se importa al arrancar")
+        report["regressions"] = regressions
+        exit_code = 1 if regressions else 0
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    for path in filter(None, (args.output, args.save_baseline)):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(output)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Prueba de carga en Python equivalente a ``jmeter/planetas_load_test.jmx``.
+
+Cada usuario virtual repite en bucle Login -> Crear planeta -> Listar planetas,
+igual que el plan de JMeter (200 hilos, ramp-up de 1 s). Sin ``--base-url`` la
+API se ejecuta en el mismo proceso (httpx + ASGITransport) sobre una base de
+datos SQLite temporal, así que se puede lanzar en CI sin Java ni servidor.
+
+Uso:
+    python -m benchmarks.load_test --users 200 --ramp 1 --duration 30
+    python -m benchmarks.load_test --base-url http://localhost:8000 --output resultados/carga.json
+    python -m benchmarks.load_test --baseline benchmarks/baseline.json   # falla si hay regresión
+    python -m benchmarks.load_test --save-baseline benchmarks/baseline.json
+
+El informe JSON incluye throughput, p50/p95/p99 y tasa de errores por endpoint.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+import httpx
+
+LOGIN = "POST /auth/login"
+CREATE = "POST /planetas/"
+LIST = "GET /planetas/"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano (el mismo criterio que los informes de JMeter)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Recorder:
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, endpoint: str, elapsed: float, ok: bool) -> None:
+        self.latencies[endpoint].append(elapsed)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def report(self, duration: float, config: dict) -> dict:
+        endpoints = {}
+        total = 0
+        total_errors = 0
+        for endpoint, values in self.latencies.items():
+            count = len(values)
+            errors = self.errors[endpoint]
+            total += count
+            total_errors += errors
+            endpoints[endpoint] = {
+                "count": count,
+                "errors": errors,
+                "error_rate": round(errors / count, 4) if count else 0.0,
+                "throughput_rps": round(count / duration, 2),
+                "mean_ms": round(sum(values) / count * 1000, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+        return {
+            "config": config,
+            "duration_s": round(duration, 2),
+            "total_requests": total,
+            "throughput_rps": round(total / duration, 2) if duration else 0.0,
+            "error_rate": round(total_errors / total, 4) if total else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+async def timed(client: httpx.AsyncClient, recorder: Recorder, endpoint: str, method: str, url: str, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        recorder.record(endpoint, time.perf_counter() - start, False)
+        return None
+    recorder.record(endpoint, time.perf_counter() - start, response.is_success)
+    return response
+
+
+async def virtual_user(number: int, client: httpx.AsyncClient, recorder: Recorder, args, deadline: float) -> None:
+    credentials = {"username": args.username, "password": args.password}
+    while time.perf_counter() < deadline:
+        response = await timed(client, recorder, LOGIN, "POST", "/auth/login", json=credentials)
+        if response is None or not response.is_success:
+            continue
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        planeta = {
+            "nombre": f"Planeta-{number}-{random.randint(1, 10000)}",
+            "tipo": "Rocoso",
+            "numeroLunas": random.randint(0, 100),
+        }
+        await timed(client, recorder, CREATE, "POST", "/planetas/", json=planeta, headers=headers)
+        await timed(client, recorder, LIST, "GET", "/planetas/", headers=headers)
+
+
+@asynccontextmanager
+async def make_client(args):
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    timeout = httpx.Timeout(args.timeout)
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+            yield client
+        return
+
+    # En proceso: base de datos temporal con los usuarios de prueba de init_db
+    if not os.environ.get("DATABASE_URL") or args.database_url:
+        database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/carga.db"
+        os.environ["DATABASE_URL"] = database_url
+    from app.core.database import init_db
+    from app.main import app
+
+    init_db()
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://loadtest", limits=limits, timeout=timeout
+        ) as client:
+            yield client
+
+
+async def run(args) -> dict:
+    recorder = Recorder()
+    async with make_client(args) as client:
+        start = time.perf_counter()
+        deadline = start + args.ramp + args.duration
+        tasks = []
+        for number in range(1, args.users + 1):
+            tasks.append(asyncio.create_task(virtual_user(number, client, recorder, args, deadline)))
+            if args.ramp:
+                await asyncio.sleep(args.ramp / args.users)
+        await asyncio.gather(*tasks)
+        duration = time.perf_counter() - start
+
+    config = {
+        "users": args.users,
+        "ramp_s": args.ramp,
+        "duration_s": args.duration,
+        "target": args.base_url or "in-process",
+    }
+    return recorder.report(duration, config)
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Lista de regresiones respecto a un informe base (vacía si no hay)."""
+    regressions = []
+    if report["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        regressions.append(
+            f"throughput {report['throughput_rps']} rps < base {baseline['throughput_rps']} rps"
+        )
+    for endpoint, base in baseline["endpoints"].items():
+        current = report["endpoints"].get(endpoint)
+        if current is None:
+            regressions.append(f"{endpoint}: sin muestras")
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if current[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{endpoint}: {metric} {current[metric]} > base {base[metric]}")
+        if current["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(f"{endpoint}: error_rate {current['error_rate']} > base {base['error_rate']}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_test", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", help="API ya desplegada; sin este parámetro se usa la app en proceso")
+    parser.add_argument("--database-url", help="Base de datos para el modo en proceso (por defecto SQLite temporal)")
+    parser.add_argument("--users", type=int, default=200, help="Usuarios virtuales concurrentes")
+    parser.add_argument("--ramp", type=float, default=1.0, help="Ramp-up en segundos")
+    parser.add_argument("--duration", type=float, default=30.0, help="Duración tras el ramp-up, en segundos")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por petición, en segundos")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--output", help="Fichero donde guardar el informe JSON")
+    parser.add_argument("--baseline", help="Informe base para detectar regresiones")
+    parser.add_argument("--save-baseline", help="Guardar este informe como nuevo informe base")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Margen relativo antes de marcar regresión")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            regressions = compare(report, json.load(fh), args.tolerance)
+        report["regressions"] = regressions
+        exit_code = 1 if regressions else 0
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    for path in filter(None, (args.output, args.save_baseline)):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(output)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
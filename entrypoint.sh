@@ -5,6 +5,7 @@ set -e
 echo "Aplicando migraciones de la base de datos..."
 alembic upgrade head
 
-# Iniciar el servidor con Gunicorn
+# Iniciar el servidor con Gunicorn (workers, bind y métricas multiproceso en gunicorn.conf.py).
+# app.launcher calcula workers, hilos y pool de BD según CPU, memoria y DB_MAX_CONNECTIONS.
 echo "Iniciando servidor..."
-gunicorn -w 4 -k uvicorn.workers.UvicornWorker -b 0.0.0.0:8000 app.main:app
\ No newline at end of file
+exec python -m app.launcher
\ No newline at end of file
@@ -0,0 +1,28 @@
+# Configuración de Gunicorn (se usa desde entrypoint.sh)
+import os
+import shutil
+
+bind = "0.0.0.0:8000"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+# Los workers leen WEB_CONCURRENCY para saber si comparten estado (claves de idempotencia, JWT)
+os.environ.setdefault("WEB_CONCURRENCY", str(workers))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# --- MÉTRICAS MULTIPROCESO (Prometheus) ---
+# Cada worker escribe sus contadores en ficheros mmap de este directorio y
+# /metrics agrega todos los ficheros, así un scrape ve el total de los workers.
+# Debe existir en el entorno antes de que los workers importen prometheus_client.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc")
+
+
+def on_starting(server):
+    """Vaciar el directorio de métricas de ejecuciones anteriores."""
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Los gauges del worker que termina dejan de contar (modo livesum)."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -23,7 +23,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 load_dotenv()
 
 from app.core.database import Base
-from app.models import user, planeta  # Import all your models here
+from app.models import user, planeta, planeta_change, refresh_token, idempotency_key  # Import all your models here
 
 # add your model's MetaData object here
 # for 'autogenerate' support